@@ -0,0 +1,141 @@
+"""
+Micro-benchmark biaya parse respons AT per respons
+
+Membandingkan registry parser (pola dikompilasi sekali, satu kali baca per
+buffer) dengan cara lama: re.search dengan pola string per field dan loop
+split per baris. Tidak membutuhkan modem maupun ModemFarm.
+
+Contoh:
+    python -m benchmarks.parser_benchmark
+    python -m benchmarks.parser_benchmark --iterations 50000 --output parse.json
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Pola string seperti di config.json / ATCommand.parse_response lama
+LEGACY_PATTERNS = {
+    "iccid": r"(?:\+CCID:\s*)?\b(89\d{16,20})",
+    "imsi": r"^\s*(\d{14,15})\s*$",
+    "msisdn": r'\+CNUM:\s*"[^"]*","([^"]*)"',
+    "signal": r"\+CSQ:\s*(\d+)",
+    "operator": r'\+COPS:\s*\d+,\d+,"([^"]*)"',
+    "creg": r"\+CREG:\s*\d+,(\d+)",
+}
+
+SAMPLES = {
+    "csq": (
+        "\r\n+CSQ: 21,99\r\n\r\nOK\r\n",
+        ["AT+CSQ"],
+        None,
+    ),
+    "identity_combined": (
+        '\r\n+CCID: 8962100000000000003\r\n\r\n510210000000003\r\n\r\n+CNUM: "",'
+        '"085700000003",129\r\n\r\n+CSQ: 13,99\r\n\r\n+COPS: 0,0,"IM3",7\r\n'
+        "\r\n+CREG: 0,1\r\n\r\nOK\r\n",
+        ["AT+CCID", "AT+CIMI", "AT+CNUM", "AT+CSQ", "AT+COPS?", "AT+CREG?"],
+        None,
+    ),
+    "huawei": (
+        '\r\n^ICCID: 98261000000000000030\r\n\r\n^HCSQ: "LTE",50,40,100,20\r\n'
+        '\r\n+COPS: 0,0,"IM3",7\r\n\r\nOK\r\n',
+        ["AT^ICCID?", "AT^HCSQ?", "AT+COPS?"],
+        "huawei",
+    ),
+    "ussd": (
+        '\r\n+CUSD: 0,"Sisa pulsa Anda Rp10.000 aktif s/d 31-12-2026",15\r\n',
+        [],
+        None,
+    ),
+}
+
+
+def legacy_regex(text, commands, vendor):
+    """re.search per field dengan pola string (dikompilasi ulang lewat cache re)"""
+    values = {}
+    for name, pattern in LEGACY_PATTERNS.items():
+        match = re.search(pattern, text, re.MULTILINE)
+        if match:
+            values[name] = match.group(1)
+    return values
+
+
+def legacy_split(text, commands, vendor):
+    """Loop split per field seperti PortManager._parse_* lama"""
+    values = {}
+    for line in text.strip().split("\n"):
+        line = line.strip()
+        if "+CCID:" in line:
+            values["iccid"] = line.split("+CCID:")[1].strip()
+        elif line.startswith("8962") or line.startswith("8901"):
+            values["iccid"] = line
+    for line in text.strip().split("\n"):
+        if "+CNUM:" in line:
+            parts = line.split(",")
+            if len(parts) > 1:
+                values["msisdn"] = parts[1].replace('"', "").strip()
+    for line in text.strip().split("\n"):
+        if "+CSQ:" in line:
+            try:
+                values["signal"] = int(line.split(":")[1].strip().split(",")[0])
+            except ValueError:
+                pass
+    return values
+
+
+def measure(function, sample, iterations):
+    text, commands, vendor = sample
+    function(text, commands, vendor)  # Pemanasan
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(text, commands, vendor)
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--samples", nargs="+", choices=list(SAMPLES), default=None)
+    parser.add_argument("--output", help="File JSON hasil")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    from src.utils.atparser import REGISTRY
+
+    parsers = {
+        "registry": REGISTRY.parse,
+        "legacy_regex": legacy_regex,
+        "legacy_split": legacy_split,
+    }
+
+    print(f"{'sample':<20}{'parser':<15}{'per response':>14}{'fields':>8}")
+    results = []
+    for name in args.samples or SAMPLES:
+        sample = SAMPLES[name]
+        for parser_name, function in parsers.items():
+            seconds = measure(function, sample, args.iterations)
+            parsed = function(*sample)
+            fields = len(parsed if isinstance(parsed, dict) else parsed.values)
+            print(f"{name:<20}{parser_name:<15}{seconds * 1e6:>11.2f} us{fields:>8}")
+            results.append(
+                {
+                    "sample": name,
+                    "parser": parser_name,
+                    "seconds": seconds,
+                    "fields": fields,
+                }
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Benchmark throughput deteksi, monitoring dan broadcast terhadap modem simulasi
+
+Setiap kombinasi skenario dan jumlah modem dijalankan di subprocess terpisah
+(dengan ModemFarm di dalamnya) agar peak RSS dan jumlah thread tidak saling
+tercampur. Hasil disimpan sebagai JSON untuk dibandingkan antar versi.
+
+Contoh:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 8 32 --scenarios detect_ports
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tomllib
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = [8, 32, 128, 512]
+SCENARIOS = [
+    "detect_ports",
+    "monitor_sweep",
+    "detect_all_simcards",
+    "broadcast_command",
+    "dial_ussd_to_all",
+]
+
+
+def percentile(values, pct):
+    """Persentil sederhana (nearest-rank)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ThreadSampler:
+    """Mencatat jumlah thread maksimum selama benchmark berjalan"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def instrument_latency(latencies):
+    """Catat latensi setiap perintah AT yang lewat send_and_read"""
+    from src.controllers import port_controller
+    from src.models import portmanager
+    from src.utils import atresponse
+
+    original = atresponse.send_and_read
+
+    def timed_send_and_read(connection, command, timeout):
+        result = original(connection, command, timeout)
+        latencies.append(result.latency)
+        return result
+
+    port_controller.send_and_read = timed_send_and_read
+    portmanager.send_and_read = timed_send_and_read
+
+
+def setup_scenario(name):
+    """
+    Menyiapkan skenario (tidak ikut diukur)
+
+    Returns:
+        Tuple (fungsi yang diukur, fungsi hitung hasil sukses, fungsi cleanup)
+    """
+    from concurrent.futures import wait
+
+    if name == "detect_ports":
+        from src.services.port_service import PortService
+
+        service = PortService()
+        return (
+            lambda: service.detect_ports(full=True),
+            lambda result: sum(1 for p in result.values() if p.is_connected()),
+            service.close,
+        )
+
+    if name == "monitor_sweep":
+        from src.services.port_service import PortService
+
+        service = PortService()
+        service.detect_ports()
+        # Tanpa traffic terakhir, setiap port harus benar-benar diprobe
+        service.port_controller.last_traffic.clear()
+
+        def run():
+            probed = {}
+            while len(probed) < len(service.ports):
+                probed.update(service.run_scheduled_probes())
+            return probed
+
+        return run, lambda result: sum(result.values()), service.close
+
+    if name == "detect_all_simcards":
+        from src.models.portmanager import PortManager
+
+        manager = PortManager()
+        manager.detect_ports()
+        return manager.detect_all_simcards, len, lambda: None
+
+    from src.models.modemmanager import ModemManager
+
+    modem_manager = ModemManager()
+    modem_manager.port_service.detect_ports()
+    modem_manager.port_service.enable_all_ports()
+
+    if name == "broadcast_command":
+
+        def run():
+            results, futures = modem_manager.broadcast_command("AT+CSQ")
+            wait(futures)
+            return results
+
+        return (
+            run,
+            lambda result: sum(1 for r in result.values() if r),
+            modem_manager.port_service.close,
+        )
+
+    if name == "dial_ussd_to_all":
+        return (
+            lambda: {
+                r.device_id: r.value for r in modem_manager.dial_ussd_to_all("*123#")
+            },
+            lambda result: sum(1 for r in result.values() if r and "+CUSD:" in r),
+            modem_manager.port_service.close,
+        )
+
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def run_child(name, size, farm_options):
+    """Menjalankan satu skenario di proses ini dan mengembalikan hasilnya"""
+    import logging
+    import resource
+
+    # Jalankan di direktori sementara agar file log/cache tidak mengotori repo
+    workdir = tempfile.mkdtemp(prefix="x-im3-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, str(ROOT))
+    logging.disable(logging.WARNING)
+
+    from src.simulator.modem_farm import ModemFarm
+
+    latencies = []
+    instrument_latency(latencies)
+
+    with ModemFarm(size, **farm_options):
+        run, count_ok, cleanup = setup_scenario(name)
+        latencies.clear()
+        with ThreadSampler() as sampler:
+            started = time.perf_counter()
+            result = run()
+            wall_time = time.perf_counter() - started
+        cleanup()
+
+    return {
+        "scenario": name,
+        "size": size,
+        "wall_time": wall_time,
+        "succeeded": count_ok(result),
+        "commands": len(latencies),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "peak_threads": sampler.peak,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_in_subprocess(name, size, args):
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.run_benchmarks",
+        "--child",
+        name,
+        str(size),
+        "--latency",
+        str(args.latency),
+        "--jitter",
+        str(args.jitter),
+        "--error-rate",
+        str(args.error_rate),
+    ]
+    try:
+        completed = subprocess.run(
+            command, cwd=ROOT, capture_output=True, text=True, timeout=args.timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"scenario": name, "size": size, "error": f"timeout ({args.timeout}s)"}
+
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        return {"scenario": name, "size": size, "error": error[0]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def project_version():
+    try:
+        with open(ROOT / "pyproject.toml", "rb") as f:
+            return tomllib.load(f)["project"]["version"]
+    except Exception:
+        return "unknown"
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def format_seconds(value):
+    if value is None:
+        return "-"
+    return f"{value * 1000:.1f}ms" if value < 1 else f"{value:.2f}s"
+
+
+def print_result(result):
+    if "error" in result:
+        print(f"{result['scenario']:<22}{result['size']:>6}  ERROR: {result['error']}")
+        return
+    if result.get("skipped"):
+        print(
+            f"{result['scenario']:<22}{result['size']:>6}  skipped: {result['skipped']}"
+        )
+        return
+    print(
+        f"{result['scenario']:<22}{result['size']:>6}"
+        f"{format_seconds(result['wall_time']):>10}"
+        f"{result['succeeded']:>6}/{result['size']:<5}"
+        f"{format_seconds(result['latency_p50']):>10}"
+        f"{format_seconds(result['latency_p99']):>10}"
+        f"{result['peak_threads']:>8}"
+        f"{result['peak_rss_kb'] / 1024:>9.1f}MB"
+    )
+
+
+def compare(results, baseline_file):
+    """Tampilkan rasio wall time terhadap hasil benchmark sebelumnya"""
+    with open(baseline_file, "r") as f:
+        baseline = json.load(f)
+    previous = {
+        (r["scenario"], r["size"]): r for r in baseline["results"] if "wall_time" in r
+    }
+
+    print(f"\nPerbandingan dengan {baseline_file} ({baseline.get('revision')}):")
+    for result in results:
+        old = previous.get((result["scenario"], result["size"]))
+        if old is None or "wall_time" not in result:
+            continue
+        ratio = result["wall_time"] / old["wall_time"] if old["wall_time"] else 0
+        marker = "  REGRESI" if ratio > 1.2 else ""
+        print(
+            f"  {result['scenario']:<22}{result['size']:>6}  "
+            f"{format_seconds(old['wall_time'])} -> "
+            f"{format_seconds(result['wall_time'])} ({ratio:.2f}x){marker}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=120,
+        help="Lewati ukuran lebih besar jika satu skenario melebihi detik ini",
+    )
+    parser.add_argument("--timeout", type=float, default=900)
+    parser.add_argument("--output", help="File JSON hasil")
+    parser.add_argument("--compare", help="File JSON hasil sebelumnya")
+    parser.add_argument("--child", nargs=2, metavar=("SCENARIO", "SIZE"))
+    args = parser.parse_args()
+
+    farm_options = {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "ussd_delay": 0.2,
+        "sms_delay": 0.2,
+    }
+
+    if args.child:
+        name, size = args.child
+        print(json.dumps(run_child(name, int(size), farm_options)))
+        return
+
+    print(
+        f"{'scenario':<22}{'ports':>6}{'wall':>10}{'ok':>12}"
+        f"{'p50':>10}{'p99':>10}{'threads':>8}{'rss':>11}"
+    )
+    results = []
+    for name in args.scenarios:
+        over_budget = None
+        for size in sorted(args.sizes):
+            if over_budget is not None:
+                result = {
+                    "scenario": name,
+                    "size": size,
+                    "skipped": f"{over_budget} ports took longer than {args.budget}s",
+                }
+            else:
+                result = run_in_subprocess(name, size, args)
+                if result.get("wall_time", 0) > args.budget or "error" in result:
+                    over_budget = size
+            print_result(result)
+            results.append(result)
+
+    output = args.output or ROOT / "benchmarks" / "results" / (
+        f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "version": project_version(),
+                "revision": git_revision(),
+                "timestamp": datetime.now().isoformat(),
+                "farm": farm_options,
+                "results": results,
+            },
+            f,
+            indent=4,
+        )
+    print(f"\nHasil disimpan ke {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,61 +2,71 @@ import logging
 
 from src.services.port_monitor import PortMonitor
 from src.services.port_service import PortService
-from src.utils.config import load_config
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(), logging.FileHandler("app.log")],
-)
+from src.utils.config import get_config_store
+from src.utils.logging import configure_logging
+from src.utils.metrics import REGISTRY, command_stats, start_http_server
+from src.utils.tracing import TRACER
 
 logger = logging.getLogger(__name__)
 
 
-def console_output_handler(status_data):
-    """Handler untuk output monitoring ke konsol"""
-    timestamp = status_data["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-    ports = status_data["ports"]
-
-    print(f"\n=== Status Port Aktif ({timestamp}) ===")
-    if not ports:
-        print("Tidak ada port aktif")
-    else:
-        # Urutkan port berdasarkan nama
-        sorted_ports = sorted(
-            ports.values(),
-            key=lambda p: int(p.device_id.lower().replace("com", "") or 0),
-        )
+def console_output_handler(delta):
+    """Handler untuk output monitoring ke konsol (hanya perubahan)"""
+    timestamp = delta["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
 
-        # Kelompokkan berdasarkan koneksi
-        connected = [p for p in sorted_ports if p.is_connected()]
-        disconnected = [p for p in sorted_ports if not p.is_connected()]
+    print(f"\n=== Perubahan Status Port #{delta['seq']} ({timestamp}) ===")
+    for device_id, port in delta["added"].items():
+        active_status = "Aktif" if port.active else "Nonaktif"
+        print(f"  + {device_id} - {port.name} - {port.status}, {active_status}")
+    for device_id in delta["removed"]:
+        print(f"  - {device_id} dilepas")
+    for device_id, (old, new) in delta["status_changed"].items():
+        print(f"  ~ {device_id}: {old} -> {new}")
+    for device_id, (old, new) in delta["active_changed"].items():
+        old_text = "Aktif" if old else "Nonaktif"
+        new_text = "Aktif" if new else "Nonaktif"
+        print(f"  ~ {device_id}: {old_text} -> {new_text}")
 
-        # Tampilkan port terhubung dulu
-        if connected:
-            print("- Terhubung:")
-            for port in connected:
-                print(f"  {port.device_id} - {port.name}")
+    print("======================================")
 
-        # Kemudian port terputus
-        if disconnected:
-            print("- Terputus:")
-            for port in disconnected:
-                print(f"  {port.device_id} - {port.name}")
 
-    print("======================================")
+def print_command_stats():
+    """Tampilkan latensi dan error perintah AT per port"""
+    rows = command_stats()
+    if not rows:
+        print("Belum ada perintah AT yang tercatat.")
+        return
+
+    print(
+        f"\n{'Port':<16}{'Command':<18}{'Count':>7}{'Avg ms':>9}"
+        f"{'p95 ms':>9}{'Timeout':>9}{'Error':>7}"
+    )
+    for row in rows:
+        avg = f"{row['avg_ms']:.1f}" if row["avg_ms"] is not None else "-"
+        p95 = f"{row['p95_ms']:.0f}" if row["p95_ms"] is not None else "-"
+        print(
+            f"{row['port']:<16}{row['command']:<18}{row['count']:>7}{avg:>9}"
+            f"{p95:>9}{row['timeouts']:>9}{row['errors']:>7}"
+        )
 
 
 def main():
     """Fungsi utama program"""
+    # Satu pipeline logging (QueueHandler -> konsol + logs/app.jsonl)
+    configure_logging(logging.INFO)
     logger.info("Starting application")
 
-    # Load configuration
-    config = load_config()
+    # Konfigurasi bersama; perubahan file diterapkan tanpa restart
+    config_store = get_config_store()
+    config_store.start_watching()
 
     # Setup port service
-    port_service = PortService()
+    port_service = PortService(config_store=config_store)
+
+    # Endpoint metrik opsional untuk Prometheus
+    metrics_server = None
+    if config_store.config["metrics_port"]:
+        metrics_server = start_http_server(config_store.config["metrics_port"])
 
     try:
         # Deteksi port
@@ -88,8 +98,11 @@ def main():
             port_service.enable_port(device_id)
             print(f"Port {device_id} diaktifkan otomatis")
 
+        # Deteksi ulang otomatis saat modem dicolok/dicabut
+        port_service.start_hotplug()
+
         # Setup dan mulai monitoring
-        port_monitor = PortMonitor(port_service, config)
+        port_monitor = PortMonitor(port_service, config_store.config)
         port_monitor.add_output_handler(console_output_handler)
         port_monitor.start()
 
@@ -101,10 +114,14 @@ def main():
         print("  refresh [port_id]  - Perbarui status port")
         print("  enable-all         - Aktifkan semua port")
         print("  disable-all        - Nonaktifkan semua port")
+        print("  stats [file]       - Statistik perintah AT (file: ekspor Prometheus)")
+        print("  trace on|off       - Aktifkan/nonaktifkan tracing serial")
+        print("  trace [file]       - Simpan timeline Chrome trace (JSON)")
         print("  exit               - Keluar program")
 
         while True:
-            cmd = input("\nCommand: ").strip().lower()
+            raw = input("\nCommand: ").strip()
+            cmd = raw.lower()
 
             if cmd == "exit":
                 break
@@ -152,6 +169,29 @@ def main():
             elif cmd == "disable-all":
                 port_service.disable_all_ports()
                 print("Semua port dinonaktifkan.")
+            elif cmd == "stats":
+                print_command_stats()
+            elif cmd.startswith("stats "):
+                metrics_file = raw.split(" ", 1)[1]
+                try:
+                    REGISTRY.write(metrics_file)
+                    print(f"Metrik ditulis ke {metrics_file}")
+                except OSError as e:
+                    print(f"Gagal menulis metrik ke {metrics_file}: {e}")
+            elif cmd == "trace on":
+                TRACER.enable()
+                print("Tracing diaktifkan.")
+            elif cmd == "trace off":
+                TRACER.disable()
+                print("Tracing dinonaktifkan.")
+            elif cmd == "trace" or cmd.startswith("trace "):
+                parts = raw.split(" ", 1)
+                trace_file = parts[1] if len(parts) > 1 else "trace.json"
+                try:
+                    count = TRACER.export_chrome(trace_file)
+                    print(f"{count} span ditulis ke {trace_file}")
+                except OSError as e:
+                    print(f"Gagal menulis trace ke {trace_file}: {e}")
             else:
                 print("Perintah tidak dikenal.")
 
@@ -162,6 +202,10 @@ def main():
     finally:
         # Cleanup
         port_monitor.stop()
+        port_service.close()
+        config_store.stop_watching()
+        if metrics_server is not None:
+            metrics_server.shutdown()
         logger.info("Application shutdown")
         print("Program berakhir.")
 
@@ -0,0 +1,130 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+import serial
+
+from src.utils.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Pool koneksi serial jangka panjang, satu koneksi per device (thread-safe)"""
+
+    def __init__(self, opener, lease_timeout=None):
+        """
+        Inisialisasi pool koneksi
+
+        Args:
+            opener: Fungsi yang menerima device_id dan mengembalikan
+                serial.Serial yang sudah terbuka (atau None jika gagal)
+            lease_timeout: Waktu tunggu maksimal (detik) untuk meminjam
+                koneksi yang sedang dipakai thread lain (None = tunggu terus)
+        """
+        self._opener = opener
+        self.lease_timeout = lease_timeout
+        self._connections = {}
+        self._device_locks = {}
+        self._lock = threading.Lock()
+
+    def _get_device_lock(self, device_id):
+        with self._lock:
+            device_lock = self._device_locks.get(device_id)
+            if device_lock is None:
+                device_lock = threading.Lock()
+                self._device_locks[device_id] = device_lock
+            return device_lock
+
+    @contextmanager
+    def lease(self, device_id, timeout=None):
+        """
+        Meminjam koneksi ke device secara eksklusif
+
+        Koneksi dibuka sekali lalu dipakai ulang. Saat dikembalikan koneksi
+        diperiksa kesehatannya dan dibuang bila rusak atau perangkat dicabut.
+
+        Args:
+            device_id: ID port (contoh: COM6)
+            timeout: Override lease_timeout untuk peminjaman ini
+
+        Yields:
+            serial.Serial yang terbuka, atau None jika port tidak bisa dibuka
+        """
+        timeout = self.lease_timeout if timeout is None else timeout
+        device_lock = self._get_device_lock(device_id)
+        with TRACER.span("pool.wait", device_id):
+            acquired = device_lock.acquire(timeout=-1 if timeout is None else timeout)
+        if not acquired:
+            logger.debug("Timeout waiting for connection lease on %s", device_id)
+            yield None
+            return
+
+        try:
+            connection = self._connections.get(device_id)
+            if connection is None or not connection.is_open:
+                connection = self._opener(device_id)
+                if connection is None:
+                    yield None
+                    return
+                with self._lock:
+                    self._connections[device_id] = connection
+                logger.debug("Pooled new connection for %s", device_id)
+
+            try:
+                yield connection
+            except (serial.SerialException, OSError):
+                self._discard(device_id)
+                raise
+
+            if not self._is_healthy(connection):
+                logger.debug("Connection to %s unhealthy, evicting", device_id)
+                self._discard(device_id)
+        finally:
+            device_lock.release()
+
+    def _is_healthy(self, connection):
+        """Cek koneksi masih terbuka dan perangkat masih merespons ioctl"""
+        try:
+            # in_waiting memanggil driver, gagal jika perangkat sudah dicabut
+            return connection.is_open and connection.in_waiting >= 0
+        except (serial.SerialException, OSError):
+            return False
+
+    def _discard(self, device_id):
+        """Tutup dan hapus koneksi tanpa mengambil device lock"""
+        with self._lock:
+            connection = self._connections.pop(device_id, None)
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception as e:
+                logger.debug(f"Error closing pooled connection {device_id}: {e}")
+
+    def evict(self, device_id):
+        """Buang koneksi device dari pool (misalnya saat perangkat dicabut)"""
+        device_lock = self._get_device_lock(device_id)
+        with device_lock:
+            self._discard(device_id)
+        logger.debug(f"Evicted pooled connection for {device_id}")
+
+    def retain(self, device_ids):
+        """Buang semua koneksi yang device-nya tidak lagi ada di sistem"""
+        device_ids = set(device_ids)
+        with self._lock:
+            stale = [d for d in self._connections if d not in device_ids]
+        for device_id in stale:
+            self.evict(device_id)
+        return stale
+
+    def close_all(self):
+        """Tutup semua koneksi di pool"""
+        with self._lock:
+            device_ids = list(self._connections)
+        for device_id in device_ids:
+            self.evict(device_id)
+
+    def pooled_devices(self):
+        """Daftar device yang koneksinya sedang terbuka di pool"""
+        with self._lock:
+            return list(self._connections)
@@ -0,0 +1,292 @@
+import logging
+import threading
+import time
+
+import serial
+
+from src.utils.atresponse import (
+    FINAL_RESULT_CODES,
+    FINAL_RESULT_PREFIXES,
+    PROMPT,
+    READ_POLL_INTERVAL,
+    ATResponse,
+    format_command,
+)
+
+logger = logging.getLogger(__name__)
+
+# Baris yang dikirim modem tanpa diminta (3GPP TS 27.005 / 27.007)
+URC_PREFIXES = (
+    "+CUSD:",
+    "+CMTI:",
+    "+CMT:",
+    "+CDS:",
+    "+CDSI:",
+    "+CREG:",
+    "+CGREG:",
+    "+CEREG:",
+    "+CMGS:",
+    "+CLIP:",
+    "RING",
+    # Status SIM (dicabut/diganti)
+    "+CPIN:",
+    "+SIMCARD:",
+    "+QSIMSTAT:",
+    "^SIMST:",
+)
+# URC yang diikuti satu baris data (PDU)
+TWO_LINE_URCS = ("+CMT:", "+CDS:")
+
+
+def info_prefix(command):
+    """
+    Prefix respons informasi milik perintah, misalnya AT+CREG? -> +CREG:
+
+    Perintah set (dengan "=") tidak punya prefix solicited sehingga baris
+    seperti +CUSD: setelah AT+CUSD=1,... tetap diperlakukan sebagai URC.
+    """
+    command = command.strip().upper()
+    if not command.startswith("AT+") or "=" in command:
+        return None
+    name = command[2:].rstrip("?")
+    return f"{name}:"
+
+
+class _PendingCommand:
+    def __init__(self, command):
+        self.command = command
+        self.prefix = info_prefix(command)
+        self.lines = []
+        self.final = None
+        self.done = threading.Event()
+
+    def text(self):
+        if not self.lines:
+            return ""
+        text = "\r\n" + "\r\n".join(self.lines)
+        return text if self.final == PROMPT else text + "\r\n"
+
+
+class UrcWaiter:
+    """Menunggu satu URC dengan prefix tertentu (didaftarkan sebelum perintah dikirim)"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.line = None
+        self._event = threading.Event()
+
+    def _deliver(self, line):
+        self.line = line
+        self._event.set()
+
+    def wait(self, timeout, cancel=None):
+        """
+        Args:
+            timeout: Batas waktu dalam detik
+            cancel: threading.Event opsional untuk berhenti lebih awal
+
+        Returns:
+            Baris URC, atau None jika tidak diterima
+        """
+        deadline = time.monotonic() + timeout
+        while not self._event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancel and cancel.is_set()):
+                break
+            self._event.wait(min(remaining, READ_POLL_INTERVAL))
+        return self.line
+
+
+class ModemChannel:
+    """
+    Reader jangka panjang untuk satu port
+
+    Satu thread membaca byte stream, memecahnya menjadi baris, lalu
+    meneruskan respons ke perintah yang sedang menunggu dan URC ke handler
+    begitu baris tersebut tiba. Koneksi tetap milik ConnectionPool; penulis
+    perintah tetap harus memegang lease.
+    """
+
+    def __init__(self, device_id, connection, on_urc=None, on_close=None):
+        """
+        Args:
+            device_id: ID port
+            connection: serial.Serial yang terbuka (dari pool)
+            on_urc: Fungsi (device_id, urc) yang dipanggil di thread reader
+            on_close: Fungsi (channel) yang dipanggil saat reader berhenti
+        """
+        self.device_id = device_id
+        self.connection = connection
+        self.on_urc = on_urc
+        self.on_close = on_close
+        self.running = False
+        self.thread = None
+        self._buffer = bytearray()
+        self._pending = None
+        self._partial_urc = None
+        self._original_timeout = None
+        self._waiters = []
+        self._lock = threading.Lock()
+        self._command_lock = threading.Lock()
+
+    def start(self):
+        self.running = True
+        self._original_timeout = self.connection.timeout
+        self.connection.timeout = READ_POLL_INTERVAL
+        self.thread = threading.Thread(
+            target=self._run, name=f"urc-{self.device_id}", daemon=True
+        )
+        self.thread.start()
+        logger.debug(f"URC channel started for {self.device_id}")
+
+    def close(self):
+        """Hentikan reader (koneksi tidak ditutup, tetap milik pool)"""
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def _run(self):
+        try:
+            while self.running:
+                chunk = self.connection.read(self.connection.in_waiting or 1)
+                if chunk:
+                    self._feed(chunk)
+        except (serial.SerialException, OSError, TypeError) as e:
+            # TypeError: pyserial saat koneksi ditutup dari thread lain
+            if self.running:
+                logger.debug(f"URC channel for {self.device_id} stopped: {e}")
+        finally:
+            self.running = False
+            if self.connection.is_open:
+                self.connection.timeout = self._original_timeout
+            with self._lock:
+                pending = self._pending
+            if pending is not None:
+                pending.done.set()
+            if self.on_close:
+                self.on_close(self)
+
+    def _feed(self, chunk):
+        self._buffer.extend(chunk)
+        while True:
+            index = self._buffer.find(b"\n")
+            if index == -1:
+                break
+            line = self._buffer[:index].decode("utf-8", errors="ignore").strip()
+            del self._buffer[: index + 1]
+            if line:
+                self._handle_line(line)
+
+        # Prompt "> " tidak diakhiri newline
+        if self._buffer.strip() == b">":
+            with self._lock:
+                pending = self._pending
+            if pending is not None:
+                self._buffer.clear()
+                pending.final = PROMPT
+                pending.done.set()
+
+    def _handle_line(self, line):
+        with self._lock:
+            pending = self._pending
+
+        if self._partial_urc is not None:
+            urc, self._partial_urc = f"{self._partial_urc}\r\n{line}", None
+            self._dispatch(urc)
+            return
+
+        solicited = (
+            pending is not None and pending.prefix and line.startswith(pending.prefix)
+        )
+        if line.startswith(URC_PREFIXES) and not solicited:
+            if line.startswith(TWO_LINE_URCS):
+                self._partial_urc = line
+            else:
+                self._dispatch(line)
+            return
+
+        if pending is None:
+            logger.debug(
+                "Unsolicited line on %s: %s",
+                self.device_id,
+                line,
+                extra={"port": self.device_id},
+            )
+            return
+
+        pending.lines.append(line)
+        if line in FINAL_RESULT_CODES or line.startswith(FINAL_RESULT_PREFIXES):
+            pending.final = line
+            pending.done.set()
+
+    def _dispatch(self, urc):
+        logger.debug(
+            "URC from %s: %s", self.device_id, urc, extra={"port": self.device_id}
+        )
+        with self._lock:
+            waiters = [w for w in self._waiters if urc.startswith(w.prefix)]
+            for waiter in waiters:
+                self._waiters.remove(waiter)
+        for waiter in waiters:
+            waiter._deliver(urc)
+
+        if self.on_urc:
+            try:
+                self.on_urc(self.device_id, urc)
+            except Exception as e:
+                logger.error(f"Error in URC handler for {self.device_id}: {e}")
+
+    def expect(self, prefix):
+        """Daftarkan penantian URC; panggil sebelum perintah pemicunya dikirim"""
+        waiter = UrcWaiter(prefix)
+        with self._lock:
+            self._waiters.append(waiter)
+        return waiter
+
+    def discard(self, waiter):
+        """Batalkan penantian URC yang tidak lagi dibutuhkan"""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def execute(self, command, timeout):
+        """
+        Kirim perintah AT dan tunggu result code final (atau prompt "> ")
+
+        Returns:
+            ATResponse
+        """
+        command = format_command(command)
+        return self._transact(command.strip(), command.encode(), timeout)
+
+    def send_payload(self, data, timeout, command=None):
+        """
+        Kirim data mentah (misalnya isi SMS + Ctrl+Z) dan tunggu result code
+
+        Args:
+            data: String yang dikirim apa adanya
+            timeout: Batas waktu respons dalam detik
+            command: Perintah asal, untuk prefix respons (contoh: AT+CMGS)
+        """
+        return self._transact(command, data.encode(), timeout)
+
+    def _transact(self, command, payload, timeout):
+        with self._command_lock:
+            pending = _PendingCommand(command or "")
+            with self._lock:
+                self._pending = pending
+            started = time.monotonic()
+            try:
+                self.connection.write(payload)
+                pending.done.wait(timeout)
+            finally:
+                with self._lock:
+                    self._pending = None
+
+        return ATResponse(
+            command,
+            pending.text(),
+            pending.final,
+            time.monotonic() - started,
+            pending.final is None,
+        )
@@ -1,10 +1,17 @@
 import logging
+import threading
 import time
 
 import serial
 import serial.tools.list_ports
 
-from src.utils.config import load_config
+from src.controllers.connection_pool import ConnectionPool
+from src.controllers.modem_channel import ModemChannel
+from src.utils.atquery import query_modem
+from src.utils.atresponse import format_command, read_response, send_and_read
+from src.utils.config import get_config_store
+from src.utils.metrics import RECONNECTS, record_command
+from src.utils.tracing import TRACER
 
 logger = logging.getLogger(__name__)
 
@@ -12,31 +19,69 @@ logger = logging.getLogger(__name__)
 class PortController:
     """Controller untuk operasi port serial"""
 
-    def __init__(self, config_file="config.json"):
-        self.config = load_config(config_file)
+    def __init__(self, config_file="config.json", config_store=None):
+        """
+        Args:
+            config_file: File konfigurasi jika config_store tidak diberikan
+            config_store: ConfigStore bersama (lihat utils.config)
+        """
+        self.config_store = config_store or get_config_store(config_file)
+        self.pool = ConnectionPool(self.open_connection)
+        self.last_traffic = {}  # device_id -> time.monotonic() respons terakhir
+        self.channels = {}  # device_id -> ModemChannel (reader URC)
+        self.channels_lock = threading.Lock()
+        self.opened = set()  # Device yang pernah dibuka (untuk metrik reconnect)
         logger.debug(
             f"PortController initialized with baudrate: {self.config['baudrate']}"
         )
 
+    @property
+    def config(self):
+        """Snapshot konfigurasi terbaru (ikut berubah saat hot-reload)"""
+        return self.config_store.config
+
     def list_system_ports(self):
         """List semua port yang tersedia pada sistem"""
         return list(serial.tools.list_ports.comports())
 
+    def is_candidate_port(self, port_info):
+        """Memeriksa apakah port sistem lolos excluded_ports dan port_filters"""
+        name = port_info.description
+
+        # Skip excluded ports
+        if any(ex.lower() in name.lower() for ex in self.config["excluded_ports"]):
+            logger.debug(f"Skipping excluded port: {port_info.device} - {name}")
+            return False
+
+        # Only process ports matching our filters, unless filters are empty
+        filters = self.config["port_filters"]
+        if filters and not any(f.lower() in name.lower() for f in filters):
+            logger.debug(f"Port didn't match any filter: {port_info.device} - {name}")
+            return False
+
+        return True
+
     def open_connection(self, device_id):
         """Membuka koneksi ke port serial dengan timeout yang tepat"""
         try:
             # Gunakan timeout lebih pendek untuk open connection
             # sehingga tidak blocking terlalu lama jika port bermasalah
-            connection = serial.Serial(
-                device_id,
-                baudrate=self.config["baudrate"],
-                timeout=min(
-                    self.config["timeout"], 0.5
-                ),  # Maksimal 0.5 detik untuk open
-            )
+            with TRACER.span("serial.open", device_id):
+                connection = serial.Serial(
+                    device_id,
+                    baudrate=self.config["baudrate"],
+                    timeout=min(
+                        self.config["timeout"], 0.5
+                    ),  # Maksimal 0.5 detik untuk open
+                )
             # Tunggu sebentar tapi tidak terlalu lama
-            time.sleep(0.2)
+            with TRACER.span("serial.settle", device_id):
+                time.sleep(0.2)
             logger.debug(f"Opened connection to {device_id}")
+            if device_id in self.opened:
+                RECONNECTS.labels(device_id).inc()
+            else:
+                self.opened.add(device_id)
             return connection
         except serial.SerialException as e:
             # Perangkat mungkin diputus secara fisik
@@ -46,36 +91,209 @@ class PortController:
             logger.error(f"Failed to open connection to {device_id}: {str(e)}")
             return None
 
-    def send_command(self, connection, command):
-        """Mengirim perintah AT ke port"""
+    def lease(self, device_id, timeout=None):
+        """
+        Meminjam koneksi dari pool (context manager)
+
+        Koneksi tetap terbuka setelah dipakai sehingga monitor dan refresh
+        tidak perlu membuka ulang port setiap kali.
+        """
+        return self.pool.lease(device_id, timeout)
+
+    def evict(self, device_id):
+        """Menutup koneksi pool untuk device tertentu dan lupakan traffic-nya"""
+        self.close_channel(device_id)
+        self.pool.evict(device_id)
+        self.last_traffic.pop(device_id, None)
+
+    def open_channel(self, device_id, on_urc=None):
+        """
+        Menjalankan reader URC jangka panjang pada koneksi pool
+
+        Selama channel berjalan, execute() dan send_payload() pada koneksi
+        tersebut dilayani lewat channel sehingga respons dan URC tidak saling
+        berebut byte.
+
+        Returns:
+            ModemChannel, atau None jika port tidak bisa dibuka
+        """
+        with self.channels_lock:
+            channel = self.channels.get(device_id)
+            if channel is not None and channel.running:
+                return channel
+
+        with self.lease(device_id) as connection:
+            if connection is None:
+                return None
+            channel = ModemChannel(
+                device_id, connection, on_urc, on_close=self._on_channel_closed
+            )
+            with self.channels_lock:
+                self.channels[device_id] = channel
+            channel.start()
+        return channel
+
+    def get_channel(self, device_id):
+        """Channel yang sedang berjalan untuk device, atau None"""
+        with self.channels_lock:
+            channel = self.channels.get(device_id)
+        return channel if channel is not None and channel.running else None
+
+    def _channel_for(self, connection):
+        channel = self.get_channel(connection.port)
+        return channel if channel and channel.connection is connection else None
+
+    def _on_channel_closed(self, channel):
+        with self.channels_lock:
+            if self.channels.get(channel.device_id) is channel:
+                del self.channels[channel.device_id]
+
+    def close_channel(self, device_id):
+        """Menghentikan reader URC untuk device tertentu"""
+        with self.channels_lock:
+            channel = self.channels.pop(device_id, None)
+        if channel is None:
+            return False
+        channel.close()
+        return True
+
+    def execute(self, connection, command, timeout=None):
+        """
+        Mengirim perintah AT dan menunggu result code final
+
+        Args:
+            connection: Koneksi serial yang terbuka
+            command: Perintah AT
+            timeout: Batas waktu respons (default: config timeout)
+
+        Returns:
+            ATResponse, atau None jika koneksi tidak valid / error
+        """
         try:
             if not connection or connection.closed:
                 logger.error("Cannot send command: connection closed or invalid")
                 return None
 
-            # Reset buffer
-            connection.reset_input_buffer()
-            connection.reset_output_buffer()
-
-            # Format command
-            if not command.upper().startswith("AT"):
-                command = "AT" + command
-            if not command.endswith("\r\n"):
-                command += "\r\n"
-
-            # Send and read response
-            connection.write(command.encode())
-            time.sleep(self.config["timeout"])
-            response = connection.read(connection.in_waiting).decode(
-                "utf-8", errors="ignore"
-            )
+            timeout = self.config["timeout"] if timeout is None else timeout
+            channel = self._channel_for(connection)
+            with TRACER.span("at.execute", connection.port, command=command):
+                if channel is not None:
+                    result = channel.execute(command, timeout)
+                else:
+                    # Reset buffer
+                    with TRACER.span("serial.reset", connection.port):
+                        connection.reset_input_buffer()
+                        connection.reset_output_buffer()
+                    result = send_and_read(connection, command, timeout)
 
-            logger.debug(f"Command: {command.strip()}, Response: {response.strip()}")
-            return response
+            # Argumen %-style: pesan hanya dirangkai jika DEBUG aktif
+            logger.debug(
+                "Command: %s, Response: %s, Latency: %.1fms",
+                result.command,
+                result.text,
+                result.latency * 1000,
+                extra={
+                    "port": connection.port,
+                    "command": result.command,
+                    "latency_ms": round(result.latency * 1000, 1),
+                    "status": result.final,
+                },
+            )
+            record_command(connection.port, result, len(format_command(command)))
+            if result.timed_out:
+                logger.debug(
+                    "Command %s timed out after %ss",
+                    result.command,
+                    timeout,
+                    extra={"port": connection.port, "command": result.command},
+                )
+            else:
+                self.last_traffic[connection.port] = time.monotonic()
+            return result
         except Exception as e:
             logger.error(f"Error sending command: {str(e)}")
             return None
 
+    def send_payload(self, connection, data, timeout=None, command=None):
+        """
+        Mengirim data mentah (misalnya isi SMS + Ctrl+Z) dan menunggu result code
+
+        Args:
+            connection: Koneksi serial yang terbuka
+            data: String yang dikirim apa adanya
+            timeout: Batas waktu respons (default: config timeout)
+            command: Perintah pemilik payload (contoh: AT+CMGS); dipakai
+                sebagai label metrik. Tanpa command, payload dicatat sebagai
+                PAYLOAD agar tidak tercampur dengan probe "AT".
+
+        Returns:
+            ATResponse, atau None jika koneksi tidak valid / error
+        """
+        try:
+            timeout = self.config["timeout"] if timeout is None else timeout
+            channel = self._channel_for(connection)
+            if channel is not None:
+                result = channel.send_payload(data, timeout, command)
+            else:
+                started = time.monotonic()
+                connection.write(data.encode())
+                result = read_response(connection, timeout, command, started)
+            if result is not None:
+                record_command(
+                    connection.port,
+                    result,
+                    len(data.encode()),
+                    None if command else "PAYLOAD",
+                )
+            return result
+        except Exception as e:
+            logger.error(f"Error sending payload: {str(e)}")
+            return None
+
+    def query(
+        self,
+        connection,
+        fields,
+        combined=None,
+        vendor=None,
+        timeout=None,
+        required=(),
+    ):
+        """
+        Membaca beberapa field (iccid, imsi, msisdn, signal, ...) dalam satu sesi
+
+        Args:
+            connection: Koneksi serial yang terbuka
+            fields: Nama field (lihat src.utils.atquery.QUERY_FIELDS)
+            combined: Gabungkan perintah dalam satu baris (default: config)
+            vendor: Nama vendor untuk perintah varian
+            timeout: Batas waktu per perintah (default: config timeout)
+            required: Field wajib; jika tidak terbaca query dihentikan
+
+        Returns:
+            QueryResult
+        """
+        if combined is None:
+            combined = self.config["at_combined_queries"]
+        timeout = self.config["timeout"] if timeout is None else timeout
+        return query_modem(
+            lambda command, t: self.execute(connection, command, t),
+            fields,
+            combined,
+            vendor,
+            timeout,
+            required,
+        )
+
+    def last_traffic_at(self, device_id):
+        """Waktu (time.monotonic) modem terakhir menjawab perintah, atau None"""
+        return self.last_traffic.get(device_id)
+
+    def send_command(self, connection, command, timeout=None):
+        """Mengirim perintah AT ke port dan mengembalikan teks respons"""
+        result = self.execute(connection, command, timeout)
+        return result.text if result else None
+
     def close_connection(self, connection):
         """Menutup koneksi serial"""
         try:
@@ -85,3 +303,11 @@ class PortController:
         except Exception as e:
             logger.error(f"Error closing connection: {str(e)}")
         return False
+
+    def close_all(self):
+        """Menutup semua koneksi yang ada di pool"""
+        with self.channels_lock:
+            device_ids = list(self.channels)
+        for device_id in device_ids:
+            self.close_channel(device_id)
+        self.pool.close_all()
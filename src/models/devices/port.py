@@ -8,6 +8,7 @@ class SerialPort(PortDevice):
         super().__init__(device_id, name)
         self.connection_params = {"baudrate": 115200, "timeout": 1}
         self.simcard_id = None
+        self.identity = None  # Identitas fisik modem (USB serial/lokasi/IMEI)
 
     def set_active(self, active):
         """Mengaktifkan atau menonaktifkan port"""
@@ -6,6 +6,7 @@ class SimCard(Device):
 
     def __init__(self, iccid, msisdn=None, signal=0):
         self.iccid = iccid
+        self.imsi = None
         self.msisdn = msisdn or "Unknown"
         self.signal = signal
         self.port_device = None
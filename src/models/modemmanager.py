@@ -1,16 +1,24 @@
-import queue
+import re
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 
-import serial
-
+from src.services.command_dispatcher import CommandDispatcher
+from src.services.fanout import PORT_DEADLINE_GRACE, fan_out
 from src.services.port_service import PortService
-from src.services.sim_service import SimService  # Asumsi akan dibuat
+from src.services.sim_service import SimService
+from src.services.sms_ingestion import SmsIngestion
+from src.services.sms_sender import BulkSmsSender
+from src.services.sms_store import SmsStore
+from src.utils.atresponse import wait_for_urc
 from src.utils.logging import get_logger
+from src.utils.metrics import USSD_FAILURES, USSD_LATENCY
+from src.utils.tracing import TRACER
 
 logger = get_logger("models.modemmanager")
 
+CMGS_REFERENCE_PATTERN = re.compile(r"\+CMGS:\s*(\d+)")
+
 
 class ModemManager:
     """
@@ -18,49 +26,49 @@ class ModemManager:
     Menggunakan Service Pattern untuk manajemen komponen.
     """
 
-    def __init__(self, config_file="modem_config.json", max_workers=10):
+    def __init__(
+        self, config_file="modem_config.json", max_workers=10, max_queue_size=32
+    ):
         """Inisialisasi ModemManager dengan services yang diperlukan"""
         logger.info("Inisialisasi ModemManager")
 
         # Inisialisasi services
         self.port_service = PortService(config_file=config_file)
-        self.sim_service = SimService()  # Perlu dibuat
+        self.sim_service = SimService(self.port_service)
 
         # Setup threading components
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.command_queue = queue.Queue()
-        self.response_callbacks = {}
         self.lock = threading.Lock()
 
-        # Start command processing thread
-        self.running = True
-        self.command_thread = threading.Thread(target=self._process_command_queue)
-        self.command_thread.daemon = True
-        self.command_thread.start()
-
-    def _process_command_queue(self):
-        """Process commands from queue in background"""
-        while self.running:
-            try:
-                # Get command with 1 second timeout
-                command_data = self.command_queue.get(timeout=1)
-                if command_data:
-                    port_device, command, callback, timeout = command_data
-                    try:
-                        result = self._execute_at_command(port_device, command, timeout)
-                        if callback:
-                            callback(result)
-                    except Exception as e:
-                        logger.error(f"Error executing command: {str(e)}")
-                    finally:
-                        self.command_queue.task_done()
-            except queue.Empty:
-                pass  # Just continue if queue is empty
-
-    def _execute_at_command(self, port_device, command, timeout):
-        """Execute AT command directly"""
-        # This is the actual implementation that runs in a worker thread
-        return self.send_at_command(port_device, command, timeout)
+        # Satu worker dan antrian per port: port berbeda berjalan paralel,
+        # perintah ke port yang sama tetap berurutan
+        self.dispatcher = CommandDispatcher(self.send_at_command, max_queue_size)
+
+        # Pengiriman SMS massal dengan token bucket per SIM
+        config = self.port_service.config
+        self.sms_sender = BulkSmsSender(
+            lambda device_id, number, text: self._send_sms(
+                device_id, number, text, self.port_service.config["sms_send_timeout"]
+            ),
+            lambda: list(self.port_service.list_available_ports()),
+            config["sms_rate_per_minute"],
+            config["sms_burst"],
+            config["sms_max_attempts"],
+        )
+
+        # Pipeline SMS masuk dibuat saat start_sms_ingestion()
+        self.sms_store = None
+        self.sms_ingestion = None
+        self.port_service.config_store.subscribe(self._on_config_changed)
+
+    def _on_config_changed(self, config, old, changed):
+        """Terapkan batas kirim SMS baru tanpa restart"""
+        if {"sms_rate_per_minute", "sms_burst", "sms_max_attempts"} & set(changed):
+            self.sms_sender.configure(
+                config["sms_rate_per_minute"],
+                config["sms_burst"],
+                config["sms_max_attempts"],
+            )
 
     def send_at_command_async(self, port_device, command, callback=None, timeout=1):
         """
@@ -69,29 +77,43 @@ class ModemManager:
         Args:
             port_device: Port to use
             command: AT command to send
-            callback: Function to call with response
+            callback: Optional function to call with response
             timeout: Response timeout in seconds
+
+        Returns:
+            concurrent.futures.Future with the response
         """
-        self.command_queue.put((port_device, command, callback, timeout))
+        future = self.dispatcher.submit(port_device, command, timeout)
+        if callback:
+
+            def on_done(f):
+                if not f.cancelled() and f.exception() is None:
+                    callback(f.result())
+
+            future.add_done_callback(on_done)
+        return future
+
+    def get_command_queue_stats(self):
+        """Kedalaman antrian dan waktu tunggu perintah per port"""
+        return self.dispatcher.stats()
 
     def detect_all_devices(self):
         """Deteksi semua perangkat secara paralel"""
         logger.info("Mendeteksi semua perangkat")
 
         # Deteksi port terlebih dahulu (sudah paralel di PortService)
-        self.port_service.detect_ports(max_workers=8)
+        self.port_service.detect_ports()
 
         # Kemudian deteksi SIM card pada port yang terdeteksi
-        available_ports = self.port_service.get_available_ports()
+        available_ports = list(self.port_service.list_available_ports().values())
         sim_count = self.sim_service.detect_simcards_from_ports(available_ports)
 
+        all_ports = list(self.port_service.list_all_ports().values())
         return {
             "ports": {
-                "all": self.port_service.get_all_ports(),
-                "connected": self.port_service.get_connected_ports(),
-                "disconnected": [
-                    p for p in self.port_service.get_all_ports() if not p.is_connected()
-                ],
+                "all": all_ports,
+                "connected": [p for p in all_ports if p.is_connected()],
+                "disconnected": [p for p in all_ports if not p.is_connected()],
             },
             "sim_cards": {
                 "count": sim_count,
@@ -99,6 +121,17 @@ class ModemManager:
             },
         }
 
+    def _check_available(self, port_device):
+        port = self.port_service.get_port(port_device)
+        if port is None:
+            logger.warning(f"Port {port_device} tidak ditemukan")
+            return False
+
+        if not port.is_available():
+            logger.warning(f"Port {port_device} tidak terhubung atau tidak diaktifkan")
+            return False
+        return True
+
     def send_at_command(self, port_device, command, timeout=1):
         """
         Kirim AT command ke port tertentu
@@ -111,64 +144,86 @@ class ModemManager:
         Returns:
             Respons dari modem atau None jika gagal
         """
-        if port_device not in self.port_service.ports:
-            logger.warning(f"Port {port_device} tidak ditemukan")
-            return None
-
-        port = self.port_service.ports[port_device]
-        if port.status != "connected" or not port.enabled:
-            logger.warning(f"Port {port_device} tidak terhubung atau tidak diaktifkan")
+        if not self._check_available(port_device):
             return None
 
         try:
-            logger.debug(f"Mengirim command '{command}' ke {port_device}")
-            ser = serial.Serial(port_device, 115200, timeout=timeout)
-            time.sleep(0.5)
-
-            # Reset buffer
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-
-            # Tambahkan AT di depan command jika tidak ada
-            if not command.upper().startswith("AT"):
-                command = "AT" + command
-
-            # Pastikan command diakhiri dengan \r\n
-            if not command.endswith("\r\n"):
-                command += "\r\n"
-
-            # Kirim command
-            ser.write(command.encode())
-            time.sleep(timeout)
-            response = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-
-            ser.close()
-            logger.debug(f"Respons dari {port_device}: {response}")
-            return response
+            # Argumen %-style: pesan hanya dirangkai jika DEBUG aktif
+            logger.debug(
+                "Mengirim command '%s' ke %s",
+                command,
+                port_device,
+                extra={"port": port_device, "command": command},
+            )
+            controller = self.port_service.port_controller
+            with TRACER.span("modem.send_at_command", port_device, command=command):
+                with controller.lease(port_device) as connection:
+                    result = controller.execute(connection, command, timeout)
+
+            if result is None:
+                return None
+            logger.debug(
+                "Respons dari %s (%.1fms): %s",
+                port_device,
+                result.latency * 1000,
+                result.text,
+                extra={
+                    "port": port_device,
+                    "command": result.command,
+                    "latency_ms": round(result.latency * 1000, 1),
+                    "status": result.final,
+                },
+            )
+            return result.text
         except Exception as e:
             logger.error(f"Error saat mengirim command ke {port_device}: {str(e)}")
             return None
 
-    def send_at_command_to_all(self, command, timeout=1):
+    def send_at_command_to_all(
+        self,
+        command,
+        timeout=1,
+        max_concurrency=None,
+        port_deadline=None,
+        deadline=None,
+    ):
         """
-        Kirim AT command ke semua port yang terhubung dan diaktifkan
+        Kirim AT command ke semua port yang terhubung dan diaktifkan secara paralel
 
         Args:
             command: AT command yang akan dikirim
             timeout: Waktu tunggu respons dalam detik
+            max_concurrency: Maksimal port bersamaan (default: config
+                fanout_max_concurrency)
+            port_deadline: Batas waktu per port (default: timeout + grace)
+            deadline: Batas waktu total; port yang belum selesai dibatalkan
 
         Returns:
-            Dict dengan port device sebagai key dan respons sebagai value
+            Iterator FanOutResult (value = respons), satu per port segera
+            setelah port tersebut selesai
+
+        Catatan: dulu method ini mengembalikan dict device_id -> respons.
+        Iterator hanya bisa dibaca sekali; untuk bentuk lama gunakan
+        {r.device_id: r.value for r in ...}.
         """
         logger.info(f"Mengirim command '{command}' ke semua port aktif")
-        available_ports = self.port_service.get_available_ports()
-        results = {}
-
-        for port in available_ports:
-            result = self.send_at_command(port.device, command, timeout)
-            results[port.device] = result
-
-        return results
+        return self._fan_out(
+            lambda device_id, cancel: self.send_at_command(device_id, command, timeout),
+            timeout,
+            max_concurrency,
+            port_deadline,
+            deadline,
+        )
+
+    def _fan_out(self, operation, timeout, max_concurrency, port_deadline, deadline):
+        available_ports = list(self.port_service.list_available_ports())
+        if max_concurrency is None:
+            max_concurrency = self.port_service.config["fanout_max_concurrency"]
+        if port_deadline is None:
+            port_deadline = timeout + PORT_DEADLINE_GRACE
+        return fan_out(
+            operation, available_ports, max_concurrency, port_deadline, deadline
+        )
 
     def broadcast_command(self, command, callback=None, timeout=1):
         """
@@ -182,23 +237,26 @@ class ModemManager:
         Returns:
             Future object that will contain results dict when done
         """
-        available_ports = self.port_service.get_available_ports()
+        available_ports = self.port_service.list_available_ports()
         results = {}
 
-        def process_port(port):
-            result = self.send_at_command(port.device, command, timeout)
+        def process_port(device_id):
+            result = self.send_at_command(device_id, command, timeout)
             with self.lock:
-                results[port.device] = result
+                results[device_id] = result
             if callback:
-                callback(port.device, result)
+                callback(device_id, result)
 
         # Submit all tasks
-        futures = [self.executor.submit(process_port, port) for port in available_ports]
+        futures = [
+            self.executor.submit(process_port, device_id)
+            for device_id in available_ports
+        ]
 
         # Return future that represents completion of all tasks
         return results, futures
 
-    def dial_ussd(self, port_device, ussd_code, timeout=10):
+    def dial_ussd(self, port_device, ussd_code, timeout=10, cancel=None):
         """
         Dial USSD code pada port tertentu
 
@@ -206,60 +264,102 @@ class ModemManager:
             port_device: Port untuk digunakan
             ussd_code: Kode USSD (contoh: *123#)
             timeout: Waktu tunggu respons dalam detik
+            cancel: threading.Event opsional untuk membatalkan penantian
 
         Returns:
             Respons dari modem atau None jika gagal
         """
         logger.info(f"Dialing USSD code {ussd_code} pada port {port_device}")
+        started = time.monotonic()
 
         # Format AT command untuk USSD
         ussd_command = f'AT+CUSD=1,"{ussd_code}",15'
 
-        response = self.send_at_command(port_device, ussd_command, timeout)
-
-        # Tunggu respons USSD (biasanya dikirim sebagai notifikasi tidak diminta)
-        if response and "OK" in response:
-            try:
-                ser = serial.Serial(port_device, 115200, timeout=timeout)
-                time.sleep(2)  # Berikan waktu lebih lama untuk respons USSD
-
-                ussd_response = ser.read(ser.in_waiting).decode(
-                    "utf-8", errors="ignore"
-                )
-                ser.close()
+        # Jika reader URC berjalan, daftarkan penantian +CUSD sebelum perintah
+        # dikirim agar balasan yang datang cepat tidak terlewat
+        controller = self.port_service.port_controller
+        channel = controller.get_channel(port_device)
+        waiter = channel.expect("+CUSD:") if channel else None
 
-                if "+CUSD:" in ussd_response:
-                    logger.debug(f"USSD response: {ussd_response}")
-                    return ussd_response
-                else:
-                    logger.warning(
-                        f"Tidak ada respons USSD dalam waktu {timeout} detik"
-                    )
-            except Exception as e:
-                logger.error(f"Error saat membaca respons USSD: {str(e)}")
+        response = None
+        try:
+            if waiter is not None:
+                response = self.send_at_command(port_device, ussd_command, timeout)
+                if not response or "OK" not in response:
+                    return response
+                # Tunggu respons USSD (dikirim sebagai notifikasi tidak diminta)
+                remaining = max(0.0, timeout - (time.monotonic() - started))
+                ussd_response = waiter.wait(remaining, cancel) or ""
+            else:
+                if not self._check_available(port_device):
+                    return None
+                # Satu lease untuk perintah dan penantian +CUSD: probe monitor
+                # di antaranya akan mereset buffer dan membuang URC
+                with controller.lease(port_device) as ser:
+                    if ser is None:
+                        return None
+                    result = controller.execute(ser, ussd_command, timeout)
+                    response = result.text if result else None
+                    if not response or "OK" not in response:
+                        return response
+                    if "+CUSD:" in response:
+                        # +CUSD datang dalam pembacaan yang sama dengan OK
+                        ussd_response = response
+                    else:
+                        remaining = max(0.0, timeout - (time.monotonic() - started))
+                        ussd_response = wait_for_urc(ser, "+CUSD:", remaining, cancel)
+
+            if "+CUSD:" in ussd_response:
+                USSD_LATENCY.labels(port_device).observe(time.monotonic() - started)
+                logger.debug(f"USSD response: {ussd_response}")
+                return ussd_response
+            USSD_FAILURES.labels(port_device).inc()
+            logger.warning(f"Tidak ada respons USSD dalam waktu {timeout} detik")
+        except Exception as e:
+            logger.error(f"Error saat membaca respons USSD: {str(e)}")
+        finally:
+            if waiter is not None:
+                channel.discard(waiter)
 
         return response
 
-    def dial_ussd_to_all(self, ussd_code, timeout=10):
+    def dial_ussd_to_all(
+        self,
+        ussd_code,
+        timeout=10,
+        max_concurrency=None,
+        port_deadline=None,
+        deadline=None,
+    ):
         """
-        Dial USSD code pada semua port yang terhubung dan diaktifkan
+        Dial USSD code pada semua port yang terhubung dan diaktifkan secara paralel
 
         Args:
             ussd_code: Kode USSD (contoh: *123#)
             timeout: Waktu tunggu respons dalam detik
+            max_concurrency: Maksimal port bersamaan (default: config
+                fanout_max_concurrency)
+            port_deadline: Batas waktu per port (default: timeout + grace)
+            deadline: Batas waktu total; port yang belum selesai dibatalkan
 
         Returns:
-            Dict dengan port device sebagai key dan respons sebagai value
+            Iterator FanOutResult (value = respons), satu per port segera
+            setelah port tersebut selesai
+
+        Catatan: dulu method ini mengembalikan dict device_id -> respons.
+        Iterator hanya bisa dibaca sekali; untuk bentuk lama gunakan
+        {r.device_id: r.value for r in ...}.
         """
         logger.info(f"Dialing USSD code {ussd_code} ke semua port aktif")
-        available_ports = self.port_service.get_available_ports()
-        results = {}
-
-        for port in available_ports:
-            result = self.dial_ussd(port.device, ussd_code, timeout)
-            results[port.device] = result
-
-        return results
+        return self._fan_out(
+            lambda device_id, cancel: self.dial_ussd(
+                device_id, ussd_code, timeout, cancel
+            ),
+            timeout,
+            max_concurrency,
+            port_deadline,
+            deadline,
+        )
 
     def enable_port(self, device_id):
         """Aktifkan port tertentu"""
@@ -275,22 +375,22 @@ class ModemManager:
 
     def get_port_status(self):
         """Dapatkan status semua port"""
-        ports = self.port_service.get_all_ports()
+        ports = self.port_service.list_all_ports()
         return {
-            port.device_id: {"enabled": port.enabled, "status": port.status}
-            for port in ports
+            device_id: {"enabled": port.active, "status": port.status}
+            for device_id, port in ports.items()
         }
 
     def get_single_port_status(self, port_device):
         """Dapatkan status port tertentu"""
         port = self.port_service.get_port(port_device)
         if port:
-            return {"enabled": port.enabled, "status": port.status}
+            return {"enabled": port.active, "status": port.status}
         else:
             logger.warning(f"Port {port_device} tidak ditemukan")
             return None
 
-    def check_balance(self, port_device, ussd_code="*123#", timeout=10):
+    def check_balance(self, port_device, ussd_code="*123#", timeout=10, refresh=False):
         """
         Cek pulsa pada port tertentu dengan kode USSD umum
 
@@ -298,12 +398,21 @@ class ModemManager:
             port_device: Port untuk digunakan
             ussd_code: Kode USSD untuk cek pulsa (default: *123#)
             timeout: Waktu tunggu respons dalam detik
+            refresh: Abaikan respons yang masih tersimpan di cache
 
         Returns:
             Respons dari modem atau None jika gagal
         """
+        if not refresh:
+            cached = self.sim_service.get_balance(port_device, ussd_code)
+            if cached is not None:
+                return cached
+
         logger.info(f"Memeriksa pulsa pada port {port_device} dengan kode {ussd_code}")
-        return self.dial_ussd(port_device, ussd_code, timeout)
+        response = self.dial_ussd(port_device, ussd_code, timeout)
+        if response and "+CUSD:" in response:
+            self.sim_service.set_balance(port_device, response, ussd_code)
+        return response
 
     def send_sms(self, port_device, phone_number, message, timeout=5):
         """
@@ -319,43 +428,117 @@ class ModemManager:
             True jika berhasil, False jika gagal
         """
         logger.info(f"Mengirim SMS ke {phone_number} dari port {port_device}")
+        return self._send_sms(port_device, phone_number, message, timeout) is not None
 
-        try:
-            # Atur mode teks
-            text_mode = self.send_at_command(port_device, "AT+CMGF=1", timeout)
-            if not text_mode or "OK" not in text_mode:
-                logger.error(f"Gagal mengatur text mode pada port {port_device}")
-                return False
-
-            # Atur nomor tujuan
-            ser = serial.Serial(port_device, 115200, timeout=timeout)
-            time.sleep(0.5)
-
-            ser.write(f'AT+CMGS="{phone_number}"\r'.encode())
-            time.sleep(1)
+    def _send_sms(self, port_device, phone_number, message, timeout=5):
+        """
+        Kirim satu SMS mode teks dalam satu lease
 
-            # Kirim pesan dan Ctrl+Z (26 in ASCII)
-            ser.write(f"{message}{chr(26)}".encode())
-            time.sleep(5)  # Berikan waktu lebih lama untuk pengiriman SMS
+        Returns:
+            Message reference dari +CMGS, atau None jika gagal
+        """
+        port = self.port_service.get_port(port_device)
+        if port is None or not port.is_available():
+            logger.warning(f"Port {port_device} tidak tersedia untuk SMS")
+            return None
 
-            response = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-            ser.close()
+        try:
+            controller = self.port_service.port_controller
+            with controller.lease(port_device) as ser:
+                if ser is None:
+                    return None
+
+                # Atur mode teks di lease yang sama agar tidak diubah pemakai
+                # port lain (misalnya pembacaan inbox mode PDU)
+                text_mode = controller.execute(ser, "AT+CMGF=1", timeout)
+                if text_mode is None or not text_mode.ok:
+                    logger.error(f"Gagal mengatur text mode pada port {port_device}")
+                    return None
+
+                # Atur nomor tujuan lalu tunggu prompt "> "
+                prompt = controller.execute(ser, f'AT+CMGS="{phone_number}"\r', timeout)
+                if prompt is None or not prompt.is_prompt:
+                    logger.warning(
+                        f"Prompt SMS tidak diterima: {prompt.text if prompt else None}"
+                    )
+                    if prompt is not None and prompt.timed_out:
+                        # Batalkan input SMS yang mungkin masih terbuka (ESC)
+                        controller.send_payload(ser, chr(27), timeout, "AT+CMGS")
+                    return None
+
+                # Kirim pesan dan Ctrl+Z (26 in ASCII), tunggu +CMGS dan OK
+                result = controller.send_payload(
+                    ser, f"{message}{chr(26)}", timeout, "AT+CMGS"
+                )
+                response = result.text if result else ""
 
-            if "+CMGS:" in response:
+            match = CMGS_REFERENCE_PATTERN.search(response)
+            if match:
                 logger.debug(f"SMS berhasil dikirim: {response}")
-                return True
-            else:
-                logger.warning(f"SMS gagal dikirim: {response}")
-                return False
+                return int(match.group(1))
+            logger.warning(f"SMS gagal dikirim: {response}")
+            return None
 
         except Exception as e:
             logger.error(f"Error saat mengirim SMS: {str(e)}")
+            return None
+
+    def send_bulk_sms(self, messages):
+        """
+        Kirim banyak SMS, disebar ke semua SIM tersedia dengan batas laju per SIM
+
+        Args:
+            messages: Iterable (nomor tujuan, isi pesan)
+
+        Returns:
+            SmsBatch untuk memantau progres (progress(), wait(), jobs)
+        """
+        return self.sms_sender.send_bulk(messages)
+
+    def get_sms_sender_stats(self):
+        """Counter pengiriman SMS massal (terkirim, gagal, retry, throughput)"""
+        return self.sms_sender.stats()
+
+    def start_sms_ingestion(self):
+        """Mulai menerima SMS masuk dari semua modem ke database lokal"""
+        if self.sms_ingestion is None:
+            config = self.port_service.config
+            self.sms_store = SmsStore(
+                config["sms_db_file"],
+                config["sms_batch_size"],
+                config["sms_flush_interval"],
+                config["sms_part_timeout"],
+            )
+            self.sms_ingestion = SmsIngestion(
+                self.port_service,
+                self.sms_store,
+                self.sim_service,
+                config["sms_poll_interval"],
+            )
+        return self.sms_ingestion.start()
+
+    def stop_sms_ingestion(self):
+        """Hentikan penerimaan SMS (SMS yang sudah dibaca tetap disimpan)"""
+        if self.sms_ingestion is None:
             return False
+        return self.sms_ingestion.stop()
+
+    def get_received_sms(self, iccid=None, msisdn=None, sender=None, limit=100):
+        """
+        SMS masuk yang tersimpan, terbaru lebih dulu
+
+        Returns:
+            List dict (sender, text, sent_at, received_at, iccid, msisdn, ...)
+        """
+        if self.sms_store is None:
+            return []
+        return self.sms_store.query(iccid, msisdn, sender, limit=limit)
 
     def __del__(self):
         """Cleanup when object is destroyed"""
-        self.running = False
-        if hasattr(self, "command_thread") and self.command_thread.is_alive():
-            self.command_thread.join(2.0)  # Wait up to 2 seconds
+        if hasattr(self, "dispatcher"):
+            self.dispatcher.shutdown()
+        if hasattr(self, "sms_sender"):
+            self.sms_sender.shutdown()
         if hasattr(self, "executor"):
             self.executor.shutdown(wait=False)
@@ -1,5 +1,3 @@
-import json
-import os
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
@@ -7,7 +5,14 @@ from concurrent.futures import ThreadPoolExecutor
 import serial
 import serial.tools.list_ports
 
+from src.services.identity_index import get_identity_index
+from src.utils.atquery import query_modem
+from src.utils.atresponse import send_and_read
+from src.utils.baud_cache import BaudRateCache
+from src.utils.identity import modem_identity
 from src.utils.logging import get_logger
+from src.utils.preference_store import PreferenceStore
+from src.utils.tracing import TRACER
 
 from .serialport import SerialPort
 
@@ -16,13 +21,23 @@ logger = get_logger("models.portmanager")
 
 
 class PortManager:
-    def __init__(self, filters=None, config_file="modem_config.json"):
+    def __init__(
+        self,
+        filters=None,
+        config_file="modem_config.json",
+        baud_cache_file="baud_cache.json",
+        identity_file="modem_identity.json",
+        save_delay=0.5,
+    ):
         """
         Inisialisasi Port Manager dengan filter opsional.
 
         Args:
             filters: List string deskripsi untuk filter (default: None)
             config_file: File konfigurasi untuk menyimpan status aktif/nonaktif port
+            baud_cache_file: File cache baud rate terakhir yang berhasil per modem
+            identity_file: File indeks identitas modem (USB serial/lokasi/IMEI)
+            save_delay: Jendela penggabungan penulisan preferensi (detik)
         """
         self.ports = {}
         self.default_filters = [
@@ -36,30 +51,54 @@ class PortManager:
         ]
         self.custom_filters = filters
         self.config_file = config_file
+        self.preferences = PreferenceStore(
+            config_file, self._preference_snapshot, save_delay
+        )
         self.user_preferences = self._load_preferences()
+        self.baud_cache = BaudRateCache(baud_cache_file)
+        self.identity_index = get_identity_index(identity_file)
         logger.info("PortManager initialized")
 
     def _load_preferences(self):
         """Muat preferensi pengguna dari file konfigurasi"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, "r") as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Gagal memuat preferensi: {str(e)}")
-        return {"enabled_ports": [], "disabled_ports": []}
+        return self.preferences.load(
+            {
+                "enabled_ports": [],
+                "disabled_ports": [],
+                "enabled_identities": [],
+                "disabled_identities": [],
+            }
+        )
 
-    def _save_preferences(self):
-        """Simpan preferensi pengguna ke file konfigurasi"""
-        pref = {
-            "enabled_ports": [p.device for p in self.ports.values() if p.enabled],
-            "disabled_ports": [p.device for p in self.ports.values() if not p.enabled],
+    def _preference_snapshot(self):
+        ports = list(self.ports.values())
+        return {
+            "enabled_ports": [p.device for p in ports if p.enabled],
+            "disabled_ports": [p.device for p in ports if not p.enabled],
+            "enabled_identities": [
+                p.identity for p in ports if p.identity and p.enabled
+            ],
+            "disabled_identities": [
+                p.identity for p in ports if p.identity and not p.enabled
+            ],
         }
-        try:
-            with open(self.config_file, "w") as f:
-                json.dump(pref, f, indent=4)
-        except Exception as e:
-            logger.error(f"Gagal menyimpan preferensi: {str(e)}")
+
+    def _save_preferences(self):
+        """
+        Jadwalkan penyimpanan preferensi
+
+        Perubahan beruntun digabung menjadi satu penulisan atomik setelah
+        jendela save_delay; lihat PreferenceStore.
+        """
+        self.preferences.schedule()
+
+    def flush_preferences(self):
+        """Tulis preferensi yang tertunda sekarang juga"""
+        return self.preferences.flush()
+
+    def close(self):
+        """Simpan preferensi tertunda sebelum PortManager dibuang"""
+        self.preferences.close()
 
     def detect_ports(self, preserve_preferences=True, max_workers=10):
         """
@@ -69,9 +108,12 @@ class PortManager:
 
         # Simpan status enabled sebelumnya
         previous_enabled_status = {}
+        previous_identity_status = {}
         if preserve_preferences:
             for device, port in self.ports.items():
                 previous_enabled_status[device] = port.enabled
+                if port.identity:
+                    previous_identity_status[port.identity] = port.enabled
 
         # Reset ports dict but keep preferences
         self.ports = {}
@@ -87,21 +129,37 @@ class PortManager:
         lock = threading.Lock()
 
         def verify_port(port):
-            connection_status = self._verify_connection(port.device)
+            baudrate = self._verify_connection(port.device, port)
+            identity = modem_identity(port)
+            if identity:
+                self.identity_index.bind(identity, port.device)
 
-            # Tentukan status enabled berdasarkan preferensi sebelumnya
+            # Tentukan status enabled berdasarkan preferensi sebelumnya;
+            # preferensi per identitas tetap berlaku walau nama port berubah
             enabled = True
-            if preserve_preferences and port.device in previous_enabled_status:
+            if preserve_preferences and identity in previous_identity_status:
+                enabled = previous_identity_status[identity]
+            elif preserve_preferences and port.device in previous_enabled_status:
                 enabled = previous_enabled_status[port.device]
+            elif identity and identity in self.user_preferences.get(
+                "disabled_identities", []
+            ):
+                enabled = False
+            elif identity and identity in self.user_preferences.get(
+                "enabled_identities", []
+            ):
+                enabled = True
             elif port.device in self.user_preferences["disabled_ports"]:
                 enabled = False
 
             serial_port = SerialPort(
                 port.device,
                 port.name,
-                "connected" if connection_status else "disconnected",
+                "connected" if baudrate else "disconnected",
                 enabled,
             )
+            serial_port.baudrate = baudrate
+            serial_port.identity = identity
 
             # Menggunakan lock untuk menghindari race condition saat menulis ke dict
             with lock:
@@ -165,49 +223,68 @@ class PortManager:
 
         return filtered_ports
 
-    def _verify_connection(self, port_name):
+    def _verify_connection(self, port_name, port_info=None):
         """
         Verifikasi koneksi dengan port menggunakan AT command.
 
+        Baud rate dari cache dicoba terlebih dahulu; jika gagal cache
+        dihapus dan dilanjutkan dengan autobaud.
+
         Args:
             port_name: Nama port yang akan diverifikasi
+            port_info: ListPortInfo dari comports() untuk key cache (opsional)
 
         Returns:
-            bool: True jika terhubung, False jika tidak
+            int: Baud rate yang berhasil, atau None jika tidak terhubung
         """
         baud_rates = [115200, 9600, 57600, 38400, 19200]  # Prioritaskan baud yang umum
-        at_commands = [b"AT\r\n"]  # Mulai dengan AT command paling dasar
+
+        cached_baud = self.baud_cache.get(port_name, port_info)
+        if cached_baud:
+            if self._probe_baud(port_name, cached_baud):
+                logger.info(
+                    f"Port {port_name} terhubung dengan baud {cached_baud} (cache)"
+                )
+                return cached_baud
+            self.baud_cache.invalidate(port_name, port_info)
+            baud_rates = [b for b in baud_rates if b != cached_baud]
 
         for baud in baud_rates:
-            try:
-                logger.debug(f"Mencoba port {port_name} dengan baud rate {baud}")
+            if self._probe_baud(port_name, baud):
+                logger.info(f"Port {port_name} terhubung dengan baud {baud}")
+                self.baud_cache.set(port_name, baud, port_info)
+                return baud
+
+        logger.debug(f"Port {port_name} tidak merespons AT command")
+        return None
+
+    def _probe_baud(self, port_name, baud):
+        """Kirim AT pada satu baud rate, True jika modem menjawab OK"""
+        at_command = "AT"  # Mulai dengan AT command paling dasar
+        try:
+            logger.debug(f"Mencoba port {port_name} dengan baud rate {baud}")
+            with TRACER.span("serial.open", port_name, baud=baud):
                 ser = serial.Serial(port_name, baud, timeout=1)
+            with TRACER.span("serial.settle", port_name):
                 time.sleep(0.5)
 
-                # Reset buffer
+            # Reset buffer
+            with TRACER.span("serial.reset", port_name):
                 ser.reset_input_buffer()
                 ser.reset_output_buffer()
 
-                # Kirim AT command
-                ser.write(at_commands[0])
-                time.sleep(0.5)
-                response = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-
-                # Tutup koneksi
-                ser.close()
+            # Kirim AT command dan tunggu result code final
+            result = send_and_read(ser, at_command, 0.5)
 
-                # Periksa respons
-                if "OK" in response:
-                    logger.info(f"Port {port_name} terhubung dengan baud {baud}")
-                    return True
+            # Tutup koneksi
+            ser.close()
 
-            except Exception as e:
-                logger.debug(
-                    f"Gagal koneksi ke {port_name} dengan baud {baud}: {str(e)}"
-                )
+            # Periksa respons
+            return result.ok
 
-        logger.debug(f"Port {port_name} tidak merespons AT command")
-        return False
+        except Exception as e:
+            logger.debug(f"Gagal koneksi ke {port_name} dengan baud {baud}: {str(e)}")
+            return False
 
     def enable_port(self, device):
         """Aktifkan port untuk digunakan"""
@@ -229,6 +306,22 @@ class PortManager:
         logger.warning(f"Port {device} tidak ditemukan")
         return False
 
+    def enable_all_ports(self):
+        """Aktifkan semua port (satu kali penulisan preferensi)"""
+        for port in self.ports.values():
+            port.enabled = True
+        logger.info(f"{len(self.ports)} port diaktifkan")
+        self._save_preferences()
+        return len(self.ports)
+
+    def disable_all_ports(self):
+        """Nonaktifkan semua port (satu kali penulisan preferensi)"""
+        for port in self.ports.values():
+            port.enabled = False
+        logger.info(f"{len(self.ports)} port dinonaktifkan")
+        self._save_preferences()
+        return len(self.ports)
+
     def get_available_ports(self):
         """Mendapatkan port yang terhubung dan diaktifkan"""
         available = [
@@ -267,33 +360,22 @@ class PortManager:
         logger.info(f"Mendeteksi SIM card pada port {port_device}")
 
         try:
-            # Gunakan baudrate yang sudah diketahui berhasil
-            ser = serial.Serial(port_device, 115200, timeout=2)
-            time.sleep(0.5)
-
-            # Reset buffer
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-
-            # Deteksi ICCID
-            ser.write(b"AT+CCID\r\n")
-            time.sleep(0.5)
-            response = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-            iccid = self._parse_iccid(response)
-
-            # Deteksi nomor telepon (MSISDN)
-            ser.write(b"AT+CNUM\r\n")
-            time.sleep(0.5)
-            response = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-            msisdn = self._parse_msisdn(response)
-
-            # Deteksi kekuatan sinyal
-            ser.write(b"AT+CSQ\r\n")
-            time.sleep(0.5)
-            response = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-            signal = self._parse_signal_strength(response)
+            # Gunakan baudrate yang sudah diketahui berhasil; semua query dalam
+            # satu sesi, tiap perintah dikirim begitu respons sebelumnya selesai
+            with serial.Serial(port_device, port.baudrate or 115200, timeout=2) as ser:
+                ser.reset_input_buffer()
+                ser.reset_output_buffer()
+                result = query_modem(
+                    lambda command, timeout: send_and_read(ser, command, timeout),
+                    ("iccid", "msisdn", "signal"),
+                    combined=True,
+                    timeout=2,
+                    required=("iccid",),
+                )
 
-            ser.close()
+            iccid = result.get("iccid")
+            msisdn = result.get("msisdn")
+            signal = result.get("signal", 0)
 
             if iccid:
                 # Update status port
@@ -330,59 +412,3 @@ class PortManager:
 
         logger.info(f"Deteksi SIM card selesai. Ditemukan {len(sim_cards)} SIM card")
         return sim_cards
-
-    def _parse_iccid(self, response):
-        """Parse ICCID dari respons AT+CCID"""
-        if not response:
-            return None
-
-        # Format respons bervariasi antar modem
-        # +CCID: 8962xxxxxxxxxx
-        # 8962xxxxxxxxxx
-        lines = response.strip().split("\n")
-        for line in lines:
-            line = line.strip()
-            if "+CCID:" in line:
-                parts = line.split("+CCID:")
-                if len(parts) > 1:
-                    return parts[1].strip()
-            elif line.startswith("8962") or line.startswith(
-                "8901"
-            ):  # Awalan ICCID umum
-                return line.strip()
-        return None
-
-    def _parse_msisdn(self, response):
-        """Parse MSISDN dari respons AT+CNUM"""
-        if not response:
-            return None
-
-        # +CNUM: "","08xxxxxxxxx",129
-        lines = response.strip().split("\n")
-        for line in lines:
-            if "+CNUM:" in line:
-                parts = line.split(",")
-                if len(parts) > 1:
-                    number = parts[1].replace('"', "").strip()
-                    return number
-        return None
-
-    def _parse_signal_strength(self, response):
-        """Parse kekuatan sinyal dari respons AT+CSQ"""
-        if not response:
-            return 0
-
-        # +CSQ: 21,0
-        lines = response.strip().split("\n")
-        for line in lines:
-            if "+CSQ:" in line:
-                parts = line.split(":")
-                if len(parts) > 1:
-                    values = parts[1].strip().split(",")
-                    if values:
-                        try:
-                            signal = int(values[0])
-                            return signal
-                        except ValueError:
-                            pass
-        return 0
@@ -6,6 +6,8 @@ class SerialPort:
         self.enabled = enabled  # Apakah port diaktifkan oleh pengguna
         self.last_used = None  # Kapan terakhir digunakan
         self.simcard = None  # Informasi SIM card
+        self.baudrate = None  # Baud rate yang berhasil saat verifikasi
+        self.identity = None  # Identitas fisik modem (USB serial/lokasi/IMEI)
 
     def __repr__(self):
         status_text = f"{self.status}"
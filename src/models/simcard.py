@@ -18,19 +18,25 @@ class SimCard:
         self.at = ATCommand(port_connection)
 
     def check_iccid(self):
-        """Mengambil ICCID dari perintah AT"""
-        response = self.at.send("AT+ICCID")
-        if response:
-            self.iccid = self.at.parse_response(response, "iccid")
+        """Mengambil ICCID dari perintah AT (varian vendor dicoba berurutan)"""
+        result = self.at.query(["iccid"])
+        if result is not None and "iccid" in result:
+            self.iccid = result["iccid"]
             self.last_update = datetime.now()
             logger.info(f"ICCID diperbarui: {self.iccid}")
         return self.iccid
 
     def check_info(self):
         """Mengambil info MSISDN, Balance, dan Status Aktif"""
+        # ICCID dan MSISDN dibaca dalam satu sesi sebelum USSD
+        result = self.at.query(["iccid", "msisdn"])
+        if result is not None:
+            self.iccid = result.get("iccid", self.iccid)
+            self.msisdn = result.get("msisdn", self.msisdn)
+
         response = self.at.send("ATD*185#")
         if response:
-            self.msisdn = self.at.parse_response(response, "msisdn")
+            self.msisdn = self.at.parse_response(response, "msisdn") or self.msisdn
             self.balance = self.at.parse_response(response, "balance")
             self.active_until = self.at.parse_response(response, "active_until")
             self.last_update = datetime.now()
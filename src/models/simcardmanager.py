@@ -1,6 +1,7 @@
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+from src.services.sim_cache import IDENTITY, SIGNAL, SimCache
 from src.utils.logging import get_logger
 
 from .simcard import SimCard
@@ -10,11 +11,24 @@ logger = get_logger("models.simcardmanager")
 
 
 class SimCardManager:
-    def __init__(self):
+    def __init__(self, ttls=None):
+        """
+        Args:
+            ttls: Dict TTL cache per kelompok field (lihat SimCache)
+        """
         self.simcards = {}
+        # Port yang SIM-nya masih segar di cache tidak dideteksi ulang
+        self.cache = SimCache(ttls)
 
-    def update_from_portmanager(self, port_manager, max_workers=8):
-        """Update SIM cards dari port manager secara paralel"""
+    def update_from_portmanager(self, port_manager, max_workers=8, refresh=False):
+        """
+        Update SIM cards dari port manager secara paralel
+
+        Args:
+            port_manager: PortManager sumber port
+            max_workers: Jumlah thread
+            refresh: Abaikan cache dan deteksi ulang semua port
+        """
         logger.info("Memperbarui database SIM card...")
 
         # Deteksi SIM cards dari semua port secara paralel
@@ -22,13 +36,29 @@ class SimCardManager:
         updated_count = 0
         lock = threading.Lock()
 
+        # Port yang hilang dianggap dicabut: SIM-nya dibaca ulang saat kembali
+        available = {port.device for port in available_ports}
+        for sim in self.list_simcards():
+            if sim.port_device is not None and sim.port_device not in available:
+                self.invalidate(sim.port_device)
+
         def process_port(port):
             nonlocal updated_count
+            if refresh:
+                self.cache.invalidate(port.device)
+            if not self.cache.stale_groups(port.device, (IDENTITY, SIGNAL)):
+                with lock:
+                    updated_count += 1
+                return
+
+            # detect_simcard membaca ICCID, MSISDN dan sinyal sekaligus
             sim_info = port_manager.detect_simcard(port.device)
             if sim_info and "iccid" in sim_info:
                 iccid = sim_info["iccid"]
                 msisdn = sim_info["msisdn"] or "Unknown"
                 signal = sim_info["signal"] or 0
+                self.cache.update(port.device, IDENTITY, iccid=iccid, msisdn=msisdn)
+                self.cache.update(port.device, SIGNAL, signal=signal)
 
                 with lock:
                     # Perbarui atau tambahkan SIM card dengan thread-safe approach
@@ -50,11 +80,27 @@ class SimCardManager:
         logger.info(f"Database SIM card diperbarui. {updated_count} SIM card aktif")
         return updated_count
 
+    def invalidate(self, port_device=None):
+        """
+        Hapus cache SIM (misalnya setelah SIM diganti atau port dicolok ulang)
+
+        Args:
+            port_device: Port yang dihapus cache-nya (None = semua port)
+        """
+        if port_device is None:
+            self.cache.clear()
+            return
+        self.cache.invalidate(port_device)
+        for sim in self.list_simcards():
+            if sim.port_device == port_device:
+                sim.port_device = None
+
     def add_simcard(self, iccid, msisdn, signal):
         sim = SimCard(iccid, msisdn, signal)
         self.simcards[iccid] = sim
 
     def get_simcard_info(self, iccid):
+        """Data SIM dari cache, tanpa mengirim perintah ke modem"""
         return self.simcards.get(iccid)
 
     def list_simcards(self):
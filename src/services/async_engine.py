@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import time
+
+import serial
+
+from src.controllers.port_controller import PortController
+from src.models.devices.port import SerialPort
+from src.utils.atresponse import ATResponse, find_final_result, format_command
+from src.utils.metrics import record_command
+
+logger = logging.getLogger(__name__)
+
+# Batas buffer per port saat tidak ada perintah yang menunggu (URC, noise)
+MAX_IDLE_BUFFER = 64 * 1024
+# Interval polling untuk platform tanpa file descriptor (Windows)
+POLL_INTERVAL = 0.01
+
+
+class AsyncModemTransport:
+    """Transport asyncio non-blocking untuk satu port serial"""
+
+    def __init__(self, device_id, baudrate=115200):
+        self.device_id = device_id
+        self.baudrate = baudrate
+        self.serial = None
+        self._fd = None
+        self._poll_task = None
+        self._buffer = bytearray()
+        self._waiter = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_open(self):
+        return self.serial is not None and self.serial.is_open
+
+    async def open(self, settle=0.2):
+        """
+        Membuka port dalam mode non-blocking dan mendaftarkannya ke event loop
+
+        Pada POSIX pembacaan memakai loop.add_reader pada file descriptor,
+        sedangkan pada platform tanpa fd (Windows) memakai polling ringan.
+        """
+        loop = asyncio.get_running_loop()
+        self.serial = serial.Serial(self.device_id, baudrate=self.baudrate, timeout=0)
+
+        try:
+            self._fd = self.serial.fileno()
+        except (AttributeError, OSError, ValueError):
+            self._fd = None
+
+        if self._fd is not None:
+            loop.add_reader(self._fd, self._on_readable)
+        else:
+            self._poll_task = loop.create_task(self._poll_loop())
+
+        # Tunggu modem stabil tanpa memblokir event loop
+        await asyncio.sleep(settle)
+        logger.debug(f"Async transport opened for {self.device_id}")
+
+    async def _poll_loop(self):
+        while self.is_open:
+            self._on_readable()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def _on_readable(self):
+        """Callback event loop saat ada byte masuk"""
+        try:
+            data = self.serial.read(self.serial.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self._fail(e)
+            return
+
+        if not data:
+            return
+
+        self._buffer.extend(data)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            final = find_final_result(self._buffer.decode("utf-8", errors="ignore"))
+            if final is not None:
+                waiter.set_result(final)
+        elif len(self._buffer) > MAX_IDLE_BUFFER:
+            del self._buffer[:-MAX_IDLE_BUFFER]
+
+    def _fail(self, error):
+        logger.debug(f"Async transport {self.device_id} failed: {error}")
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(serial.SerialException(str(error)))
+        self.close()
+
+    async def send_command(self, command, timeout=1):
+        """
+        Mengirim perintah AT dan menunggu result code final secara async
+
+        Returns:
+            ATResponse
+        """
+        async with self._lock:
+            if not self.is_open:
+                raise serial.SerialException(f"Port {self.device_id} is not open")
+
+            command = format_command(command)
+            self._buffer.clear()
+            self.serial.reset_input_buffer()
+            self._waiter = asyncio.get_running_loop().create_future()
+
+            started = time.monotonic()
+            self.serial.write(command.encode())
+            try:
+                final = await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                final = None
+            finally:
+                self._waiter = None
+
+            text = self._buffer.decode("utf-8", errors="ignore")
+            self._buffer.clear()
+            return ATResponse(
+                command.strip(), text, final, time.monotonic() - started, final is None
+            )
+
+    def close(self):
+        """Melepas reader dari event loop dan menutup port"""
+        if self._fd is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._fd)
+            except (RuntimeError, ValueError):
+                pass
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except Exception as e:
+                logger.debug(f"Error closing {self.device_id}: {e}")
+
+
+class AsyncModemEngine:
+    """Engine I/O modem berbasis asyncio untuk ratusan port dalam satu event loop"""
+
+    def __init__(self, config_file="config.json", max_concurrency=None):
+        """
+        Inisialisasi engine async
+
+        Args:
+            config_file: File konfigurasi
+            max_concurrency: Batas operasi port yang berjalan bersamaan
+                (default: config async_max_concurrency atau 256)
+        """
+        self.port_controller = PortController(config_file)
+        self.max_concurrency = max_concurrency or self.config.get(
+            "async_max_concurrency", 256
+        )
+        self.ports = {}  # Dictionary of SerialPort objects
+        self.transports = {}
+        self._opening = {}
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        logger.info(
+            f"AsyncModemEngine initialized (concurrency={self.max_concurrency})"
+        )
+
+    @property
+    def config(self):
+        """Snapshot konfigurasi bersama (ikut berubah saat hot-reload)"""
+        return self.port_controller.config
+
+    async def _get_transport(self, device_id):
+        transport = self.transports.get(device_id)
+        if transport is not None and transport.is_open:
+            return transport
+
+        # Hindari membuka port yang sama dua kali secara bersamaan
+        opening = self._opening.get(device_id)
+        if opening is None:
+            opening = asyncio.ensure_future(self._open_transport(device_id))
+            self._opening[device_id] = opening
+        try:
+            return await asyncio.shield(opening)
+        finally:
+            self._opening.pop(device_id, None)
+
+    async def _open_transport(self, device_id):
+        transport = AsyncModemTransport(device_id, self.config["baudrate"])
+        await transport.open()
+        self.transports[device_id] = transport
+        return transport
+
+    def _drop_transport(self, device_id):
+        transport = self.transports.pop(device_id, None)
+        if transport is not None:
+            transport.close()
+
+    async def send_command(self, device_id, command, timeout=None):
+        """
+        Mengirim perintah AT ke port tertentu
+
+        Returns:
+            ATResponse, atau None jika port tidak bisa dibuka / error
+        """
+        timeout = self.config["timeout"] if timeout is None else timeout
+        async with self._semaphore:
+            try:
+                transport = await self._get_transport(device_id)
+                result = await transport.send_command(command, timeout)
+            except (serial.SerialException, OSError) as e:
+                logger.debug(f"Cannot send command to {device_id}: {str(e)}")
+                self._drop_transport(device_id)
+                return None
+
+        record_command(device_id, result, len(format_command(command)))
+        logger.debug(
+            "Command: %s on %s, Latency: %.1fms, Final: %s",
+            result.command,
+            device_id,
+            result.latency * 1000,
+            result.final,
+            extra={
+                "port": device_id,
+                "command": result.command,
+                "latency_ms": round(result.latency * 1000, 1),
+                "status": result.final,
+            },
+        )
+        return result
+
+    async def detect_ports(self):
+        """Mendeteksi dan memverifikasi semua port secara async"""
+        logger.info("Starting async port detection")
+        system_ports = await asyncio.to_thread(self.port_controller.list_system_ports)
+        candidates = [
+            p for p in system_ports if self.port_controller.is_candidate_port(p)
+        ]
+
+        async def verify_port(port_info):
+            port = SerialPort(port_info.device, port_info.description)
+            previous = self.ports.get(port_info.device)
+            if previous is not None:
+                port.set_active(previous.active)
+
+            result = await self.send_command(port_info.device, "AT")
+            port.set_status("connected" if result and result.ok else "disconnected")
+            return port
+
+        verified = await asyncio.gather(*(verify_port(p) for p in candidates))
+        self.ports = {port.device_id: port for port in verified}
+
+        # Tutup transport port yang sudah hilang
+        for device_id in list(self.transports):
+            if device_id not in self.ports:
+                self._drop_transport(device_id)
+
+        connected_count = sum(1 for p in self.ports.values() if p.is_connected())
+        logger.info(
+            f"Async port detection complete: {connected_count}/{len(self.ports)} connected"
+        )
+        return self.ports
+
+    async def broadcast_command(self, command, device_ids=None, timeout=None):
+        """
+        Mengirim perintah AT ke banyak port secara bersamaan
+
+        Args:
+            command: Perintah AT
+            device_ids: Daftar port (default: semua port yang tersedia)
+            timeout: Batas waktu respons per port
+
+        Returns:
+            Dict device_id -> ATResponse (atau None jika gagal)
+        """
+        if device_ids is None:
+            device_ids = [d for d, p in self.ports.items() if p.is_available()]
+
+        results = await asyncio.gather(
+            *(self.send_command(d, command, timeout) for d in device_ids)
+        )
+        return dict(zip(device_ids, results))
+
+    async def close(self):
+        """Menutup semua transport"""
+        for device_id in list(self.transports):
+            self._drop_transport(device_id)
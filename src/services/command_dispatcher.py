@@ -0,0 +1,156 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class PortCommandWorker:
+    """Worker untuk satu port: antrian terbatas, perintah dieksekusi berurutan"""
+
+    def __init__(self, device_id, execute, max_queue_size=32):
+        """
+        Args:
+            device_id: Port yang dilayani worker ini
+            execute: Fungsi (device_id, command, timeout) -> respons
+            max_queue_size: Kapasitas antrian perintah
+        """
+        self.device_id = device_id
+        self._execute = execute
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.running = True
+
+        # Statistik antrian
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self._stats_lock = threading.Lock()
+
+        self.thread = threading.Thread(
+            target=self._run, name=f"cmd-{device_id}", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, command, timeout=1):
+        """
+        Memasukkan perintah ke antrian port
+
+        Returns:
+            concurrent.futures.Future berisi respons. Jika antrian penuh,
+            Future langsung berisi exception queue.Full.
+        """
+        future = Future()
+        try:
+            self.queue.put_nowait((command, timeout, future, time.monotonic()))
+        except queue.Full as e:
+            logger.warning(f"Command queue for {self.device_id} is full")
+            future.set_exception(e)
+        return future
+
+    def _run(self):
+        while self.running:
+            try:
+                item = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if item is None:
+                self.queue.task_done()
+                break
+
+            command, timeout, future, enqueued = item
+            wait = time.monotonic() - enqueued
+            with self._stats_lock:
+                self.last_wait = wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_wait += wait
+                self.processed += 1
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._execute(self.device_id, command, timeout))
+                except Exception as e:
+                    logger.error(f"Error executing command on {self.device_id}: {e}")
+                    future.set_exception(e)
+            self.queue.task_done()
+
+    def stats(self):
+        """Kedalaman antrian dan waktu tunggu perintah di port ini"""
+        with self._stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "processed": self.processed,
+                "avg_wait": self.total_wait / self.processed if self.processed else 0.0,
+                "max_wait": self.max_wait,
+                "last_wait": self.last_wait,
+            }
+
+    def stop(self, timeout=2.0):
+        """Menghentikan worker; perintah yang belum jalan dibatalkan"""
+        self.running = False
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[2].cancel()
+            self.queue.task_done()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+
+class CommandDispatcher:
+    """Multiplexer perintah: satu worker dan satu antrian untuk setiap port"""
+
+    def __init__(self, execute, max_queue_size=32):
+        """
+        Args:
+            execute: Fungsi (device_id, command, timeout) -> respons
+            max_queue_size: Kapasitas antrian per port
+        """
+        self._execute = execute
+        self.max_queue_size = max_queue_size
+        self.workers = {}
+        self.lock = threading.Lock()
+
+    def _get_worker(self, device_id):
+        with self.lock:
+            worker = self.workers.get(device_id)
+            if worker is None:
+                worker = PortCommandWorker(
+                    device_id, self._execute, self.max_queue_size
+                )
+                self.workers[device_id] = worker
+            return worker
+
+    def submit(self, device_id, command, timeout=1):
+        """Kirim perintah ke antrian port; perintah antar port berjalan paralel"""
+        return self._get_worker(device_id).submit(command, timeout)
+
+    def stats(self):
+        """Statistik antrian untuk setiap port"""
+        with self.lock:
+            workers = list(self.workers.values())
+        return {worker.device_id: worker.stats() for worker in workers}
+
+    def remove(self, device_id):
+        """Hentikan worker port tertentu (misalnya saat port dicabut)"""
+        with self.lock:
+            worker = self.workers.pop(device_id, None)
+        if worker is not None:
+            worker.stop()
+
+    def shutdown(self):
+        """Hentikan semua worker"""
+        with self.lock:
+            workers = list(self.workers.values())
+            self.workers = {}
+        for worker in workers:
+            worker.stop()
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Waktu tambahan di atas timeout perintah untuk membuka/meminjam koneksi
+PORT_DEADLINE_GRACE = 2
+
+# Jeda cek deadline selama ada port yang sudah di-submit tapi belum mulai
+START_POLL_INTERVAL = 0.05
+
+
+class FanOutResult:
+    """Hasil operasi fan-out untuk satu port"""
+
+    def __init__(
+        self,
+        device_id,
+        value=None,
+        error=None,
+        elapsed=0.0,
+        timed_out=False,
+        cancelled=False,
+    ):
+        self.device_id = device_id
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+        self.timed_out = timed_out  # Melewati deadline port atau deadline global
+        self.cancelled = cancelled  # Tidak sempat dijalankan sebelum deadline global
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out and not self.cancelled
+
+    def __repr__(self):
+        return (
+            f"FanOutResult({self.device_id}, ok={self.ok}, "
+            f"elapsed={self.elapsed * 1000:.1f}ms, timed_out={self.timed_out}, "
+            f"cancelled={self.cancelled})"
+        )
+
+
+def fan_out(
+    operation, device_ids, max_concurrency=16, port_deadline=None, deadline=None
+):
+    """
+    Menjalankan operasi ke banyak port secara paralel dan mengembalikan hasil
+    secara streaming, satu per port segera setelah port tersebut selesai
+
+    Args:
+        operation: Fungsi (device_id, cancel) -> nilai; cancel adalah
+            threading.Event yang di-set saat port harus berhenti
+        device_ids: Daftar port
+        max_concurrency: Maksimal port yang diproses bersamaan
+        port_deadline: Batas waktu per port dalam detik (None = tanpa batas)
+        deadline: Batas waktu total dalam detik (None = tanpa batas); port yang
+            belum selesai dibatalkan
+
+    Returns:
+        Iterator FanOutResult, satu untuk setiap port
+
+    Raises:
+        ValueError: Jika max_concurrency kurang dari 1 (langsung saat
+            dipanggil, bukan saat hasil pertama dibaca)
+
+    Deadline port dihitung sejak operasi benar-benar mulai di thread worker,
+    bukan sejak di-submit. Port yang melewati deadline dilaporkan timed_out,
+    tetapi worker-nya tetap dihitung terhadap max_concurrency sampai
+    operasinya selesai, sehingga port berikutnya tidak mengantre di
+    belakang worker yang masih sibuk.
+    """
+    if not max_concurrency >= 1:
+        raise ValueError(f"max_concurrency must be >= 1, got {max_concurrency!r}")
+    return _fan_out(operation, device_ids, max_concurrency, port_deadline, deadline)
+
+
+def _fan_out(operation, device_ids, max_concurrency, port_deadline, deadline):
+    pending = deque(device_ids)
+    running = {}  # future -> (device_id, [waktu mulai], cancel event)
+    abandoned = set()  # Future yang sudah dilaporkan timeout tapi masih jalan
+    end = None if deadline is None else time.monotonic() + deadline
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="fanout"
+    )
+
+    def run(device_id, cancel, started):
+        started.append(time.monotonic())
+        return operation(device_id, cancel)
+
+    def elapsed_since(started, now):
+        return now - started[0] if started else 0.0
+
+    try:
+        while pending or running:
+            if end is not None and time.monotonic() >= end:
+                break
+
+            abandoned = {f for f in abandoned if not f.done()}
+            while pending and len(running) + len(abandoned) < max_concurrency:
+                device_id = pending.popleft()
+                cancel = threading.Event()
+                started = []
+                future = executor.submit(run, device_id, cancel, started)
+                running[future] = (device_id, started, cancel)
+
+            now = time.monotonic()
+            wakeups = [] if end is None else [end]
+            if port_deadline is not None:
+                for _, started, _ in running.values():
+                    if started:
+                        wakeups.append(started[0] + port_deadline)
+                    else:
+                        wakeups.append(now + START_POLL_INTERVAL)
+            timeout = max(0.0, min(wakeups) - now) if wakeups else None
+
+            done, _ = wait(
+                set(running) | abandoned,
+                timeout=timeout,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                if future not in running:
+                    continue  # Worker yang sudah ditinggalkan akhirnya selesai
+                device_id, started, _ = running.pop(future)
+                elapsed = elapsed_since(started, time.monotonic())
+                try:
+                    yield FanOutResult(device_id, future.result(), elapsed=elapsed)
+                except Exception as e:
+                    logger.error(f"Error on {device_id}: {e}")
+                    yield FanOutResult(device_id, error=e, elapsed=elapsed)
+
+            if port_deadline is None:
+                continue
+            now = time.monotonic()
+            for future, (device_id, started, cancel) in list(running.items()):
+                if started and now - started[0] >= port_deadline:
+                    cancel.set()
+                    del running[future]
+                    abandoned.add(future)
+                    logger.warning(
+                        f"{device_id} exceeded port deadline {port_deadline}s"
+                    )
+                    yield FanOutResult(
+                        device_id, elapsed=now - started[0], timed_out=True
+                    )
+
+        # Deadline global: batalkan port yang masih berjalan atau belum mulai
+        now = time.monotonic()
+        for future, (device_id, started, cancel) in list(running.items()):
+            cancel.set()
+            del running[future]
+            yield FanOutResult(
+                device_id, elapsed=elapsed_since(started, now), timed_out=True
+            )
+        if pending:
+            logger.warning(f"Deadline reached, {len(pending)} ports not started")
+        while pending:
+            yield FanOutResult(pending.popleft(), cancelled=True)
+    finally:
+        # Juga dijalankan jika pemanggil berhenti iterasi lebih awal
+        for _, _, cancel in running.values():
+            cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,125 @@
+import logging
+import sys
+import threading
+
+import serial.tools.list_ports
+
+try:
+    import pyudev  # Opsional, hanya untuk Linux
+except ImportError:
+    pyudev = None
+
+logger = logging.getLogger(__name__)
+
+
+def port_signature(port_info):
+    """Atribut comports() yang menandakan perangkat fisik di balik sebuah port"""
+    return (
+        port_info.device,
+        port_info.vid,
+        port_info.pid,
+        port_info.serial_number,
+        port_info.location,
+        port_info.description,
+    )
+
+
+def take_snapshot(system_ports):
+    """Snapshot {device: signature} dari daftar comports()"""
+    return {p.device: port_signature(p) for p in system_ports}
+
+
+def diff_snapshots(previous, current):
+    """
+    Membandingkan dua snapshot port
+
+    Returns:
+        Tuple (added, removed, changed) berisi set device_id
+    """
+    added = current.keys() - previous.keys()
+    removed = previous.keys() - current.keys()
+    changed = {
+        device
+        for device in current.keys() & previous.keys()
+        if current[device] != previous[device]
+    }
+    return added, removed, changed
+
+
+class HotplugWatcher:
+    """
+    Memanggil callback saat daftar port sistem berubah
+
+    Di Linux dengan pyudev terpasang, watcher menunggu event udev subsystem
+    tty; selain itu comports() dipolling dan callback hanya dipanggil jika
+    snapshot berbeda dari sebelumnya.
+    """
+
+    def __init__(self, on_change, interval=1.0, use_udev=True):
+        """
+        Args:
+            on_change: Fungsi tanpa argumen yang dipanggil saat ada perubahan
+            interval: Interval polling dalam detik (mode polling)
+            use_udev: Gunakan event udev jika tersedia
+        """
+        self.on_change = on_change
+        self.interval = interval
+        self.use_udev = use_udev and pyudev is not None and sys.platform == "linux"
+        self.running = False
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self.running:
+            return False
+
+        self.running = True
+        self._stop_event.clear()
+        target = self._udev_loop if self.use_udev else self._poll_loop
+        self.thread = threading.Thread(target=target, name="hotplug", daemon=True)
+        self.thread.start()
+        logger.info(
+            f"Hotplug watcher started ({'udev' if self.use_udev else 'polling'})"
+        )
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+
+        self.running = False
+        self._stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        logger.info("Hotplug watcher stopped")
+        return True
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error(f"Error in hotplug handler: {e}")
+
+    def _poll_loop(self):
+        snapshot = take_snapshot(serial.tools.list_ports.comports())
+        while not self._stop_event.wait(self.interval):
+            try:
+                current = take_snapshot(serial.tools.list_ports.comports())
+            except Exception as e:
+                logger.error(f"Error listing ports: {e}")
+                continue
+            if current != snapshot:
+                snapshot = current
+                self._notify()
+
+    def _udev_loop(self):
+        context = pyudev.Context()
+        monitor = pyudev.Monitor.from_netlink(context)
+        monitor.filter_by(subsystem="tty")
+        monitor.start()
+        while not self._stop_event.is_set():
+            # Timeout agar stop() tetap responsif
+            device = monitor.poll(timeout=self.interval)
+            if device is not None and device.action in ("add", "remove", "change"):
+                logger.debug(f"udev {device.action}: {device.device_node}")
+                self._notify()
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+
+from src.utils.preference_store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class ModemIdentityIndex:
+    """
+    Indeks dua arah identitas modem <-> device node saat ini
+
+    Nama port (COM6, /dev/ttyUSB3) bisa berubah setiap kali modem dicolok
+    ulang; indeks ini memetakan identitas fisik ke nama port terkini
+    sehingga preferensi dan cache tetap mengikuti modemnya.
+    """
+
+    def __init__(self, index_file=None):
+        """
+        Args:
+            index_file: File JSON untuk menyimpan atribut per identitas
+                (IMEI, device terakhir). None = hanya di memori.
+        """
+        self.index_file = index_file
+        self.lock = threading.Lock()
+        self.by_identity = {}
+        self.by_device = {}
+        self.by_imei = {}
+        self.records = self._load()
+        for identity, record in self.records.items():
+            if record.get("imei"):
+                self.by_imei[record["imei"]] = identity
+
+    def _load(self):
+        if self.index_file and os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load identity index: {str(e)}")
+        return {}
+
+    def _save(self):
+        if not self.index_file:
+            return
+        try:
+            write_json_atomic(self.index_file, self.records)
+        except Exception as e:
+            logger.error(f"Failed to save identity index: {str(e)}")
+
+    def bind(self, identity, device_id):
+        """
+        Mengaitkan identitas dengan device node saat ini
+
+        Returns:
+            True jika identitas sudah pernah dikenal sebelumnya
+        """
+        with self.lock:
+            old_device = self.by_identity.get(identity)
+            if old_device is not None and old_device != device_id:
+                self.by_device.pop(old_device, None)
+            old_identity = self.by_device.get(device_id)
+            if old_identity is not None and old_identity != identity:
+                self.by_identity.pop(old_identity, None)
+
+            self.by_identity[identity] = device_id
+            self.by_device[device_id] = identity
+
+            record = self.records.get(identity)
+            known = record is not None
+            if record is None:
+                record = self.records[identity] = {}
+            if record.get("device") != device_id:
+                record["device"] = device_id
+                self._save()
+            return known
+
+    def unbind_device(self, device_id):
+        """Melepas device node (modem dicabut); atribut identitas tetap disimpan"""
+        with self.lock:
+            identity = self.by_device.pop(device_id, None)
+            if identity is not None:
+                self.by_identity.pop(identity, None)
+            return identity
+
+    def device_for(self, identity):
+        """Device node saat ini untuk identitas, atau None"""
+        return self.by_identity.get(identity)
+
+    def identity_for(self, device_id):
+        """Identitas modem pada device node, atau None"""
+        return self.by_device.get(device_id)
+
+    def identity_for_imei(self, imei):
+        return self.by_imei.get(imei)
+
+    def is_known(self, identity):
+        return identity in self.records
+
+    def get_imei(self, identity):
+        record = self.records.get(identity)
+        return record.get("imei") if record else None
+
+    def record_imei(self, identity, imei):
+        """Simpan IMEI hasil AT+CGSN untuk identitas"""
+        with self.lock:
+            record = self.records.setdefault(identity, {})
+            if record.get("imei") == imei:
+                return
+            record["imei"] = imei
+            self.by_imei[imei] = identity
+            self._save()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_identity_index(index_file="modem_identity.json"):
+    """
+    ModemIdentityIndex bersama untuk file indeks (satu per path per proses)
+
+    PortService dan PortManager memakai file yang sama; dengan satu instance
+    per file, record yang ditulis satu pihak tidak terhapus oleh penulisan
+    pihak lain. index_file None memberi indeks baru yang hanya di memori.
+    """
+    if not index_file:
+        return ModemIdentityIndex(None)
+    key = os.path.abspath(index_file)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ModemIdentityIndex(index_file)
+        return index
@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PortSchedule:
+    """Jadwal probe untuk satu port"""
+
+    def __init__(self, device_id, interval, now):
+        self.device_id = device_id
+        self.interval = interval
+        self.next_due = now  # Port baru langsung diprobe
+        self.failures = 0
+        self.last_status = None
+        self.last_probe = None
+
+    def __repr__(self):
+        return (
+            f"PortSchedule({self.device_id}, interval={self.interval:.1f}s, "
+            f"failures={self.failures})"
+        )
+
+
+class MonitorScheduler:
+    """
+    Penjadwal probe adaptif untuk monitoring port
+
+    Setiap port punya interval sendiri: port sehat diprobe makin jarang
+    sampai monitor_healthy_interval, port yang baru berubah status diprobe
+    lagi secepatnya, dan port mati mundur eksponensial sampai
+    monitor_max_backoff. Port yang baru saja berhasil berkomunikasi di dalam
+    intervalnya tidak diprobe ulang.
+    """
+
+    def __init__(self, probe, config, last_traffic=None):
+        """
+        Args:
+            probe: Fungsi device_id -> bool (True jika modem merespons)
+            config: Dict konfigurasi (monitor_* keys)
+            last_traffic: Fungsi device_id -> waktu time.monotonic() traffic
+                sukses terakhir, atau None
+        """
+        self.probe = probe
+        self.last_traffic = last_traffic
+        self.schedules = {}
+        self.lock = threading.Lock()
+        self.configure(config)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.probe_budget, thread_name_prefix="probe"
+        )
+
+    def configure(self, config):
+        """
+        Terapkan nilai monitor_* baru (misalnya setelah config di-reload)
+
+        Jumlah thread executor tetap; probe_budget yang lebih besar dari
+        jumlah thread hanya menambah antrean per tick.
+        """
+        self.min_interval = config["monitor_min_interval"]
+        self.healthy_interval = config["monitor_healthy_interval"]
+        self.max_backoff = config["monitor_max_backoff"]
+        self.probe_budget = config["monitor_probe_budget"]
+        with self.lock:
+            for schedule in self.schedules.values():
+                schedule.interval = min(schedule.interval, self.healthy_interval)
+
+    def sync(self, device_ids, now=None):
+        """Tambahkan jadwal untuk port baru dan buang port yang sudah hilang"""
+        now = time.monotonic() if now is None else now
+        device_ids = set(device_ids)
+        with self.lock:
+            for device_id in device_ids - self.schedules.keys():
+                self.schedules[device_id] = PortSchedule(
+                    device_id, self.min_interval, now
+                )
+            for device_id in self.schedules.keys() - device_ids:
+                del self.schedules[device_id]
+
+    def tick(self, device_ids):
+        """
+        Probe semua port yang sudah jatuh tempo secara paralel
+
+        Args:
+            device_ids: Port yang sedang dimonitor
+
+        Returns:
+            Dict device_id -> bool untuk port yang statusnya diketahui pada tick ini
+        """
+        now = time.monotonic()
+        self.sync(device_ids, now)
+        with self.lock:
+            due = sorted(
+                (s for s in self.schedules.values() if s.next_due <= now),
+                key=lambda s: s.next_due,
+            )
+
+        results = {}
+        to_probe = []
+        for schedule in due:
+            last = self.last_traffic(schedule.device_id) if self.last_traffic else None
+            if last is not None and now - last < schedule.interval:
+                # Traffic sukses baru-baru ini sudah membuktikan port hidup
+                self._record(schedule, True, now)
+                results[schedule.device_id] = True
+            else:
+                to_probe.append(schedule)
+
+        # Batasi jumlah probe per tick; sisanya tetap jatuh tempo di tick berikut
+        futures = [
+            (schedule, self.executor.submit(self.probe, schedule.device_id))
+            for schedule in to_probe[: self.probe_budget]
+        ]
+        for schedule, future in futures:
+            try:
+                connected = bool(future.result())
+            except Exception as e:
+                logger.error(f"Error probing {schedule.device_id}: {e}")
+                connected = False
+            self._record(schedule, connected, time.monotonic())
+            results[schedule.device_id] = connected
+
+        if len(to_probe) > self.probe_budget:
+            logger.debug(
+                f"Probe budget reached, {len(to_probe) - self.probe_budget} "
+                f"ports deferred"
+            )
+        return results
+
+    def _record(self, schedule, connected, now):
+        changed = schedule.last_status is not None and schedule.last_status != connected
+        if changed:
+            # Port flapping: cek lagi secepatnya
+            schedule.interval = self.min_interval
+            schedule.failures = 0 if connected else 1
+        elif connected:
+            schedule.failures = 0
+            schedule.interval = min(schedule.interval * 2, self.healthy_interval)
+        else:
+            schedule.failures += 1
+            schedule.interval = min(
+                self.min_interval * 2**schedule.failures, self.max_backoff
+            )
+
+        schedule.last_status = connected
+        schedule.last_probe = now
+        schedule.next_due = now + schedule.interval
+
+    def reset(self, device_id):
+        """Jadwalkan port untuk segera diprobe (misalnya setelah refresh manual)"""
+        with self.lock:
+            schedule = self.schedules.get(device_id)
+            if schedule is not None:
+                schedule.interval = self.min_interval
+                schedule.next_due = time.monotonic()
+
+    def stats(self):
+        """Interval, jumlah kegagalan dan sisa waktu ke probe berikutnya per port"""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                device_id: {
+                    "interval": s.interval,
+                    "failures": s.failures,
+                    "next_due_in": max(0.0, s.next_due - now),
+                }
+                for device_id, s in self.schedules.items()
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -1,3 +1,4 @@
+import copy
 import logging
 import threading
 import time
@@ -5,213 +6,507 @@ from concurrent.futures import ThreadPoolExecutor
 
 from src.controllers.port_controller import PortController
 from src.models.devices.port import SerialPort
-from src.utils.config import load_config
+from src.services.hotplug import HotplugWatcher, diff_snapshots, take_snapshot
+from src.services.identity_index import get_identity_index
+from src.services.monitor_scheduler import MonitorScheduler
+from src.services.port_snapshot import EMPTY_SNAPSHOT, PortSnapshot
+from src.services.status_engine import StatusEngine
+from src.services.urc_listener import UrcListener
+from src.utils.config import get_config_store
+from src.utils.identity import modem_identity
+from src.utils.tracing import TRACER
 
 logger = logging.getLogger(__name__)
 
 
+def _port_state(port):
+    """Atribut port yang perubahannya dikirim sebagai event changed"""
+    return (port.status, port.active, port.identity, port.name)
+
+
 class PortService:
     """Service untuk deteksi dan manajemen port"""
 
-    def __init__(self, config_file="config.json"):
-        self.config = load_config(config_file)
-        self.ports = {}  # Dictionary of SerialPort objects
-        self.port_controller = PortController(config_file)
+    def __init__(self, config_file="config.json", config_store=None):
+        """
+        Args:
+            config_file: File konfigurasi jika config_store tidak diberikan
+            config_store: ConfigStore bersama (lihat utils.config)
+        """
+        self.config_store = config_store or get_config_store(config_file)
+        self.ports = {}  # Dictionary of SerialPort objects (sisi penulis)
+        self._snapshot = EMPTY_SNAPSHOT  # Dibaca tanpa lock, ditukar atomik
+        self.port_controller = PortController(config_store=self.config_store)
 
         # Thread management
-        self.monitor_thread = None
         self.monitoring = False
         self.lock = threading.Lock()
 
+        # Deteksi inkremental dan hotplug
+        self.detect_lock = threading.Lock()
+        self.port_snapshot = {}
+        self.port_listeners = []
+        self.identity_index = get_identity_index(self.config["identity_index_file"])
+
+        # Probe adaptif bersama untuk semua loop monitoring
+        self.scheduler = MonitorScheduler(
+            self._probe_port, self.config, self.port_controller.last_traffic_at
+        )
+        self.status_engine = StatusEngine(self, self.config["port_monitor_interval"])
+        self.hotplug = None
+        self.urc_listener = UrcListener(self)
+        self.config_store.subscribe(self._on_config_changed)
+        self._apply_tracing(self.config)
+
         logger.info("PortService initialized")
 
-    def detect_ports(self):
-        """Mendeteksi dan memverifikasi port yang tersedia"""
-        logger.info("Starting port detection")
-        system_ports = self.port_controller.list_system_ports()
-        logger.debug(f"Found {len(system_ports)} system ports")
-
-        # Remember active state of existing ports
-        active_states = {}
-        for device_id, port in self.ports.items():
-            active_states[device_id] = port.active
-
-        # Results container and synchronization
-        verified_ports = {}
-        lock = threading.Lock()
-
-        def verify_port(port_info):
-            device_id = port_info.device
-            name = port_info.description
-
-            # Skip excluded ports
-            if any(ex.lower() in name.lower() for ex in self.config["excluded_ports"]):
-                logger.debug(f"Skipping excluded port: {device_id} - {name}")
-                return
-
-            # Only process ports matching our filters, unless filters are empty
-            filters = self.config["port_filters"]
-            if filters and not any(f.lower() in name.lower() for f in filters):
-                logger.debug(f"Port didn't match any filter: {device_id} - {name}")
-                return
-
-            # Create port object
-            port = SerialPort(device_id, name)
-
-            # Restore active state if port existed before
-            if device_id in active_states:
-                port.set_active(active_states[device_id])
-
-            # Verify connection
-            connection = self.port_controller.open_connection(device_id)
-            if connection:
-                logger.debug(f"Testing connection to {device_id}")
-                response = self.port_controller.send_command(connection, "AT")
-                connected = response and "OK" in response
-                port.set_status("connected" if connected else "disconnected")
-                self.port_controller.close_connection(connection)
-            else:
-                port.set_status("disconnected")
-
-            # Thread-safe update of results
-            with lock:
-                verified_ports[device_id] = port
-                logger.debug(f"Port {device_id} verified: {port.status}")
-
-        # Use multithreading for parallel detection
-        with ThreadPoolExecutor(max_workers=self.config["max_workers"]) as executor:
-            executor.map(verify_port, system_ports)
-
-        # Update ports dictionary
-        with self.lock:
-            self.ports = verified_ports
+    @property
+    def config(self):
+        """Snapshot konfigurasi terbaru (ikut berubah saat hot-reload)"""
+        return self.config_store.config
+
+    def snapshot(self):
+        """PortSnapshot terbaru (tanpa lock; tidak berubah setelah diambil)"""
+        return self._snapshot
+
+    def _publish(self):
+        """Bangun snapshot baru dari self.ports; dipanggil dengan self.lock"""
+        self._snapshot = PortSnapshot(self.ports, self._snapshot.version + 1)
+
+    def _writable_port(self, device_id):
+        """
+        Salinan port untuk diubah (copy-on-write); dipanggil dengan self.lock
+
+        Objek port yang sudah dipublikasikan tidak pernah diubah, sehingga
+        snapshot lama dan port yang sudah diambil pembaca tetap konsisten.
+        """
+        port = self.ports[device_id] = copy.copy(self.ports[device_id])
+        return port
+
+    def _on_config_changed(self, config, old, changed):
+        """Terapkan interval monitoring baru tanpa restart"""
+        if any(key.startswith("monitor_") for key in changed):
+            self.scheduler.configure(config)
+        if "port_monitor_interval" in changed:
+            self.status_engine.interval = config["port_monitor_interval"]
+            self.status_engine.poke()
+        if "hotplug_interval" in changed and self.hotplug is not None:
+            self.hotplug.interval = config["hotplug_interval"]
+        if "port_filters" in changed or "excluded_ports" in changed:
+            # Filter baru berlaku untuk port yang sudah ada juga
+            threading.Thread(
+                target=self.detect_ports, kwargs={"full": True}, daemon=True
+            ).start()
+        if "baudrate" in changed:
+            logger.info("New baudrate applies to connections opened from now on")
+        if "tracing_enabled" in changed or "trace_buffer_size" in changed:
+            self._apply_tracing(config)
+
+    def _apply_tracing(self, config):
+        if config["tracing_enabled"]:
+            TRACER.enable(config["trace_buffer_size"])
+        else:
+            TRACER.disable()
+
+    def detect_ports(self, full=False, recheck=True):
+        """
+        Mendeteksi dan memverifikasi port yang tersedia
+
+        Deteksi bersifat inkremental: hanya port yang baru muncul atau
+        atributnya (VID/PID, serial number, lokasi) berubah sejak deteksi
+        sebelumnya yang diverifikasi, dan port yang hilang dibuang.
+
+        Deteksi eksplisit (recheck=True) juga memverifikasi ulang port lama
+        yang tidak berubah jika statusnya bukan connected, atau tidak ada
+        traffic sukses selama monitor_healthy_interval, sehingga modem yang
+        hidup kembali atau mati diam-diam ikut diperbarui. Deteksi dari
+        hotplug memakai recheck=False.
+
+        Event "changed" hanya dikirim untuk port yang status, flag aktif,
+        identitas atau namanya benar-benar berubah; rescan penuh tidak
+        menandai semua port sebagai berubah.
+
+        Modem yang identitasnya sudah dikenal (misalnya dicolok ulang dengan
+        nama port baru) tidak diprobe di sini selama status engine berjalan:
+        port langsung dianggap terhubung dan probe AT pertamanya dijadwalkan
+        oleh MonitorScheduler. Rescan penuh selalu memprobe.
+
+        Args:
+            full: Verifikasi ulang semua port (rescan penuh)
+            recheck: Verifikasi ulang port lama yang terputus atau basi
+        """
+        with self.detect_lock:
+            logger.info("Starting port detection")
+            system_ports = self.port_controller.list_system_ports()
+            logger.debug(f"Found {len(system_ports)} system ports")
+
+            current = take_snapshot(system_ports)
+            added, removed, changed = diff_snapshots(self.port_snapshot, current)
+            to_verify = set(current) if full else added | changed
+
+            # Remember active state of existing ports
+            with self.lock:
+                previous_ports = dict(self.ports)
+
+            rechecked = set()
+            if recheck and not full:
+                now = time.monotonic()
+                stale_after = self.config["monitor_healthy_interval"]
+                for device_id, port in previous_ports.items():
+                    if device_id in current and device_id not in to_verify:
+                        last = self.port_controller.last_traffic_at(device_id)
+                        if (
+                            not port.is_connected()
+                            or last is None
+                            or now - last > stale_after
+                        ):
+                            rechecked.add(device_id)
+                to_verify |= rechecked
+            logger.debug(
+                f"Port changes: {len(added)} added, {len(removed)} removed, "
+                f"{len(changed)} changed, {len(rechecked)} rechecked"
+            )
+            previous_by_identity = {
+                p.identity: p for p in previous_ports.values() if p.identity
+            }
 
-        connected_count = sum(1 for p in self.ports.values() if p.is_connected())
-        logger.info(
-            f"Port detection complete: {connected_count}/{len(self.ports)} connected"
-        )
+            # Results container and synchronization
+            verified_ports = {}
+            lock = threading.Lock()
+
+            # Probe ditunda hanya jika status engine berjalan (ada yang akan
+            # memverifikasi nanti), bukan rescan penuh dan bukan recheck
+            monitored = self.status_engine.running and not full
+
+            def defer_probe(port):
+                if not (monitored and port.identity):
+                    return False
+                if port.device_id in rechecked:
+                    return False
+                if not self.identity_index.is_known(port.identity):
+                    return False
+                previous = previous_by_identity.get(port.identity)
+                return previous is None or previous.is_connected()
+
+            def verify_port(port_info):
+                device_id = port_info.device
+                name = port_info.description
+
+                # Skip excluded ports and ports not matching our filters
+                if not self.port_controller.is_candidate_port(port_info):
+                    return
+
+                # Create port object
+                port = SerialPort(device_id, name)
+                port.identity = modem_identity(port_info)
+
+                # Restore active state if the same modem existed before,
+                # even when it was reattached under a different name
+                previous = previous_by_identity.get(port.identity)
+                if previous is None and device_id in previous_ports:
+                    previous = previous_ports[device_id]
+                if previous is not None:
+                    port.set_active(previous.active)
+
+                if defer_probe(port):
+                    # Modem yang sudah dikenal: status lama dipakai dan probe
+                    # AT diserahkan ke MonitorScheduler (port baru langsung
+                    # jatuh tempo pada tick berikutnya). Koneksi dan traffic
+                    # lama milik device node ini sudah basi.
+                    port.set_status("connected")
+                    self.port_controller.evict(device_id)
+                    self.scheduler.reset(device_id)
+                    connected = True
+                else:
+                    # Verify connection
+                    logger.debug(f"Testing connection to {device_id}")
+                    with TRACER.span("detect.probe", device_id):
+                        connected = self._probe_port(device_id)
+                    port.set_status("connected" if connected else "disconnected")
+
+                # IMEI hanya dibaca untuk modem yang belum dikenal
+                if connected and not (
+                    port.identity and self.identity_index.get_imei(port.identity)
+                ):
+                    imei = self._read_imei(device_id)
+                    if imei:
+                        port.identity = port.identity or modem_identity(port_info, imei)
+                        self.identity_index.record_imei(port.identity, imei)
+                if port.identity:
+                    self.identity_index.bind(port.identity, device_id)
+
+                # Thread-safe update of results
+                with lock:
+                    verified_ports[device_id] = port
+                    logger.debug(f"Port {device_id} verified: {port.status}")
+
+            # Use multithreading for parallel detection
+            pending = [p for p in system_ports if p.device in to_verify]
+            if pending:
+                with ThreadPoolExecutor(
+                    max_workers=self.config["max_workers"]
+                ) as executor:
+                    executor.map(verify_port, pending)
+
+            # Update ports dictionary: port lama yang tidak berubah dipertahankan
+            with self.lock:
+                self.ports = {
+                    device_id: port
+                    for device_id, port in self.ports.items()
+                    if device_id in current and device_id not in to_verify
+                }
+                self.ports.update(verified_ports)
+                self._publish()
+                removed_ports = {
+                    device_id: port
+                    for device_id, port in previous_ports.items()
+                    if device_id not in self.ports
+                }
+            self.port_snapshot = current
+            for device_id in removed_ports:
+                self.identity_index.unbind_device(device_id)
+
+            # Tutup koneksi pool milik port yang sudah hilang dari sistem
+            self.port_controller.pool.retain(self.ports)
+
+            connected_count = sum(1 for p in self.ports.values() if p.is_connected())
+            logger.info(
+                f"Port detection complete: {connected_count}/{len(self.ports)} "
+                f"connected, {len(verified_ports)} verified"
+            )
 
-        return self.ports
+        for device_id, port in removed_ports.items():
+            self._emit_port_event("removed", device_id, port)
+        updated = {}
+        for device_id, port in verified_ports.items():
+            previous = previous_ports.get(device_id)
+            if previous is None:
+                updated[device_id] = ("added", port)
+            elif _port_state(previous) != _port_state(port):
+                updated[device_id] = ("changed", port)
+        for device_id, (event, port) in updated.items():
+            self._emit_port_event(event, device_id, port)
+        if removed_ports or updated:
+            self.status_engine.poke()
+
+        return self._snapshot.ports
+
+    def add_port_listener(self, listener):
+        """
+        Menambahkan listener event port
+
+        Args:
+            listener: Fungsi (event, device_id, port) dengan event
+                "added", "removed" atau "changed"
+        """
+        if callable(listener):
+            self.port_listeners.append(listener)
+            return True
+        return False
+
+    def remove_port_listener(self, listener):
+        """Menghapus listener event port"""
+        if listener in self.port_listeners:
+            self.port_listeners.remove(listener)
+            return True
+        return False
+
+    def _emit_port_event(self, event, device_id, port):
+        logger.debug(f"Port {event}: {device_id}")
+        for listener in list(self.port_listeners):
+            try:
+                listener(event, device_id, port)
+            except Exception as e:
+                logger.error(f"Error in port listener: {e}")
+
+    def start_hotplug(self):
+        """Jalankan deteksi inkremental otomatis saat port dicolok/dicabut"""
+        if self.hotplug is None:
+            self.hotplug = HotplugWatcher(
+                lambda: self.detect_ports(recheck=False),
+                self.config["hotplug_interval"],
+            )
+        return self.hotplug.start()
+
+    def stop_hotplug(self):
+        """Hentikan deteksi otomatis"""
+        if self.hotplug is None:
+            return False
+        return self.hotplug.stop()
+
+    def _probe_port(self, device_id):
+        """Kirim AT lewat koneksi pool, True jika modem menjawab OK"""
+        with self.port_controller.lease(device_id) as connection:
+            if connection is None:
+                return False
+            response = self.port_controller.send_command(connection, "AT")
+            connected = bool(response and "OK" in response)
+
+        if not connected:
+            # Buka ulang koneksi pada probe berikutnya
+            self.port_controller.evict(device_id)
+        return connected
+
+    def _read_imei(self, device_id):
+        """Membaca IMEI modem dengan AT+CGSN"""
+        with self.port_controller.lease(device_id) as connection:
+            if connection is None:
+                return None
+            result = self.port_controller.query(connection, ["imei"])
+        return result.get("imei")
+
+    def get_port_by_identity(self, identity):
+        """Mendapatkan port berdasarkan identitas fisik modem"""
+        device_id = self.identity_index.device_for(identity)
+        return self.get_port(device_id) if device_id else None
 
     def start_monitoring(self):
-        """Start background monitoring thread"""
+        """Start background monitoring (shared status engine)"""
         if self.monitoring:
             logger.warning("Port monitoring already running")
             return False
 
         self.monitoring = True
-        self.monitor_thread = threading.Thread(target=self._monitor_ports)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+        self.status_engine.start()
         logger.info("Port monitoring started")
         return True
 
     def stop_monitoring(self):
-        """Stop background monitoring thread"""
+        """Stop background monitoring"""
         if not self.monitoring:
             return False
 
         self.monitoring = False
-        if self.monitor_thread and self.monitor_thread.is_alive():
-            self.monitor_thread.join(timeout=2.0)
+        self.status_engine.stop()
         logger.info("Port monitoring stopped")
         return True
 
-    def _monitor_ports(self):
-        """Background thread to monitor port status"""
-        logger.debug("Port monitor thread started")
-
-        while self.monitoring:
-            try:
-                logger.debug("Checking port statuses")
-                for device_id, port in list(self.ports.items()):
-                    connection = self.port_controller.open_connection(device_id)
-                    if connection:
-                        response = self.port_controller.send_command(connection, "AT")
-                        connected = response and "OK" in response
-                        with self.lock:
-                            port.set_status(
-                                "connected" if connected else "disconnected"
-                            )
-                        self.port_controller.close_connection(connection)
-                    else:
-                        with self.lock:
-                            port.set_status("disconnected")
-
-                # Wait for next check interval
-                time.sleep(self.config["port_monitor_interval"])
-            except Exception as e:
-                logger.error(f"Error in port monitoring: {str(e)}")
-                time.sleep(5)  # Wait a bit longer if there was an error
-
-        logger.debug("Port monitor thread stopped")
+    def subscribe_status(self, handler):
+        """
+        Berlangganan perubahan status port tanpa menambah beban probe
+
+        Args:
+            handler: Fungsi yang menerima dict status saat ada perubahan
+        """
+        return self.status_engine.subscribe(handler)
+
+    def unsubscribe_status(self, handler):
+        """Berhenti berlangganan perubahan status port"""
+        return self.status_engine.unsubscribe(handler)
+
+    def start_urc_listener(self):
+        """Jalankan reader URC jangka panjang pada semua port tersedia"""
+        return self.urc_listener.start()
+
+    def stop_urc_listener(self):
+        """Hentikan semua reader URC"""
+        return self.urc_listener.stop()
+
+    def subscribe_urc(self, handler, prefixes=None):
+        """
+        Berlangganan URC dari semua modem
+
+        Args:
+            handler: Fungsi (device_id, urc)
+            prefixes: Tuple prefix URC yang diinginkan, contoh ("+CMTI:",)
+        """
+        return self.urc_listener.subscribe(handler, prefixes)
+
+    def unsubscribe_urc(self, handler):
+        """Berhenti berlangganan URC"""
+        return self.urc_listener.unsubscribe(handler)
+
+    def run_scheduled_probes(self):
+        """
+        Probe port yang sudah jatuh tempo menurut MonitorScheduler
+
+        Returns:
+            Dict device_id -> bool untuk port yang diperiksa pada tick ini
+        """
+        results = self.scheduler.tick(list(self._snapshot.ports))
+        with self.lock:
+            changed = False
+            for device_id, connected in results.items():
+                port = self.ports.get(device_id)
+                status = "connected" if connected else "disconnected"
+                if port is not None and port.status != status:
+                    self._writable_port(device_id).set_status(status)
+                    changed = True
+            if changed:
+                self._publish()
+        return results
+
+    def close(self):
+        """Hentikan monitoring dan tutup semua koneksi pool"""
+        self.stop_hotplug()
+        self.stop_urc_listener()
+        self.stop_monitoring()
+        self.status_engine.shutdown()
+        self.scheduler.shutdown()
+        self.port_controller.close_all()
+
+    # Pembaca memakai snapshot yang dipublikasikan: tanpa lock dan tanpa
+    # membangun ulang dict/list. Mapping yang dikembalikan read-only.
 
     def list_all_ports(self):
         """Mendapatkan semua port"""
-        with self.lock:
-            return self.ports.copy()
+        return self._snapshot.ports
 
     def list_active_ports(self):
         """Mengambil semua port yang aktif"""
-        with self.lock:
-            return {
-                device_id: port for device_id, port in self.ports.items() if port.active
-            }
+        return self._snapshot.active
 
     def list_connected_ports(self):
         """Mengambil semua port yang terhubung"""
-        with self.lock:
-            return {
-                device_id: port
-                for device_id, port in self.ports.items()
-                if port.is_connected()
-            }
+        return self._snapshot.connected
 
     def list_available_ports(self):
         """Mengambil semua port yang tersedia untuk digunakan (terhubung dan aktif)"""
-        with self.lock:
-            return {
-                device_id: port
-                for device_id, port in self.ports.items()
-                if port.is_connected() and port.active
-            }
+        return self._snapshot.available
 
     def enable_port(self, device_id):
         """Mengaktifkan port tertentu"""
         with self.lock:
-            if device_id in self.ports:
-                logger.info(f"Enabling port {device_id}")
-                self.ports[device_id].set_active(True)
-                return True
-        return False
+            if device_id not in self.ports:
+                return False
+            logger.info(f"Enabling port {device_id}")
+            self._writable_port(device_id).set_active(True)
+            self._publish()
+        self.status_engine.poke()
+        return True
 
     def disable_port(self, device_id):
         """Menonaktifkan port tertentu"""
         with self.lock:
-            if device_id in self.ports:
-                logger.info(f"Disabling port {device_id}")
-                self.ports[device_id].set_active(False)
-                return True
-        return False
+            if device_id not in self.ports:
+                return False
+            logger.info(f"Disabling port {device_id}")
+            self._writable_port(device_id).set_active(False)
+            self._publish()
+        self.status_engine.poke()
+        return True
 
     def enable_all_ports(self):
         """Mengaktifkan semua port"""
         with self.lock:
-            for port in self.ports.values():
-                port.set_active(True)
+            for device_id in list(self.ports):
+                self._writable_port(device_id).set_active(True)
+            self._publish()
+        self.status_engine.poke()
         logger.info(f"Enabled all ports ({len(self.ports)})")
 
     def disable_all_ports(self):
         """Menonaktifkan semua port"""
         with self.lock:
-            for port in self.ports.values():
-                port.set_active(False)
+            for device_id in list(self.ports):
+                self._writable_port(device_id).set_active(False)
+            self._publish()
+        self.status_engine.poke()
         logger.info(f"Disabled all ports ({len(self.ports)})")
 
     def get_port(self, device_id):
         """Mendapatkan port berdasarkan ID"""
-        with self.lock:
-            return self.ports.get(device_id)
+        return self._snapshot.ports.get(device_id)
 
     def refresh_port(self, device_id):
         """Refresh status koneksi port tertentu"""
@@ -222,60 +517,26 @@ class PortService:
 
         logger.debug(f"Refreshing port status: {device_id}")
 
-        # Coba buka koneksi baru untuk verifikasi
-        connection = self.port_controller.open_connection(device_id)
-        if connection:
-            try:
-                # Kirim AT command dasar dan periksa respons
-                response = self.port_controller.send_command(connection, "AT")
-                is_connected = response and "OK" in response
+        try:
+            # Kirim AT command dasar lewat koneksi pool
+            is_connected = self._probe_port(device_id)
+        except Exception as e:
+            logger.error(f"Error refreshing port {device_id}: {str(e)}")
+            is_connected = False
 
-                # Update status port
-                with self.lock:
-                    port.set_status("connected" if is_connected else "disconnected")
+        status = "connected" if is_connected else "disconnected"
+        with self.lock:
+            if device_id in self.ports:
+                self._writable_port(device_id).set_status(status)
+                self._publish()
 
-                logger.debug(f"Port {device_id} status refreshed to: {port.status}")
-                self.port_controller.close_connection(connection)
-                return is_connected
-            except Exception as e:
-                logger.error(f"Error refreshing port {device_id}: {str(e)}")
-                with self.lock:
-                    port.set_status("disconnected")
-                return False
-            finally:
-                # Pastikan koneksi ditutup
-                self.port_controller.close_connection(connection)
-        else:
-            # Gagal membuka koneksi = terputus
-            with self.lock:
-                port.set_status("disconnected")
-            logger.debug(
-                f"Port {device_id} status set to disconnected (connection failed)"
-            )
-            return False
+        logger.debug(f"Port {device_id} status refreshed to: {status}")
+        return is_connected
 
     def get_sorted_ports(self):
         """Mendapatkan semua port diurutkan berdasarkan nama (COM1, COM2, ...)"""
-        with self.lock:
-            # Konversi port ke list untuk pengurutan
-            ports_list = list(self.ports.values())
-
-            # Urutkan berdasarkan nomor COM (COM1, COM2, ...)
-            def get_com_number(port):
-                # Ekstrak angka dari COM10, COM2, dll.
-                try:
-                    return int(port.device_id.lower().replace("com", ""))
-                except ValueError:
-                    return 999  # Nilai tinggi untuk yang non-standard
-
-            return sorted(ports_list, key=get_com_number)
+        return self._snapshot.sorted
 
     def get_grouped_ports(self):
         """Mendapatkan port dikelompokkan berdasarkan status koneksi"""
-        sorted_ports = self.get_sorted_ports()
-
-        # Kelompokkan berdasarkan status
-        connected = [p for p in sorted_ports if p.is_connected()]
-        disconnected = [p for p in sorted_ports if not p.is_connected()]
-
-        return {"connected": connected, "disconnected": disconnected}
+        return self._snapshot.grouped
@@ -0,0 +1,86 @@
+from types import MappingProxyType
+
+
+def com_sort_key(port):
+    """Urutan COM1, COM2, ..., COM10; nama non-standard di belakang"""
+    try:
+        return int(port.device_id.lower().replace("com", ""))
+    except ValueError:
+        return 999  # Nilai tinggi untuk yang non-standard
+
+
+class PortSnapshot:
+    """
+    Snapshot port yang tidak berubah setelah dibuat
+
+    Dibangun ulang oleh PortService setiap kali daftar port, status atau
+    flag aktif berubah, lalu ditukar dengan satu assignment. Pembaca cukup
+    mengambil referensinya tanpa lock. Indeks connected/active/available,
+    urutan COM dan pengelompokan sudah dihitung saat snapshot dibuat,
+    sesuai status port pada saat itu.
+
+    Objek port di dalamnya juga tidak diubah lagi: PortService menyalin
+    port sebelum mengubah status atau flag aktif (copy-on-write), sehingga
+    port.status selalu sama dengan indeks snapshot yang memuatnya.
+    """
+
+    __slots__ = (
+        "version",
+        "ports",
+        "states",
+        "active",
+        "connected",
+        "available",
+        "sorted",
+        "grouped",
+    )
+
+    def __init__(self, ports, version=0):
+        """
+        Args:
+            ports: Dict device_id -> SerialPort
+            version: Nomor versi yang selalu naik
+        """
+        self.version = version
+        self.ports = MappingProxyType(dict(ports))
+        # Status saat snapshot dibuat (device_id -> (status, active))
+        self.states = MappingProxyType(
+            {d: (p.status, p.active) for d, p in self.ports.items()}
+        )
+        self.active = MappingProxyType(
+            {d: p for d, p in self.ports.items() if self.states[d][1]}
+        )
+        self.connected = MappingProxyType(
+            {d: p for d, p in self.ports.items() if self.states[d][0] == "connected"}
+        )
+        self.available = MappingProxyType(
+            {d: p for d, p in self.connected.items() if self.states[d][1]}
+        )
+        self.sorted = tuple(sorted(self.ports.values(), key=com_sort_key))
+        self.grouped = MappingProxyType(
+            {
+                "connected": tuple(
+                    p for p in self.sorted if p.device_id in self.connected
+                ),
+                "disconnected": tuple(
+                    p for p in self.sorted if p.device_id not in self.connected
+                ),
+            }
+        )
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "grouped"):
+            raise AttributeError("PortSnapshot is immutable")
+        object.__setattr__(self, name, value)
+
+    def __len__(self):
+        return len(self.ports)
+
+    def __repr__(self):
+        return (
+            f"PortSnapshot(version={self.version}, ports={len(self.ports)}, "
+            f"available={len(self.available)})"
+        )
+
+
+EMPTY_SNAPSHOT = PortSnapshot({})
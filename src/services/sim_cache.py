@@ -0,0 +1,122 @@
+import threading
+import time
+
+# Kelompok field SIM dengan TTL masing-masing
+IDENTITY = "identity"  # iccid, imsi, msisdn: hampir tidak pernah berubah
+SIGNAL = "signal"  # Berubah setiap detik
+BALANCE = "balance"  # Berubah setelah pemakaian
+
+DEFAULT_TTLS = {
+    IDENTITY: 6 * 3600,
+    SIGNAL: 15,
+    BALANCE: 600,
+}
+
+
+class SimCache:
+    """
+    Cache state SIM per port dengan TTL per kelompok field
+
+    Nilai disimpan bersama waktu pembaruannya; kelompok yang TTL-nya habis
+    dianggap basi dan perlu dibaca ulang dari modem. Cache untuk satu port
+    dihapus seluruhnya saat SIM kemungkinan berganti (URC SIM, port dicolok
+    ulang).
+    """
+
+    def __init__(self, ttls=None):
+        """
+        Args:
+            ttls: Dict kelompok -> TTL dalam detik (default DEFAULT_TTLS)
+        """
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.entries = {}  # device_id -> {kelompok: (waktu, dict nilai)}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def _fresh(self, entry, group, now):
+        cached = entry.get(group)
+        return cached is not None and now - cached[0] < self.ttls[group]
+
+    def stale_groups(self, device_id, groups):
+        """
+        Kelompok yang perlu dibaca ulang dari modem
+
+        Args:
+            device_id: ID port
+            groups: Iterable kelompok yang dibutuhkan
+
+        Returns:
+            List kelompok yang belum ada atau sudah basi
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(device_id, {})
+            stale = [g for g in groups if not self._fresh(entry, g, now)]
+            self.hits += len(groups) - len(stale)
+            self.misses += len(stale)
+        return stale
+
+    def get(self, device_id, group, allow_stale=False):
+        """
+        Nilai satu kelompok field
+
+        Returns:
+            Dict nilai, atau None jika belum ada (atau basi, kecuali allow_stale)
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(device_id, {})
+            cached = entry.get(group)
+            if cached is None or not (allow_stale or self._fresh(entry, group, now)):
+                return None
+            return dict(cached[1])
+
+    def values(self, device_id):
+        """Semua nilai terakhir untuk port (termasuk yang basi)"""
+        with self.lock:
+            entry = self.entries.get(device_id, {})
+            merged = {}
+            for _, values in entry.values():
+                merged.update(values)
+            return merged
+
+    def update(self, device_id, group, **values):
+        """Simpan nilai kelompok field hasil pembacaan modem"""
+        with self.lock:
+            self.entries.setdefault(device_id, {})[group] = (time.monotonic(), values)
+
+    def invalidate(self, device_id, groups=None):
+        """
+        Hapus cache port
+
+        Args:
+            device_id: ID port
+            groups: Kelompok yang dihapus (None = semua)
+        """
+        with self.lock:
+            entry = self.entries.get(device_id)
+            if not entry:
+                return False
+            if groups is None:
+                del self.entries[device_id]
+            else:
+                for group in groups:
+                    entry.pop(group, None)
+            self.invalidations += 1
+        return True
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "ports": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,222 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.models.devices.simcard import SimCard
+from src.services.sim_cache import BALANCE, IDENTITY, SIGNAL, SimCache
+
+logger = logging.getLogger(__name__)
+
+# URC yang menandakan SIM dicabut/diganti (standar dan vendor)
+SIM_CHANGE_URCS = ("+CPIN:", "+SIMCARD:", "+QSIMSTAT:", "^SIMST:")
+
+
+class SimService:
+    """
+    Service untuk deteksi dan penyimpanan SIM card pada port PortService
+
+    Hasil pembacaan modem disimpan di SimCache dengan TTL per kelompok:
+    ICCID/IMSI/MSISDN dalam hitungan jam, sinyal dalam hitungan detik dan
+    pulsa dalam hitungan menit, sehingga hanya field yang basi yang dibaca
+    ulang. Cache port dihapus saat port dicolok ulang, status port berubah
+    atau modem mengirim URC pergantian SIM.
+    """
+
+    def __init__(self, port_service):
+        self.port_service = port_service
+        self.simcards = {}  # Dictionary of SimCard objects by ICCID
+        self.lock = threading.Lock()
+
+        config = port_service.config
+        self.cache = SimCache(
+            {
+                IDENTITY: config["sim_identity_ttl"],
+                SIGNAL: config["sim_signal_ttl"],
+                BALANCE: config["sim_balance_ttl"],
+            }
+        )
+        port_service.add_port_listener(self._on_port_event)
+        port_service.subscribe_status(self._on_status)
+        port_service.subscribe_urc(self._on_sim_urc, SIM_CHANGE_URCS)
+        port_service.config_store.subscribe(self._on_config_changed)
+
+    def _on_config_changed(self, config, old, changed):
+        # TTL baru langsung berlaku untuk entri yang sudah ada di cache
+        for group, key in (
+            (IDENTITY, "sim_identity_ttl"),
+            (SIGNAL, "sim_signal_ttl"),
+            (BALANCE, "sim_balance_ttl"),
+        ):
+            self.cache.ttls[group] = config[key]
+
+    def _on_port_event(self, event, device_id, port):
+        # Port dicolok ulang / dicabut: SIM mungkin sudah berbeda
+        self.invalidate(device_id)
+
+    def _on_status(self, delta):
+        for device_id in delta["removed"]:
+            self.invalidate(device_id)
+        for device_id in delta["status_changed"]:
+            self.invalidate(device_id)
+
+    def _on_sim_urc(self, device_id, urc):
+        # Dipanggil di thread reader port: hanya menghapus cache. +CPIN: READY
+        # juga dihitung karena SIM yang siap kembali bisa jadi SIM lain
+        logger.info(f"SIM state changed on {device_id}: {urc}")
+        self.invalidate(device_id)
+
+    def invalidate(self, device_id):
+        """Hapus cache SIM pada port dan lepaskan SimCard dari port tersebut"""
+        self.cache.invalidate(device_id)
+        with self.lock:
+            for sim in self.simcards.values():
+                if sim.port_device == device_id:
+                    sim.port_device = None
+
+    def detect_simcard(self, device_id, refresh=False):
+        """
+        Membaca ICCID, IMSI, MSISDN dan sinyal dari modem pada port tertentu
+
+        Hanya kelompok field yang belum ada atau sudah melewati TTL yang
+        dibaca dari modem; jika semuanya masih segar modem tidak disentuh.
+
+        Args:
+            device_id: ID port
+            refresh: Abaikan cache dan baca ulang semua field
+
+        Returns:
+            SimCard, atau None jika tidak ada SIM card
+        """
+        groups = (IDENTITY, SIGNAL)
+        if refresh:
+            self.cache.invalidate(device_id, groups)
+        stale = self.cache.stale_groups(device_id, groups)
+        if stale and not self._read_modem(device_id, stale):
+            return None
+
+        values = self.cache.values(device_id)
+        if not values.get("iccid"):
+            return None
+        return self._register(device_id, values)
+
+    def _read_modem(self, device_id, groups):
+        controller = self.port_service.port_controller
+        with controller.lease(device_id) as connection:
+            if connection is None:
+                return False
+
+            fields = []
+            if IDENTITY in groups:
+                fields += ["iccid", "imsi", "msisdn"]
+            if SIGNAL in groups:
+                fields.append("signal")
+            required = ("iccid",) if IDENTITY in groups else ()
+            result = controller.query(connection, fields, required=required)
+
+        if IDENTITY in groups:
+            if "iccid" not in result:
+                # Tidak di-cache: SIM bisa dipasang kapan saja
+                logger.debug(f"No SIM card detected on {device_id}")
+                self.cache.invalidate(device_id)
+                return False
+            self.cache.update(
+                device_id,
+                IDENTITY,
+                iccid=result["iccid"],
+                imsi=result.get("imsi"),
+                msisdn=result.get("msisdn"),
+            )
+        if SIGNAL in groups:
+            self.cache.update(device_id, SIGNAL, signal=result.get("signal", 0))
+        return True
+
+    def _register(self, device_id, values):
+        """Perbarui atau tambahkan SimCard dari nilai cache"""
+        iccid = values["iccid"]
+        with self.lock:
+            sim = self.simcards.get(iccid)
+            if sim is None:
+                sim = SimCard(iccid, values.get("msisdn"), values.get("signal", 0))
+                self.simcards[iccid] = sim
+            else:
+                sim.msisdn = values.get("msisdn") or "Unknown"
+                sim.signal = values.get("signal", 0)
+            sim.imsi = values.get("imsi")
+            sim.port_device = device_id
+            sim.last_updated = datetime.now()
+        return sim
+
+    def detect_simcards_from_ports(self, ports, max_workers=None, refresh=False):
+        """
+        Deteksi SIM card pada daftar port secara paralel
+
+        Args:
+            ports: List SerialPort yang akan diperiksa
+            max_workers: Jumlah thread (default: config max_workers)
+            refresh: Abaikan cache dan baca ulang semua field
+
+        Returns:
+            Jumlah SIM card yang terdeteksi
+        """
+        max_workers = max_workers or self.port_service.config["max_workers"]
+        detected = 0
+
+        def detect(port):
+            nonlocal detected
+            sim = self.detect_simcard(port.device_id, refresh)
+            if sim is None:
+                return
+            with self.lock:
+                detected += 1
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            executor.map(detect, ports)
+
+        logger.info(f"SIM card detection complete: {detected} detected")
+        return detected
+
+    def get_simcard_by_port(self, device_id):
+        """
+        SIM card yang terpasang pada port, dideteksi jika belum diketahui
+
+        Returns:
+            SimCard, atau None jika tidak ada SIM card
+        """
+        with self.lock:
+            for sim in self.simcards.values():
+                if sim.port_device == device_id:
+                    return sim
+        return self.detect_simcard(device_id)
+
+    def get_balance(self, device_id, key=None):
+        """
+        Respons cek pulsa yang masih segar dari cache
+
+        Args:
+            device_id: ID port
+            key: Kode USSD yang dipakai; cache kode lain diabaikan
+
+        Returns:
+            String respons, atau None jika tidak ada / sudah basi
+        """
+        cached = self.cache.get(device_id, BALANCE)
+        if cached is None or (key is not None and cached["key"] != key):
+            return None
+        return cached["balance"]
+
+    def set_balance(self, device_id, balance, key=None):
+        """Simpan respons cek pulsa ke cache"""
+        self.cache.update(device_id, BALANCE, balance=balance, key=key)
+
+    def get_all_simcards(self):
+        with self.lock:
+            return list(self.simcards.values())
+
+    def get_simcard_info(self, iccid):
+        """SimCard dari cache, tanpa mengirim perintah ke modem"""
+        with self.lock:
+            return self.simcards.get(iccid)
+
+    def get_cache_stats(self):
+        return self.cache.stats()
@@ -0,0 +1,361 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.services.sim_service import SIM_CHANGE_URCS
+from src.utils.pdu import decode_pdu, parse_message_listing
+
+logger = logging.getLogger(__name__)
+
+# +CMTI: "SM",3
+CMTI_PREFIX = "+CMTI:"
+CMT_PREFIX = "+CMT:"
+
+
+class SmsIngestion:
+    """
+    Pipeline SMS masuk dari semua modem
+
+    +CMTI dari UrcListener memicu pembacaan inbox modem tersebut; polling
+    AT+CMGL berkala menjadi jaring pengaman untuk notifikasi yang terlewat.
+    Pesan di-decode (PDU GSM 7-bit/UCS2/8-bit, bagian bersambung), ditulis
+    batch ke SmsStore, dan baru dihapus dari SIM setelah transaksi commit.
+    Burst +CMTI untuk modem yang sama digabung menjadi satu pembacaan.
+    """
+
+    def __init__(self, port_service, store, sim_service=None, poll_interval=30):
+        """
+        Args:
+            port_service: PortService sumber port dan URC
+            store: SmsStore tujuan
+            sim_service: SimService untuk ICCID/MSISDN penerima (opsional)
+            poll_interval: Interval polling AT+CMGL semua modem (detik)
+        """
+        self.port_service = port_service
+        self.controller = port_service.port_controller
+        self.store = store
+        self.sim_service = sim_service
+        self.poll_interval = poll_interval
+        self.executor = None
+
+        self.running = False
+        self.poll_thread = None
+        self._stop = threading.Event()
+        self.lock = threading.Lock()
+        self.scheduled = set()  # Port yang pembacaannya sudah diantrikan
+        self.rescan = set()  # Port yang dapat +CMTI lagi saat sedang dibaca
+        self.in_flight = {}  # device_id -> index SIM yang menunggu commit/hapus
+        # device_id -> index yang sudah commit tapi AT+CMGD-nya gagal; tetap
+        # in_flight agar tidak dibaca (dan disimpan) ulang, hapusnya diulang
+        self.undeleted = {}
+        self.owns_urc_listener = False  # start() yang menyalakan UrcListener
+        self.configured = set()  # Port yang sudah diatur AT+CNMI
+        self.sim_identity = {}  # device_id -> (iccid, msisdn)
+        # device_id -> generasi SIM; naik setiap kali SIM mungkin berganti,
+        # sehingga hasil lookup yang sedang berjalan tidak di-cache
+        self.sim_generation = {}
+
+        self.counters = {
+            "received": 0,
+            "stored": 0,
+            "deleted": 0,
+            "decode_errors": 0,
+            "read_errors": 0,
+        }
+
+    def start(self):
+        """Mulai mendengarkan +CMTI dan polling inbox semua modem"""
+        if self.running:
+            return False
+        self.running = True
+        self._stop.clear()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.port_service.config["max_workers"],
+            thread_name_prefix="sms-in",
+        )
+        self.port_service.subscribe_urc(
+            self._on_urc, (CMTI_PREFIX, CMT_PREFIX) + SIM_CHANGE_URCS
+        )
+        self.port_service.add_port_listener(self._on_port_event)
+        self.owns_urc_listener = self.port_service.start_urc_listener()
+
+        self.poll_thread = threading.Thread(
+            target=self._poll_loop, name="sms-poll", daemon=True
+        )
+        self.poll_thread.start()
+        logger.info("SMS ingestion started")
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+        self.running = False
+        self._stop.set()
+        self.port_service.unsubscribe_urc(self._on_urc)
+        self.port_service.remove_port_listener(self._on_port_event)
+        if self.owns_urc_listener:
+            self.port_service.stop_urc_listener()
+            self.owns_urc_listener = False
+        if self.poll_thread and self.poll_thread.is_alive():
+            self.poll_thread.join(timeout=2.0)
+        self.executor.shutdown(wait=True)
+        self.store.flush()
+        logger.info("SMS ingestion stopped")
+        return True
+
+    def _poll_loop(self):
+        while self.running:
+            for device_id in self.port_service.list_available_ports():
+                self.schedule(device_id)
+            self._stop.wait(self.poll_interval)
+
+    def _on_urc(self, device_id, urc):
+        # Dipanggil di thread reader port: jangan blocking
+        if urc.startswith(CMTI_PREFIX):
+            self.schedule(device_id)
+        elif urc.startswith(CMT_PREFIX):
+            # Lookup ICCID/MSISDN bisa membaca modem: jalankan di executor
+            try:
+                self.executor.submit(self._store_direct, device_id, urc)
+            except RuntimeError:
+                logger.warning(f"SMS ingestion stopped, +CMT on {device_id} dropped")
+        else:
+            # +CPIN: READY dan sejenisnya: SIM bisa berganti tanpa modem dicabut
+            self._forget_sim(device_id)
+
+    def _forget_sim(self, device_id):
+        with self.lock:
+            self.sim_identity.pop(device_id, None)
+            self.sim_generation[device_id] = self.sim_generation.get(device_id, 0) + 1
+
+    def _on_port_event(self, event, device_id, port):
+        # SIM bisa berganti saat modem dicabut/dicolok ulang
+        self._forget_sim(device_id)
+        with self.lock:
+            self.configured.discard(device_id)
+            # Index lama tidak berlaku lagi untuk SIM yang mungkin berbeda
+            for index in self.undeleted.pop(device_id, set()):
+                self.in_flight.get(device_id, set()).discard(index)
+
+    def schedule(self, device_id):
+        """Antrikan pembacaan inbox modem (digabung jika sudah ada)"""
+        with self.lock:
+            if device_id in self.scheduled:
+                self.rescan.add(device_id)
+                return False
+            self.scheduled.add(device_id)
+        try:
+            self.executor.submit(self._collect, device_id)
+        except RuntimeError:
+            # Executor sudah dimatikan
+            with self.lock:
+                self.scheduled.discard(device_id)
+            return False
+        return True
+
+    def _collect(self, device_id):
+        try:
+            while True:
+                with self.lock:
+                    self.rescan.discard(device_id)
+                self._read_inbox(device_id)
+                with self.lock:
+                    if device_id not in self.rescan or not self.running:
+                        self.scheduled.discard(device_id)
+                        return
+        except Exception as e:
+            logger.error(f"Error reading SMS from {device_id}: {e}")
+            with self.lock:
+                self.scheduled.discard(device_id)
+                self.counters["read_errors"] += 1
+
+    def _identity(self, device_id):
+        """(iccid, msisdn) SIM pada port; hasil kosong tidak di-cache"""
+        with self.lock:
+            identity = self.sim_identity.get(device_id)
+            generation = self.sim_generation.get(device_id, 0)
+        if identity is not None or self.sim_service is None:
+            return identity or (None, None)
+
+        sim = self.sim_service.get_simcard_by_port(device_id)
+        if sim is None or not (sim.iccid or sim.msisdn):
+            # Coba lagi pada pesan berikutnya (SIM belum siap/terdeteksi)
+            return (None, None)
+        identity = (sim.iccid, sim.msisdn)
+        with self.lock:
+            if self.sim_generation.get(device_id, 0) == generation:
+                self.sim_identity[device_id] = identity
+        return identity
+
+    def _read_inbox(self, device_id):
+        iccid, msisdn = self._identity(device_id)
+
+        with self.controller.lease(device_id) as connection:
+            if connection is None:
+                return
+            if device_id not in self.configured:
+                # Minta modem mengirim +CMTI untuk setiap SMS baru
+                self.controller.execute(connection, "AT+CNMI=2,1,0,0,0")
+                with self.lock:
+                    self.configured.add(device_id)
+
+            self._retry_delete(device_id, connection)
+
+            mode = self.controller.execute(connection, "AT+CMGF=0")
+            if mode is not None and mode.ok:
+                listing = self.controller.execute(connection, "AT+CMGL=4", timeout=10)
+            else:
+                # Modem tanpa mode PDU: baca mode teks
+                self.controller.execute(connection, "AT+CMGF=1")
+                listing = self.controller.execute(
+                    connection, 'AT+CMGL="ALL"', timeout=10
+                )
+
+        if listing is None or not listing.ok:
+            logger.debug(f"Cannot list SMS on {device_id}")
+            return
+
+        with self.lock:
+            in_flight = self.in_flight.setdefault(device_id, set())
+            messages = [
+                m for m in parse_message_listing(listing.text) if m[0] not in in_flight
+            ]
+            in_flight.update(index for index, _, _ in messages)
+        if not messages:
+            return
+
+        received_at = datetime.now().isoformat()
+        records = []
+        for index, sms, raw in messages:
+            record = {
+                "sim_index": index,
+                "iccid": iccid,
+                "msisdn": msisdn,
+                "device_id": device_id,
+                "received_at": received_at,
+                "pdu": raw,
+            }
+            if sms is None:
+                logger.warning(f"Cannot decode SMS {index} on {device_id}, storing raw")
+                with self.lock:
+                    self.counters["decode_errors"] += 1
+            else:
+                record.update(self._fields(sms))
+            records.append(record)
+
+        with self.lock:
+            self.counters["received"] += len(records)
+        logger.debug(f"Read {len(records)} SMS from {device_id}")
+        self.store.add(
+            records,
+            lambda committed: self._on_committed(device_id, committed),
+            lambda failed: self._release(device_id, failed),
+        )
+
+    def _fields(self, sms):
+        fields = {
+            "sender": sms.sender,
+            "text": sms.text,
+            "sent_at": sms.timestamp.isoformat() if sms.timestamp else None,
+            "smsc": sms.smsc,
+        }
+        if sms.is_part:
+            fields.update(reference=sms.reference, total=sms.total, seq=sms.seq)
+        return fields
+
+    def _store_direct(self, device_id, urc):
+        """+CMT: SMS dikirim langsung ke host (tidak tersimpan di SIM); di executor"""
+        lines = urc.split("\r\n")
+        try:
+            sms = decode_pdu(lines[-1])
+        except ValueError:
+            logger.warning(f"Cannot decode +CMT on {device_id}")
+            with self.lock:
+                self.counters["decode_errors"] += 1
+            return
+
+        try:
+            iccid, msisdn = self._identity(device_id)
+        except Exception as e:
+            logger.error(f"Cannot look up SIM on {device_id}: {e}")
+            iccid, msisdn = None, None
+        record = {
+            "iccid": iccid,
+            "msisdn": msisdn,
+            "device_id": device_id,
+            "received_at": datetime.now().isoformat(),
+            "pdu": lines[-1],
+        }
+        record.update(self._fields(sms))
+        with self.lock:
+            self.counters["received"] += 1
+        self.store.add([record], lambda committed: self._count_stored(committed))
+
+    def _count_stored(self, records):
+        with self.lock:
+            self.counters["stored"] += len(records)
+
+    def _on_committed(self, device_id, records):
+        # Dipanggil di thread writer: hapus dari SIM di executor
+        self._count_stored(records)
+        indexes = [r["sim_index"] for r in records]
+        try:
+            self.executor.submit(self._delete, device_id, indexes)
+        except RuntimeError:
+            self._delete(device_id, indexes)
+
+    def _release(self, device_id, records):
+        # Gagal disimpan: biarkan tetap di SIM dan baca ulang pada polling berikut
+        with self.lock:
+            self.in_flight.get(device_id, set()).difference_update(
+                r["sim_index"] for r in records
+            )
+
+    def _delete(self, device_id, indexes):
+        deleted = []
+        try:
+            with self.controller.lease(device_id) as connection:
+                if connection is not None:
+                    deleted = self._delete_indexes(device_id, connection, indexes)
+        finally:
+            # Index yang gagal dihapus sudah tersimpan: jangan dibaca ulang,
+            # AT+CMGD-nya diulang sebelum pembacaan inbox berikutnya
+            failed = set(indexes) - set(deleted)
+            with self.lock:
+                self.in_flight.get(device_id, set()).difference_update(deleted)
+                if failed:
+                    self.undeleted.setdefault(device_id, set()).update(failed)
+                self.counters["deleted"] += len(deleted)
+
+    def _retry_delete(self, device_id, connection):
+        with self.lock:
+            pending = sorted(self.undeleted.get(device_id, ()))
+        if not pending:
+            return
+        deleted = self._delete_indexes(device_id, connection, pending)
+        with self.lock:
+            self.undeleted.get(device_id, set()).difference_update(deleted)
+            self.in_flight.get(device_id, set()).difference_update(deleted)
+            self.counters["deleted"] += len(deleted)
+
+    def _delete_indexes(self, device_id, connection, indexes):
+        """Kirim AT+CMGD per index, kembalikan index yang berhasil dihapus"""
+        deleted = []
+        for index in indexes:
+            result = self.controller.execute(connection, f"AT+CMGD={index}")
+            if result is not None and result.ok:
+                deleted.append(index)
+            else:
+                logger.warning(f"Failed to delete SMS {index} on {device_id}")
+        return deleted
+
+    def stats(self):
+        """Counter pipeline dan status penyimpanan"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats["pending_ports"] = len(self.scheduled)
+            stats["in_flight"] = sum(len(i) for i in self.in_flight.values())
+            stats["undeleted"] = sum(len(i) for i in self.undeleted.values())
+        stats["store"] = self.store.stats()
+        return stats
@@ -0,0 +1,377 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Worker SIM berhenti jika antrian kosong selama ini (detik)
+WORKER_IDLE_TIMEOUT = 30
+# Jeda SIM setelah beberapa kegagalan berturut-turut
+FAILURE_THRESHOLD = 3
+FAILURE_COOLDOWN = 60
+# Jendela perhitungan throughput (detik)
+THROUGHPUT_WINDOW = 60
+
+
+def _rate_per_second(rate_per_minute):
+    """Laju token per detik; laju 0 atau negatif membuat acquire() tak berujung"""
+    if not rate_per_minute > 0:
+        raise ValueError(f"rate_per_minute must be > 0, got {rate_per_minute!r}")
+    return rate_per_minute / 60.0
+
+
+class TokenBucket:
+    """Token bucket thread-safe untuk membatasi laju kirim satu SIM"""
+
+    def __init__(self, rate_per_minute, capacity=1):
+        """
+        Args:
+            rate_per_minute: Token per menit (harus > 0)
+            capacity: Token maksimal yang bisa ditabung
+
+        Raises:
+            ValueError: Jika rate_per_minute tidak positif
+        """
+        self.rate = _rate_per_second(rate_per_minute)  # token per detik
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def configure(self, rate_per_minute, capacity):
+        """Ubah laju dan kapasitas tanpa membuang token yang tersisa"""
+        rate = _rate_per_second(rate_per_minute)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.capacity = max(1, capacity)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, stop=None):
+        """
+        Ambil satu token, tunggu jika belum tersedia
+
+        Args:
+            stop: threading.Event opsional untuk berhenti menunggu
+
+        Returns:
+            True jika token didapat, False jika dihentikan
+        """
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def refund(self):
+        """Kembalikan token yang tidak jadi dipakai"""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def available(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+class SmsJob:
+    """Satu SMS dalam pengiriman massal"""
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    def __init__(self, batch, recipient, text):
+        self.batch = batch
+        self.recipient = recipient
+        self.text = text
+        self.status = self.PENDING
+        self.attempts = 0
+        self.tried = set()  # Port yang sudah dicoba
+        self.device_id = None  # Port yang berhasil mengirim
+        self.reference = None  # Message reference dari +CMGS
+        self.sent_at = None
+
+    def __repr__(self):
+        return (
+            f"SmsJob(to={self.recipient}, status={self.status}, "
+            f"attempts={self.attempts}, device={self.device_id})"
+        )
+
+
+class SmsBatch:
+    """Progres satu panggilan send_bulk()"""
+
+    def __init__(self, messages):
+        self.jobs = [SmsJob(self, recipient, text) for recipient, text in messages]
+        self.started = time.monotonic()
+        self.finished = None
+        self.sent = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+        self._done = threading.Event()
+        if not self.jobs:
+            self._finish()
+
+    def _finish(self):
+        self.finished = time.monotonic()
+        self._done.set()
+
+    def _record(self, job):
+        with self.lock:
+            if job.status == SmsJob.SENT:
+                self.sent += 1
+            else:
+                self.failed += 1
+            if self.sent + self.failed == len(self.jobs):
+                self._finish()
+
+    def wait(self, timeout=None):
+        """Tunggu sampai semua SMS terkirim atau gagal"""
+        return self._done.wait(timeout)
+
+    def done(self):
+        return self._done.is_set()
+
+    def progress(self):
+        """Jumlah terkirim/gagal/tersisa dan throughput batch ini"""
+        with self.lock:
+            sent, failed = self.sent, self.failed
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return {
+            "total": len(self.jobs),
+            "sent": sent,
+            "failed": failed,
+            "pending": len(self.jobs) - sent - failed,
+            "elapsed": elapsed,
+            "per_minute": sent * 60 / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class BulkSmsSender:
+    """
+    Mesin pengiriman SMS massal
+
+    Satu worker per SIM mengambil SMS dari antrian bersama setelah mendapat
+    token dari token bucket SIM tersebut, sehingga SIM cepat mengirim lebih
+    banyak tanpa melampaui batas laju masing-masing. SMS yang gagal
+    dikembalikan ke depan antrian dan hanya diambil SIM yang belum
+    mencobanya.
+    """
+
+    def __init__(self, send, devices, rate_per_minute=10, burst=3, max_attempts=3):
+        """
+        Args:
+            send: Fungsi (device_id, nomor, teks) -> message reference atau None
+            devices: Fungsi tanpa argumen -> list port yang bisa mengirim
+            rate_per_minute: Batas SMS per menit per SIM
+            burst: Kapasitas token bucket (SMS beruntun tanpa jeda)
+            max_attempts: Percobaan maksimal per SMS
+
+        Raises:
+            ValueError: Jika rate_per_minute tidak positif
+        """
+        _rate_per_second(rate_per_minute)
+        self._send = send
+        self._devices = devices
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_attempts = max_attempts
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.workers = {}  # device_id -> Thread
+        self.buckets = {}  # device_id -> TokenBucket
+        self.device_stats = {}  # device_id -> {"sent", "failed", "consecutive"}
+        self.recent = deque()  # Waktu SMS terkirim untuk throughput
+        self.counters = {"sent": 0, "failed": 0, "retries": 0}
+        self._stop = threading.Event()
+
+    def configure(self, rate_per_minute, burst, max_attempts):
+        """Terapkan batas baru ke semua SIM, termasuk yang sedang mengirim"""
+        _rate_per_second(rate_per_minute)
+        with self.condition:
+            self.rate_per_minute = rate_per_minute
+            self.burst = burst
+            self.max_attempts = max_attempts
+            for bucket in self.buckets.values():
+                bucket.configure(rate_per_minute, burst)
+
+    def send_bulk(self, messages):
+        """
+        Antrikan banyak SMS
+
+        Args:
+            messages: Iterable (nomor tujuan, isi pesan)
+
+        Returns:
+            SmsBatch
+        """
+        batch = SmsBatch(messages)
+        if not batch.jobs:
+            return batch
+
+        devices = self._devices()
+        if not devices:
+            logger.warning("No available SIM for bulk SMS")
+            for job in batch.jobs:
+                self._fail(job)
+            return batch
+
+        with self.condition:
+            self.queue.extend(batch.jobs)
+            self.condition.notify_all()
+        self._ensure_workers(devices)
+        logger.info(f"Queued {len(batch.jobs)} SMS across {len(devices)} SIMs")
+        return batch
+
+    def _ensure_workers(self, devices):
+        with self.condition:
+            for device_id in devices:
+                worker = self.workers.get(device_id)
+                if worker is not None and worker.is_alive():
+                    continue
+                self.buckets.setdefault(
+                    device_id, TokenBucket(self.rate_per_minute, self.burst)
+                )
+                self.device_stats.setdefault(
+                    device_id, {"sent": 0, "failed": 0, "consecutive": 0}
+                )
+                worker = threading.Thread(
+                    target=self._worker, args=(device_id,), name=f"sms-{device_id}"
+                )
+                worker.daemon = True
+                self.workers[device_id] = worker
+                worker.start()
+
+    def _has_job_for(self, device_id):
+        return any(device_id not in job.tried for job in self.queue)
+
+    def _take_job(self, device_id):
+        for job in self.queue:
+            if device_id not in job.tried:
+                self.queue.remove(job)
+                return job
+        return None
+
+    def _worker(self, device_id):
+        bucket = self.buckets[device_id]
+        stats = self.device_stats[device_id]
+
+        while not self._stop.is_set():
+            with self.condition:
+                if not self.condition.wait_for(
+                    lambda: self._has_job_for(device_id) or self._stop.is_set(),
+                    timeout=WORKER_IDLE_TIMEOUT,
+                ):
+                    break
+            if not bucket.acquire(self._stop):
+                break
+            with self.condition:
+                job = self._take_job(device_id)
+            if job is None:
+                # Diambil SIM lain selagi menunggu token
+                bucket.refund()
+                continue
+
+            job.attempts += 1
+            job.tried.add(device_id)
+            reference = self._send(device_id, job.recipient, job.text)
+            if reference is not None:
+                self._succeed(job, device_id, reference)
+                stats["consecutive"] = 0
+                continue
+
+            stats["failed"] += 1
+            stats["consecutive"] += 1
+            self._retry_or_fail(job)
+            if stats["consecutive"] >= FAILURE_THRESHOLD:
+                logger.warning(
+                    f"{device_id} failed {stats['consecutive']} SMS in a row, "
+                    f"pausing for {FAILURE_COOLDOWN}s"
+                )
+                stats["consecutive"] = 0
+                if self._stop.wait(FAILURE_COOLDOWN):
+                    break
+
+        with self.condition:
+            if self.workers.get(device_id) is threading.current_thread():
+                del self.workers[device_id]
+            # SMS yang hanya bisa diambil SIM yang sudah tidak punya worker
+            orphans = [
+                job
+                for job in self.queue
+                if not any(d not in job.tried for d in self.workers)
+            ]
+            for job in orphans:
+                self.queue.remove(job)
+        for job in orphans:
+            self._fail(job)
+
+    def _succeed(self, job, device_id, reference):
+        job.status = SmsJob.SENT
+        job.device_id = device_id
+        job.reference = reference
+        job.sent_at = time.monotonic()
+        with self.condition:
+            self.counters["sent"] += 1
+            self.device_stats[device_id]["sent"] += 1
+            self.recent.append(job.sent_at)
+        job.batch._record(job)
+
+    def _retry_or_fail(self, job):
+        devices = set(self._devices())
+        if job.attempts < self.max_attempts and devices - job.tried:
+            with self.condition:
+                self.counters["retries"] += 1
+                self.queue.appendleft(job)
+                self.condition.notify_all()
+            self._ensure_workers(devices - job.tried)
+            return
+        self._fail(job)
+
+    def _fail(self, job):
+        job.status = SmsJob.FAILED
+        logger.warning(f"SMS to {job.recipient} failed after {job.attempts} attempts")
+        with self.condition:
+            self.counters["failed"] += 1
+        job.batch._record(job)
+
+    def stats(self):
+        """Counter global, throughput 60 detik terakhir dan status per SIM"""
+        now = time.monotonic()
+        with self.condition:
+            while self.recent and now - self.recent[0] > THROUGHPUT_WINDOW:
+                self.recent.popleft()
+            return {
+                **self.counters,
+                "queued": len(self.queue),
+                "per_minute": len(self.recent) * 60 / THROUGHPUT_WINDOW,
+                "workers": len(self.workers),
+                "devices": {
+                    device_id: {
+                        "sent": s["sent"],
+                        "failed": s["failed"],
+                        "tokens": self.buckets[device_id].available(),
+                    }
+                    for device_id, s in self.device_stats.items()
+                },
+            }
+
+    def shutdown(self):
+        """Hentikan semua worker; SMS yang masih antri tidak dikirim"""
+        self._stop.set()
+        with self.condition:
+            self.condition.notify_all()
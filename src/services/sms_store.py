@@ -0,0 +1,331 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sms (
+    id INTEGER PRIMARY KEY,
+    iccid TEXT,
+    msisdn TEXT,
+    device_id TEXT,
+    sender TEXT,
+    text TEXT,
+    sent_at TEXT,
+    received_at TEXT NOT NULL,
+    smsc TEXT,
+    parts INTEGER NOT NULL DEFAULT 1,
+    pdu TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sms_iccid ON sms (iccid, received_at);
+CREATE INDEX IF NOT EXISTS idx_sms_msisdn ON sms (msisdn, received_at);
+CREATE INDEX IF NOT EXISTS idx_sms_sender ON sms (sender, received_at);
+CREATE INDEX IF NOT EXISTS idx_sms_received_at ON sms (received_at);
+
+-- Bagian SMS bersambung yang belum lengkap
+CREATE TABLE IF NOT EXISTS sms_parts (
+    iccid TEXT NOT NULL DEFAULT '',
+    sender TEXT NOT NULL,
+    reference INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    msisdn TEXT,
+    device_id TEXT,
+    text TEXT,
+    sent_at TEXT,
+    received_at TEXT NOT NULL,
+    smsc TEXT,
+    pdu TEXT,
+    PRIMARY KEY (iccid, sender, reference, seq)
+);
+"""
+
+SMS_COLUMNS = (
+    "iccid",
+    "msisdn",
+    "device_id",
+    "sender",
+    "text",
+    "sent_at",
+    "received_at",
+    "smsc",
+    "parts",
+    "pdu",
+)
+PART_COLUMNS = (
+    "iccid",
+    "sender",
+    "reference",
+    "total",
+    "seq",
+    "msisdn",
+    "device_id",
+    "text",
+    "sent_at",
+    "received_at",
+    "smsc",
+    "pdu",
+)
+
+
+class SmsStore:
+    """
+    Penyimpanan SMS masuk di SQLite dengan penulisan batch
+
+    Semua penulisan dilakukan satu thread writer: record dari banyak modem
+    dikumpulkan lalu ditulis dalam satu transaksi per batch, kemudian
+    callback on_commit dipanggil (misalnya untuk menghapus SMS dari SIM).
+    Bagian SMS bersambung disimpan di sms_parts sampai lengkap, lalu
+    digabung menjadi satu baris sms.
+    """
+
+    def __init__(
+        self, db_file="sms.db", batch_size=200, flush_interval=0.5, part_timeout=3600
+    ):
+        """
+        Args:
+            db_file: Lokasi database SQLite
+            batch_size: Maksimal record per transaksi
+            flush_interval: Waktu tunggu maksimal (detik) sebelum batch ditulis
+            part_timeout: Bagian SMS bersambung yang lebih tua dari ini (detik)
+                digabung apa adanya walaupun belum lengkap
+        """
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.part_timeout = part_timeout
+        self.queue = queue.Queue()
+        self.committed = 0
+        self.batches = 0
+        self.last_part_sweep = 0.0
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="sms-store", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_file, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def add(self, records, on_commit=None, on_error=None):
+        """
+        Antrikan record SMS untuk ditulis
+
+        Args:
+            records: List dict dengan key SMS_COLUMNS; bagian SMS bersambung
+                juga membawa reference, total dan seq
+            on_commit: Fungsi (records) yang dipanggil setelah transaksi commit
+            on_error: Fungsi (records) yang dipanggil jika transaksi gagal
+        """
+        self.queue.put((list(records), on_commit, on_error))
+
+    def flush(self):
+        """Tunggu sampai semua record yang sudah diantrikan ditulis"""
+        self.queue.join()
+
+    def close(self):
+        if not self.running:
+            return
+        self.flush()
+        self.running = False
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _run(self):
+        connection = self._connect()
+        try:
+            while self.running:
+                batch = self._collect_batch()
+                if batch is None:
+                    break
+                if batch:
+                    self._write_batch(connection, batch)
+                self._sweep_parts(connection)
+        finally:
+            connection.close()
+
+    def _collect_batch(self):
+        """Ambil item antrian sampai batch_size record atau flush_interval habis"""
+        try:
+            item = self.queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        if item is None:
+            self.queue.task_done()
+            return None
+
+        batch = [item]
+        count = len(item[0])
+        deadline = time.monotonic() + self.flush_interval
+        while count < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=max(0.0, remaining))
+            except queue.Empty:
+                break
+            if item is None:
+                # Tulis batch ini dulu, lalu berhenti
+                self.queue.task_done()
+                self.running = False
+                break
+            batch.append(item)
+            count += len(item[0])
+        return batch
+
+    def _write_batch(self, connection, batch):
+        records = [record for records, _, _ in batch for record in records]
+        singles = [r for r in records if r.get("total", 1) <= 1]
+        parts = [r for r in records if r.get("total", 1) > 1]
+
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO sms ({', '.join(SMS_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(SMS_COLUMNS))})",
+                    [
+                        tuple(r.get(c) for c in SMS_COLUMNS[:-2])
+                        + (r.get("parts", 1), r.get("pdu"))
+                        for r in singles
+                    ],
+                )
+                connection.executemany(
+                    f"INSERT OR IGNORE INTO sms_parts ({', '.join(PART_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(PART_COLUMNS))})",
+                    [
+                        (r.get("iccid") or "",)
+                        + tuple(r.get(c) for c in PART_COLUMNS[1:])
+                        for r in parts
+                    ],
+                )
+                groups = {
+                    (r.get("iccid") or "", r["sender"], r["reference"]) for r in parts
+                }
+                for group in groups:
+                    self._assemble(connection, group)
+            self.committed += len(records)
+            self.batches += 1
+            committed = True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to store {len(records)} SMS: {e}")
+            committed = False
+
+        for records, on_commit, on_error in batch:
+            callback = on_commit if committed else on_error
+            if callback:
+                try:
+                    callback(records)
+                except Exception as e:
+                    logger.error(f"Error in SMS store callback: {e}")
+            self.queue.task_done()
+
+    def _assemble(self, connection, group, force=False):
+        """Gabungkan bagian SMS bersambung jika sudah lengkap (atau force)"""
+        rows = connection.execute(
+            "SELECT * FROM sms_parts WHERE iccid = ? AND sender = ? AND reference = ? "
+            "ORDER BY seq",
+            group,
+        ).fetchall()
+        if not rows or (len(rows) < rows[0]["total"] and not force):
+            return False
+
+        first = rows[0]
+        connection.execute(
+            f"INSERT INTO sms ({', '.join(SMS_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(SMS_COLUMNS))})",
+            (
+                first["iccid"] or None,
+                first["msisdn"],
+                first["device_id"],
+                first["sender"],
+                "".join(row["text"] or "" for row in rows),
+                first["sent_at"],
+                max(row["received_at"] for row in rows),
+                first["smsc"],
+                len(rows),
+                "\n".join(row["pdu"] or "" for row in rows),
+            ),
+        )
+        connection.execute(
+            "DELETE FROM sms_parts WHERE iccid = ? AND sender = ? AND reference = ?",
+            group,
+        )
+        if force:
+            logger.warning(
+                f"Stored incomplete SMS from {first['sender']}: "
+                f"{len(rows)}/{first['total']} parts"
+            )
+        return True
+
+    def _sweep_parts(self, connection):
+        """Gabungkan bagian SMS yang sudah terlalu lama menunggu sisanya"""
+        now = time.monotonic()
+        if now - self.last_part_sweep < 60:
+            return
+        self.last_part_sweep = now
+
+        cutoff = (datetime.now() - timedelta(seconds=self.part_timeout)).isoformat()
+        try:
+            with connection:
+                groups = connection.execute(
+                    "SELECT iccid, sender, reference FROM sms_parts "
+                    "GROUP BY iccid, sender, reference HAVING MAX(received_at) < ?",
+                    (cutoff,),
+                ).fetchall()
+                for group in groups:
+                    self._assemble(connection, tuple(group), force=True)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to sweep SMS parts: {e}")
+
+    def query(self, iccid=None, msisdn=None, sender=None, since=None, limit=100):
+        """
+        Cari SMS tersimpan, terbaru lebih dulu
+
+        Args:
+            iccid: Filter ICCID SIM penerima
+            msisdn: Filter nomor SIM penerima
+            sender: Filter pengirim
+            since: datetime atau string ISO; hanya SMS yang diterima setelahnya
+            limit: Jumlah maksimal hasil
+
+        Returns:
+            List dict
+        """
+        conditions = []
+        params = []
+        for column, value in (("iccid", iccid), ("msisdn", msisdn), ("sender", sender)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("received_at > ?")
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+
+        sql = "SELECT * FROM sms"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY received_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        connection = self._connect()
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def stats(self):
+        return {
+            "committed": self.committed,
+            "batches": self.batches,
+            "queued": self.queue.qsize(),
+        }
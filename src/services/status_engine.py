@@ -0,0 +1,179 @@
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class StatusEngine:
+    """
+    Satu-satunya loop probe status port, dibagi ke semua konsumen
+
+    Konsumen (PortMonitor, CLI, service lain) berlangganan lewat subscribe()
+    tanpa menambah beban probe. Subscriber hanya menerima delta: port yang
+    ditambah/dihapus dan perubahan status/active, masing-masing dengan
+    nomor urut (seq) yang selalu naik. Snapshot penuh tersedia lewat
+    snapshot().
+    """
+
+    def __init__(self, port_service, interval=2):
+        """
+        Args:
+            port_service: PortService yang port-nya dimonitor
+            interval: Jeda antar tick dalam detik
+        """
+        self.port_service = port_service
+        self.interval = interval
+        self.subscribers = []
+        self.running = False
+        self.thread = None
+        self.users = 0
+        self.last_state = {}
+        self.last_version = None  # Versi PortSnapshot yang terakhir dibandingkan
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.publish_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def subscribe(self, handler):
+        """
+        Menambahkan subscriber perubahan status
+
+        Args:
+            handler: Fungsi yang menerima dict delta (lihat publish())
+        """
+        if callable(handler):
+            self.subscribers.append(handler)
+            return True
+        return False
+
+    def unsubscribe(self, handler):
+        """Menghapus subscriber"""
+        if handler in self.subscribers:
+            self.subscribers.remove(handler)
+            return True
+        return False
+
+    def start(self):
+        """Mendaftarkan satu pengguna; thread probe dijalankan sekali saja"""
+        with self.lock:
+            self.users += 1
+            if self.running:
+                return True
+
+            self.running = True
+            self._wake.clear()
+            self.thread = threading.Thread(
+                target=self._run, name="status-engine", daemon=True
+            )
+            self.thread.start()
+        logger.info("Status engine started")
+        return True
+
+    def stop(self):
+        """Melepas satu pengguna; thread berhenti jika tidak ada pengguna lagi"""
+        with self.lock:
+            if self.users > 0:
+                self.users -= 1
+            if self.users > 0 or not self.running:
+                return False
+        return self.shutdown()
+
+    def shutdown(self):
+        """Menghentikan thread probe tanpa memperhatikan jumlah pengguna"""
+        with self.lock:
+            if not self.running:
+                return False
+            self.running = False
+            self.users = 0
+        self._wake.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        logger.info("Status engine stopped")
+        return True
+
+    def poke(self):
+        """Minta tick berikutnya segera dijalankan (misalnya setelah enable/disable)"""
+        self._wake.set()
+
+    def _run(self):
+        logger.debug("Status engine thread started")
+
+        while self.running:
+            try:
+                self.port_service.run_scheduled_probes()
+                self.publish()
+                wait = self.interval
+            except Exception as e:
+                logger.error(f"Error in status engine: {str(e)}")
+                wait = 5  # Wait a bit longer if there was an error
+
+            self._wake.wait(wait)
+            self._wake.clear()
+
+        logger.debug("Status engine thread stopped")
+
+    def _compute_delta(self, previous, current, ports):
+        added = {d: ports[d] for d in sorted(current.keys() - previous.keys())}
+        removed = sorted(previous.keys() - current.keys())
+        common = current.keys() & previous.keys()
+        status_changed = {
+            d: (previous[d][0], current[d][0])
+            for d in common
+            if previous[d][0] != current[d][0]
+        }
+        active_changed = {
+            d: (previous[d][1], current[d][1])
+            for d in common
+            if previous[d][1] != current[d][1]
+        }
+        if not (added or removed or status_changed or active_changed):
+            return None
+        return {
+            "added": added,
+            "removed": removed,
+            "status_changed": status_changed,
+            "active_changed": active_changed,
+        }
+
+    def publish(self):
+        """
+        Kirim delta ke subscriber jika ada perubahan sejak publikasi terakhir
+
+        Delta berisi:
+            seq: Nomor urut yang selalu naik
+            timestamp: Waktu delta dibuat
+            added: Dict device_id -> port untuk port baru
+            removed: List device_id port yang hilang
+            status_changed: Dict device_id -> (status lama, status baru)
+            active_changed: Dict device_id -> (active lama, active baru)
+        """
+        with self.publish_lock:
+            # Snapshot dengan versi sama berarti tidak ada perubahan
+            snapshot = self.port_service.snapshot()
+            if snapshot.version == self.last_version:
+                return None
+            self.last_version = snapshot.version
+            state = snapshot.states
+            delta = self._compute_delta(self.last_state, state, snapshot.ports)
+            if delta is None:
+                return None
+            self.last_state = state
+            self.seq += 1
+            delta["seq"] = self.seq
+            delta["timestamp"] = datetime.now()
+
+            for handler in list(self.subscribers):
+                try:
+                    handler(delta)
+                except Exception as e:
+                    logger.error(f"Error in status subscriber: {e}")
+            return delta
+
+    def snapshot(self):
+        """Snapshot penuh semua port (non-blocking, tanpa probe)"""
+        return {
+            "seq": self.seq,
+            "timestamp": datetime.now(),
+            "ports": self.port_service.list_all_ports(),
+        }
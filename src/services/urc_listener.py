@@ -0,0 +1,100 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class UrcListener:
+    """
+    Menjaga satu ModemChannel per port tersedia dan meneruskan URC
+    (+CUSD, +CMTI, +CREG, RING, +CMGS, ...) ke subscriber begitu tiba
+
+    Channel dibuka untuk semua port tersedia saat start(), untuk port baru
+    lewat event port PortService, dan dibuka ulang saat status engine
+    melaporkan port kembali terhubung.
+    """
+
+    def __init__(self, port_service):
+        self.port_service = port_service
+        self.controller = port_service.port_controller
+        self.subscribers = []  # (handler, prefixes)
+        self.running = False
+        self.lock = threading.Lock()
+
+    def subscribe(self, handler, prefixes=None):
+        """
+        Menambahkan subscriber URC
+
+        Args:
+            handler: Fungsi (device_id, urc) yang dipanggil di thread reader
+                port; jangan melakukan operasi blocking di dalamnya
+            prefixes: Tuple prefix URC yang diinginkan (None = semua)
+        """
+        if not callable(handler):
+            return False
+        prefixes = tuple(prefixes) if prefixes else None
+        with self.lock:
+            self.subscribers.append((handler, prefixes))
+        return True
+
+    def unsubscribe(self, handler):
+        """Menghapus subscriber URC"""
+        with self.lock:
+            before = len(self.subscribers)
+            self.subscribers = [s for s in self.subscribers if s[0] != handler]
+            return len(self.subscribers) != before
+
+    def start(self):
+        """Buka channel untuk semua port tersedia"""
+        if self.running:
+            return False
+        self.running = True
+        self.port_service.add_port_listener(self._on_port_event)
+        self.port_service.subscribe_status(self._on_status)
+        for device_id in self.port_service.list_available_ports():
+            self.ensure(device_id)
+        logger.info("URC listener started")
+        return True
+
+    def stop(self):
+        """Tutup semua channel"""
+        if not self.running:
+            return False
+        self.running = False
+        self.port_service.remove_port_listener(self._on_port_event)
+        self.port_service.unsubscribe_status(self._on_status)
+        for device_id in list(self.controller.channels):
+            self.controller.close_channel(device_id)
+        logger.info("URC listener stopped")
+        return True
+
+    def ensure(self, device_id):
+        """Pastikan channel untuk port berjalan (dibuka ulang jika mati)"""
+        if not self.running:
+            return None
+        return self.controller.open_channel(device_id, self._dispatch)
+
+    def _on_port_event(self, event, device_id, port):
+        if event == "removed":
+            self.controller.close_channel(device_id)
+        elif port.is_connected():
+            self.ensure(device_id)
+
+    def _on_status(self, delta):
+        for device_id, port in delta["added"].items():
+            if port.is_connected():
+                self.ensure(device_id)
+        for device_id, (_, status) in delta["status_changed"].items():
+            if status == "connected":
+                self.ensure(device_id)
+
+    def _dispatch(self, device_id, urc):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for handler, prefixes in subscribers:
+            if prefixes is not None and not urc.startswith(prefixes):
+                continue
+            try:
+                handler(device_id, urc)
+            except Exception as e:
+                logger.error(f"Error in URC subscriber: {e}")
@@ -0,0 +1,617 @@
+import fcntl
+import heapq
+import itertools
+import os
+import random
+import re
+import selectors
+import termios
+import threading
+import time
+import tty
+from datetime import datetime
+
+import serial.tools.list_ports
+from serial.tools.list_ports_common import ListPortInfo
+
+from src.utils.logging import get_logger
+from src.utils.pdu import GSM7_BASIC, GSM7_EXTENSION
+
+logger = get_logger("simulator.modem_farm")
+
+BAUD_CONSTANTS = {
+    getattr(termios, f"B{rate}"): rate
+    for rate in (9600, 19200, 38400, 57600, 115200, 230400, 460800)
+    if hasattr(termios, f"B{rate}")
+}
+# pyserial memakai select(), yang hanya menerima fd < FD_SETSIZE; fd milik
+# simulator dipindah ke atas batas ini agar fd milik host tetap rendah
+FD_SETSIZE = 1024
+CTRL_Z = b"\x1a"
+ESC = b"\x1b"
+
+CUSD_PATTERN = re.compile(r'AT\+CUSD=1,"([^"]*)"', re.IGNORECASE)
+CMGS_PATTERN = re.compile(r'AT\+CMGS="?([^"]*)"?', re.IGNORECASE)
+INDEX_PATTERN = re.compile(r"AT\+CMG[RD]=(\d+)", re.IGNORECASE)
+SMS_STORAGE_SIZE = 50
+GSM7_REVERSE = {char: septet for septet, char in enumerate(GSM7_BASIC)}
+GSM7_EXTENSION_REVERSE = {char: septet for septet, char in GSM7_EXTENSION.items()}
+
+
+def _ensure_fd_limit(count):
+    """Naikkan batas soft RLIMIT_NOFILE agar cukup untuk count modem"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = FD_SETSIZE + 4 * count + 64
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def _relocate_fd(fd):
+    """Pindahkan fd ke nomor >= FD_SETSIZE jika memungkinkan"""
+    try:
+        high = fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, FD_SETSIZE)
+    except OSError:
+        return fd
+    os.close(fd)
+    return high
+
+
+def _semi_octets(digits):
+    digits = digits + "F" * (len(digits) % 2)
+    return "".join(digits[i + 1] + digits[i] for i in range(0, len(digits), 2))
+
+
+def _pack_gsm7(septets, padding=0):
+    bits = 0
+    for i, septet in enumerate(septets):
+        bits |= septet << (padding + 7 * i)
+    length = (padding + 7 * len(septets) + 7) // 8
+    return bits.to_bytes(length, "little")
+
+
+def encode_deliver(sender, text, timestamp=None, concat=None):
+    """
+    Buat PDU SMS-DELIVER (dengan SMSC) seperti yang disimpan modem di SIM
+
+    Args:
+        sender: Nomor pengirim (+62...)
+        text: Isi SMS; GSM 7-bit jika memungkinkan, selain itu UCS2
+        timestamp: datetime service centre (default: sekarang)
+        concat: Tuple (reference, total, seq) untuk SMS bersambung
+
+    Returns:
+        Tuple (PDU hex, panjang TPDU dalam octet)
+    """
+    timestamp = timestamp or datetime.now()
+    digits = sender.lstrip("+")
+    address = f"{len(digits):02X}{'91' if sender.startswith('+') else '81'}"
+    address += _semi_octets(digits)
+    scts = _semi_octets(timestamp.strftime("%y%m%d%H%M%S")) + "82"  # GMT+7
+
+    udh = b""
+    if concat:
+        udh = bytes([5, 0x00, 3, concat[0] & 0xFF, concat[1], concat[2]])
+
+    septets = []
+    for char in text:
+        if char in GSM7_REVERSE:
+            septets.append(GSM7_REVERSE[char])
+        elif char in GSM7_EXTENSION_REVERSE:
+            septets.extend((0x1B, GSM7_EXTENSION_REVERSE[char]))
+        else:
+            septets = None
+            break
+
+    if septets is not None:
+        header_septets = (len(udh) * 8 + 6) // 7
+        padding = header_septets * 7 - len(udh) * 8
+        body = _pack_gsm7(septets, padding)
+        user_data = udh + body
+        dcs, udl = 0x00, header_septets + len(septets)
+    else:
+        user_data = udh + text.encode("utf-16-be")
+        dcs, udl = 0x08, len(user_data)
+
+    first_octet = 0x44 if udh else 0x04
+    tpdu = (
+        f"{first_octet:02X}{address}00{dcs:02X}{scts}{udl:02X}{user_data.hex().upper()}"
+    )
+    smsc = "07912658050000F0"  # +62855000000
+    return smsc + tpdu, len(tpdu) // 2
+
+
+def split_sms(text, reference):
+    """Pecah SMS panjang menjadi bagian bersambung (batas sederhana per karakter)"""
+    gsm7 = all(c in GSM7_REVERSE or c in GSM7_EXTENSION_REVERSE for c in text)
+    single, part = (160, 153) if gsm7 else (70, 67)
+    if len(text) <= single:
+        return [(text, None)]
+    chunks = [text[i : i + part] for i in range(0, len(text), part)]
+    return [
+        (chunk, (reference, len(chunks), seq))
+        for seq, chunk in enumerate(chunks, start=1)
+    ]
+
+
+class SimulatedModem:
+    """Satu modem palsu di balik pasangan pseudo-terminal"""
+
+    def __init__(
+        self,
+        index,
+        latency=0.005,
+        jitter=0.0,
+        error_rate=0.0,
+        baudrate=None,
+        echo=False,
+        urcs=None,
+        urc_interval=None,
+        ussd_delay=0.5,
+        ussd_reply="Sisa pulsa Anda Rp10.000",
+        sms_delay=0.5,
+        operator="IM3",
+        rng=None,
+    ):
+        """
+        Args:
+            index: Nomor modem (dipakai untuk ICCID/IMSI/MSISDN/IMEI unik)
+            latency: Waktu respons dasar dalam detik
+            jitter: Variasi acak tambahan (0..jitter detik)
+            error_rate: Peluang perintah dijawab ERROR (0.0 - 1.0)
+            baudrate: Baud rate yang diharapkan; jika port dibuka dengan baud
+                berbeda, modem membalas byte acak seperti modem sungguhan
+            echo: Echo perintah (ATE1)
+            urcs: List URC yang dikirim berkala (contoh: ["RING", "+CREG: 1"])
+            urc_interval: Interval URC dalam detik (None = tidak ada URC)
+            ussd_delay: Jeda sebelum URC +CUSD dikirim
+            ussd_reply: Teks balasan USSD
+            sms_delay: Jeda sebelum +CMGS dikirim
+            operator: Nama operator untuk AT+COPS?
+            rng: random.Random bersama (opsional)
+        """
+        self.index = index
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.baudrate = baudrate
+        self.echo = echo
+        self.urcs = list(urcs or [])
+        self.urc_interval = urc_interval
+        self.ussd_delay = ussd_delay
+        self.ussd_reply = ussd_reply
+        self.sms_delay = sms_delay
+        self.operator = operator
+        self.rng = rng or random.Random(index)
+
+        self.iccid = f"8962{index:015d}"
+        self.imsi = f"51021{index:010d}"
+        self.msisdn = f"0857{index:08d}"
+        self.imei = f"86{index:013d}"
+        self.signal = 10 + index % 20
+
+        self.text_mode = False
+        self.sms_reference = 0
+        self.pending_sms = None  # Nomor tujuan saat menunggu isi SMS
+        self.sms_body = bytearray()
+        self.sent_sms = []
+        self.inbox = {}  # index SIM -> (status, PDU hex, panjang TPDU)
+        self.received_reference = index % 256
+        self.commands = 0
+        self.last_due = 0.0
+        self._line = bytearray()
+
+        master_fd, slave_fd = os.openpty()
+        tty.setraw(slave_fd)
+        self.device = os.ttyname(slave_fd)
+        # Slave tetap dibuka agar master tidak EIO saat host menutup port
+        self.master_fd = _relocate_fd(master_fd)
+        self.slave_fd = _relocate_fd(slave_fd)
+        os.set_blocking(self.master_fd, False)
+
+    def port_info(self):
+        """ListPortInfo ala comports() untuk modem ini"""
+        info = ListPortInfo(self.device, skip_link_detection=True)
+        info.description = f"Simulated GSM Modem {self.index}"
+        info.manufacturer = "x-im3 simulator"
+        info.product = "Simulated GSM Modem"
+        info.vid = 0x12D1
+        info.pid = 0x1001
+        info.serial_number = f"SIM{self.index:04d}"
+        info.location = f"1-1.{self.index}:1.0"
+        info.hwid = info.usb_info()
+        return info
+
+    def baud_matches(self):
+        if self.baudrate is None:
+            return True
+        try:
+            speed = termios.tcgetattr(self.master_fd)[4]
+        except termios.error:
+            return True
+        return BAUD_CONSTANTS.get(speed) == self.baudrate
+
+    def response_delay(self):
+        return self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+
+    def feed(self, data):
+        """
+        Memproses byte dari host
+
+        Returns:
+            List (delay, bytes) respons yang harus dikirim
+        """
+        if not self.baud_matches():
+            # Baud tidak cocok: host hanya menerima sampah
+            return [
+                (self.response_delay(), bytes(self.rng.randrange(256) for _ in data))
+            ]
+
+        outputs = []
+        for byte in data:
+            byte = bytes([byte])
+            if self.pending_sms is not None:
+                outputs.extend(self._feed_sms(byte))
+                continue
+            if self.echo:
+                outputs.append((0, byte))
+            if byte == b"\r":
+                line = self._line.decode("utf-8", errors="ignore").strip()
+                self._line.clear()
+                if line:
+                    outputs.extend(self.handle_command(line))
+            elif byte != b"\n":
+                self._line.extend(byte)
+        return outputs
+
+    def _feed_sms(self, byte):
+        if byte == ESC:
+            self.pending_sms = None
+            self.sms_body.clear()
+            return [(self.response_delay(), b"\r\nOK\r\n")]
+        if byte != CTRL_Z:
+            self.sms_body.extend(byte)
+            return []
+
+        self.sent_sms.append(
+            (self.pending_sms, self.sms_body.decode("utf-8", "ignore"))
+        )
+        self.pending_sms = None
+        self.sms_body.clear()
+        self.sms_reference = (self.sms_reference + 1) % 256
+        reply = f"\r\n+CMGS: {self.sms_reference}\r\n\r\nOK\r\n"
+        return [(self.sms_delay + self.response_delay(), reply.encode())]
+
+    def handle_command(self, line):
+        """Jawaban untuk satu baris perintah AT"""
+        self.commands += 1
+        delay = self.response_delay()
+        command = line.upper()
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return [(delay, b"\r\nERROR\r\n")]
+
+        if command.startswith(("AT+CMGL", "AT+CMGR=", "AT+CMGD=")):
+            return self._handle_storage(command, delay)
+
+        if command in ("AT", "ATZ", "AT&F") or command.startswith(
+            ("AT+CMGF=", "AT+CNMI=")
+        ):
+            if command.startswith("AT+CMGF="):
+                self.text_mode = command.endswith("1")
+            return [(delay, b"\r\nOK\r\n")]
+        if command in ("ATE0", "ATE1"):
+            self.echo = command == "ATE1"
+            return [(delay, b"\r\nOK\r\n")]
+
+        if ";" in command:
+            # Beberapa query dalam satu baris (AT+CCID;+CNUM;+CSQ): satu OK
+            parts = [
+                part if part.startswith("AT") else "AT" + part
+                for part in command.split(";")
+                if part
+            ]
+            bodies = [self._query(part) for part in parts]
+            if None in bodies:
+                return [(delay, b"\r\nERROR\r\n")]
+            text = "".join(f"\r\n{body}\r\n" for body in bodies)
+            return [(delay, f"{text}\r\nOK\r\n".encode())]
+
+        body = self._query(command)
+        if body is not None:
+            return [(delay, f"\r\n{body}\r\n\r\nOK\r\n".encode())]
+
+        if command.startswith("AT+CUSD="):
+            match = CUSD_PATTERN.match(line)
+            if not match:
+                return [(delay, b"\r\nERROR\r\n")]
+            urc = f'\r\n+CUSD: 0,"{self.ussd_reply}",15\r\n'
+            return [(delay, b"\r\nOK\r\n"), (delay + self.ussd_delay, urc.encode())]
+
+        if command.startswith("AT+CMGS="):
+            match = CMGS_PATTERN.match(line)
+            if not self.text_mode or not match:
+                return [(delay, b"\r\n+CMS ERROR: 302\r\n")]
+            self.pending_sms = match.group(1)
+            return [(delay, b"\r\n> ")]
+
+        return [(delay, b"\r\nERROR\r\n")]
+
+    def receive_sms(self, sender, text, timestamp=None):
+        """
+        Simpan SMS masuk di SIM (dipecah bila panjang)
+
+        Returns:
+            List URC +CMTI, satu per bagian yang tersimpan
+        """
+        self.received_reference = (self.received_reference + 1) % 256
+        urcs = []
+        for chunk, concat in split_sms(text, self.received_reference):
+            free = next(
+                (i for i in range(SMS_STORAGE_SIZE) if i not in self.inbox), None
+            )
+            if free is None:
+                logger.debug(f"SIM storage full on {self.device}, SMS dropped")
+                break
+            pdu, length = encode_deliver(sender, chunk, timestamp, concat)
+            self.inbox[free] = (0, pdu, length)  # 0 = REC UNREAD
+            urcs.append(f'\r\n+CMTI: "SM",{free}\r\n'.encode())
+        return urcs
+
+    def _handle_storage(self, command, delay):
+        """AT+CMGL / AT+CMGR / AT+CMGD (hanya mode PDU)"""
+        if command.startswith("AT+CMGD="):
+            match = INDEX_PATTERN.match(command)
+            if not match:
+                return [(delay, b"\r\nERROR\r\n")]
+            self.inbox.pop(int(match.group(1)), None)
+            return [(delay, b"\r\nOK\r\n")]
+
+        if self.text_mode:
+            return [(delay, b"\r\n+CMS ERROR: 302\r\n")]
+
+        if command.startswith("AT+CMGR="):
+            match = INDEX_PATTERN.match(command)
+            entry = self.inbox.get(int(match.group(1))) if match else None
+            if entry is None:
+                return [(delay, b"\r\n+CMS ERROR: 321\r\n")]
+            status, pdu, length = entry
+            self.inbox[int(match.group(1))] = (1, pdu, length)
+            body = f"+CMGR: {status},,{length}\r\n{pdu}"
+            return [(delay, f"\r\n{body}\r\n\r\nOK\r\n".encode())]
+
+        lines = []
+        for index in sorted(self.inbox):
+            status, pdu, length = self.inbox[index]
+            lines.append(f"+CMGL: {index},{status},,{length}\r\n{pdu}")
+            self.inbox[index] = (1, pdu, length)  # 1 = REC READ
+        body = "".join(f"\r\n{line}" for line in lines)
+        return [(delay, f"{body}\r\n\r\nOK\r\n".encode())]
+
+    def _query(self, command):
+        """Respons informasi (tanpa OK) untuk perintah query, atau None"""
+        if command in ("AT+CCID", "AT+ICCID", "AT+QCCID", "AT^ICCID?"):
+            return f"+CCID: {self.iccid}"
+        if command == "AT+CIMI":
+            return self.imsi
+        if command in ("AT+CGSN", "AT+GSN"):
+            return self.imei
+        if command == "AT+CNUM":
+            return f'+CNUM: "","{self.msisdn}",129'
+        if command == "AT+CSQ":
+            return f"+CSQ: {self.signal},99"
+        if command == "AT+COPS?":
+            return f'+COPS: 0,0,"{self.operator}",7'
+        if command == "AT+CREG?":
+            return "+CREG: 0,1"
+        if command == "AT+CPIN?":
+            return "+CPIN: READY"
+        if command in ("AT+CGMI", "AT+GMI"):
+            return "SIMULATOR"
+        return None
+
+    def next_urc(self):
+        if not self.urcs:
+            return None
+        return f"\r\n{self.rng.choice(self.urcs)}\r\n".encode()
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class ModemFarm:
+    """
+    Kumpulan modem palsu berbasis pty Linux untuk uji beban dan latensi
+
+    Semua modem dilayani oleh satu thread selector, sehingga ratusan modem
+    bisa disimulasikan di satu laptop. install() mengganti
+    serial.tools.list_ports.comports() agar seluruh stack (PortController,
+    PortService, PortManager, HotplugWatcher) menemukan modem simulasi.
+
+    Contoh:
+        with ModemFarm(16, latency=0.01, jitter=0.005) as farm:
+            PortService().detect_ports()
+    """
+
+    def __init__(self, count, **modem_options):
+        """
+        Args:
+            count: Jumlah modem
+            **modem_options: Diteruskan ke SimulatedModem (latency, jitter,
+                error_rate, baudrate, echo, urcs, urc_interval, ...)
+        """
+        if not hasattr(os, "openpty"):
+            raise RuntimeError("ModemFarm membutuhkan pseudo-terminal (Linux/macOS)")
+
+        _ensure_fd_limit(count)
+        rng = random.Random(modem_options.pop("seed", 0))
+        self.modems = [
+            SimulatedModem(i, rng=random.Random(rng.random()), **modem_options)
+            for i in range(count)
+        ]
+        self.by_fd = {m.master_fd: m for m in self.modems}
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+        self.thread = None
+        self._timers = []
+        self._timer_seq = itertools.count()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._calls = []  # Fungsi dari thread lain untuk dijalankan di thread farm
+        self._calls_lock = threading.Lock()
+        self._original_comports = None
+        logger.info(f"ModemFarm created with {count} modems")
+
+    def devices(self):
+        return [m.device for m in self.modems]
+
+    def comports(self, include_links=False):
+        """Pengganti serial.tools.list_ports.comports()"""
+        return [m.port_info() for m in self.modems]
+
+    def deliver_sms(self, modem_index, sender, text, timestamp=None):
+        """
+        Kirim SMS masuk ke modem (thread-safe); modem menyimpannya di SIM
+        lalu mengirim +CMTI untuk setiap bagian
+        """
+        modem = self.modems[modem_index]
+
+        def deliver():
+            for urc in modem.receive_sms(sender, text, timestamp):
+                self._schedule(modem.response_delay(), modem, urc)
+
+        self._call_soon(deliver)
+
+    def swap_sim(self, modem_index, serial_number):
+        """
+        Ganti SIM modem (thread-safe); modem mengirim +CPIN: READY seperti
+        modem sungguhan setelah SIM baru siap
+
+        Args:
+            modem_index: Nomor modem
+            serial_number: Angka unik untuk ICCID/IMSI/MSISDN SIM baru
+        """
+        modem = self.modems[modem_index]
+
+        def swap():
+            modem.iccid = f"8962{serial_number:015d}"
+            modem.imsi = f"51021{serial_number:010d}"
+            modem.msisdn = f"0857{serial_number:08d}"
+            modem.inbox.clear()
+            self._schedule(modem.response_delay(), modem, b"\r\n+CPIN: READY\r\n")
+
+        self._call_soon(swap)
+
+    def _call_soon(self, func):
+        with self._calls_lock:
+            self._calls.append(func)
+        os.write(self._wakeup_w, b"c")
+
+    def install(self):
+        """Arahkan serial.tools.list_ports.comports() ke modem simulasi"""
+        if self._original_comports is None:
+            self._original_comports = serial.tools.list_ports.comports
+            serial.tools.list_ports.comports = self.comports
+
+    def uninstall(self):
+        if self._original_comports is not None:
+            serial.tools.list_ports.comports = self._original_comports
+            self._original_comports = None
+
+    def start(self):
+        if self.running:
+            return False
+
+        for modem in self.modems:
+            self.selector.register(modem.master_fd, selectors.EVENT_READ, modem)
+            if modem.urc_interval:
+                self._schedule(modem.urc_interval, modem, None)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="modem-farm", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+
+        self.running = False
+        os.write(self._wakeup_w, b"x")
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.selector.close()
+        for modem in self.modems:
+            modem.close()
+        for fd in (self._wakeup_r, self._wakeup_w):
+            os.close(fd)
+        return True
+
+    def __enter__(self):
+        self.start()
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.uninstall()
+        self.stop()
+
+    def _schedule(self, delay, modem, payload):
+        """payload bytes untuk dikirim, atau None untuk URC berkala"""
+        due = time.monotonic() + delay
+        if payload is not None:
+            # Jaga urutan output per modem walaupun ada jitter
+            due = max(due, modem.last_due)
+            modem.last_due = due
+        heapq.heappush(self._timers, (due, next(self._timer_seq), modem, payload))
+
+    def _run(self):
+        while self.running:
+            timeout = None
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - time.monotonic())
+
+            for key, _ in self.selector.select(timeout):
+                modem = key.data
+                if modem is None:
+                    os.read(self._wakeup_r, 64)
+                    with self._calls_lock:
+                        calls, self._calls = self._calls, []
+                    for func in calls:
+                        func()
+                    continue
+                try:
+                    data = os.read(modem.master_fd, 4096)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except OSError:
+                    continue
+                for delay, payload in modem.feed(data):
+                    self._schedule(delay, modem, payload)
+
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, modem, payload = heapq.heappop(self._timers)
+                if payload is None:
+                    payload = modem.next_urc()
+                    self._schedule(modem.urc_interval, modem, None)
+                    if payload is None:
+                        continue
+                self._write(modem, payload)
+
+    def _write(self, modem, payload):
+        try:
+            os.write(modem.master_fd, payload)
+        except BlockingIOError:
+            # Host tidak membaca dan buffer pty penuh: data hilang
+            logger.debug(f"Output buffer full on {modem.device}, dropping data")
+        except OSError as e:
+            logger.debug(f"Write to {modem.device} failed: {e}")
@@ -1,7 +1,6 @@
-import json
-import re
-
-from src.controllers.port_controller import PortController
+from src.utils.atparser import load_text_patterns
+from src.utils.atquery import query_modem
+from src.utils.atresponse import send_and_read
 from src.utils.logging import get_logger
 
 logger = get_logger("ATCommand")
@@ -10,15 +9,18 @@ logger = get_logger("ATCommand")
 class ATCommand:
     """Kelas untuk mengirim perintah AT dan menangani respons"""
 
-    def __init__(self, connection):
+    def __init__(self, connection, timeout=2):
         self.connection = connection
-        self.patterns = self._load_patterns()
+        self.timeout = timeout
+
+    @property
+    def patterns(self):
+        return self._load_patterns()
 
-    def _load_patterns(self, config_file="at_patterns.json"):
-        """Memuat pola respons dari file konfigurasi"""
+    def _load_patterns(self, config_file="config.json"):
+        """Pola respons dari konfigurasi bersama (dikompilasi ulang saat reload)"""
         try:
-            with open(config_file, "r") as f:
-                return json.load(f)
+            return load_text_patterns(config_file)
         except Exception as e:
             logger.error(f"Gagal memuat pola AT: {e}")
             return {}
@@ -26,18 +28,38 @@ class ATCommand:
     def send(self, command):
         """Mengirim perintah AT dan mengembalikan respons"""
         try:
-            response = PortController.send_command(self.connection, command)
-            return response.strip() if response else None
+            response = send_and_read(self.connection, command, self.timeout)
+            return response.text.strip() if response.text else None
         except Exception as e:
             logger.error(f"Error saat mengirim AT command: {e}")
             return None
 
+    def query(self, fields, combined=True, vendor=None):
+        """
+        Membaca beberapa field (iccid, imsi, msisdn, signal, ...) dalam satu sesi
+
+        Returns:
+            QueryResult, atau None jika koneksi error
+        """
+        try:
+            return query_modem(
+                lambda command, timeout: send_and_read(
+                    self.connection, command, timeout
+                ),
+                fields,
+                combined,
+                vendor,
+                self.timeout,
+            )
+        except Exception as e:
+            logger.error(f"Error saat query AT: {e}")
+            return None
+
     def parse_response(self, response, pattern_name):
         """Memparsing respons berdasarkan pola"""
         if pattern_name not in self.patterns:
             logger.error(f"Pola '{pattern_name}' tidak ditemukan di konfigurasi")
             return None
 
-        pattern = self.patterns[pattern_name]
-        match = re.search(pattern, response)
+        match = self.patterns[pattern_name].search(response)
         return match.group(1) if match else None
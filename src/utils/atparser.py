@@ -0,0 +1,444 @@
+import re
+
+from src.utils.atresponse import FINAL_RESULT_CODES, FINAL_RESULT_PREFIXES
+from src.utils.config import load_config
+
+# Karakter awal prefix respons: standar (+), Huawei (^), Sierra (!), vendor lain
+PREFIX_CHARS = frozenset("+^!$#*")
+FINAL_CODES = frozenset(FINAL_RESULT_CODES)
+
+# Pola teks bebas (balasan USSD) yang dibaca dari config.json
+TEXT_PATTERN_KEYS = ("iccid", "msisdn", "balance", "active_until")
+_text_patterns = {}  # config_file -> (Config, {key: re.Pattern})
+
+
+class SignalQuality:
+    """+CSQ: <rssi>,<ber> (3GPP TS 27.007 8.5)"""
+
+    def __init__(self, rssi, ber=99):
+        self.rssi = rssi  # 0-31, 99 = tidak diketahui
+        self.ber = ber
+
+    @property
+    def dbm(self):
+        if self.rssi == 99:
+            return None
+        return -113 + 2 * self.rssi
+
+    def __repr__(self):
+        return f"SignalQuality(rssi={self.rssi}, ber={self.ber}, dbm={self.dbm})"
+
+
+class LteSignal:
+    """Sinyal LTE vendor: ^HCSQ (Huawei) / +QCSQ (Quectel)"""
+
+    def __init__(self, rat, rssi=None, rsrp=None, sinr=None, rsrq=None):
+        self.rat = rat
+        self.rssi = rssi
+        self.rsrp = rsrp
+        self.sinr = sinr
+        self.rsrq = rsrq
+
+    def __repr__(self):
+        return (
+            f"LteSignal({self.rat}, rssi={self.rssi}, rsrp={self.rsrp}, "
+            f"sinr={self.sinr}, rsrq={self.rsrq})"
+        )
+
+
+class NetworkOperator:
+    """+COPS: <mode>[,<format>,<oper>[,<AcT>]]"""
+
+    def __init__(self, mode, format=None, name=None, act=None):
+        self.mode = mode
+        self.format = format
+        self.name = name
+        self.act = act
+
+    def __repr__(self):
+        return f"NetworkOperator({self.name!r}, mode={self.mode}, act={self.act})"
+
+
+class Registration:
+    """+CREG/+CGREG/+CEREG: [<n>,]<stat>"""
+
+    def __init__(self, stat, n=None):
+        self.stat = stat
+        self.n = n
+
+    @property
+    def registered(self):
+        return self.stat in (1, 5)
+
+    @property
+    def roaming(self):
+        return self.stat == 5
+
+    def __repr__(self):
+        return f"Registration(stat={self.stat}, registered={self.registered})"
+
+
+class UssdReply:
+    """+CUSD: <m>[,<str>,<dcs>]"""
+
+    def __init__(self, status, text=None, dcs=None):
+        self.status = status
+        self.text = text
+        self.dcs = dcs
+
+    def __repr__(self):
+        return f"UssdReply(status={self.status}, text={self.text!r})"
+
+
+def _int(value):
+    return int(value) if value not in (None, "") else None
+
+
+def _iccid(value):
+    # Digit pengisi F pada ICCID ganjil
+    return value.rstrip("Ff")
+
+
+def _swapped_iccid(value):
+    # Beberapa firmware Huawei mengembalikan ICCID dengan nibble tertukar
+    # (982611...F4 -> 896211...4F); tukar dulu, baru buang pengisi F
+    if value.startswith("98"):
+        value = "".join(
+            value[i + 1 : i + 2] + value[i] for i in range(0, len(value), 2)
+        )
+    return _iccid(value)
+
+
+def _registration(*groups):
+    first, second = groups
+    if second is None:
+        return Registration(int(first))
+    return Registration(int(second), int(first))
+
+
+class ResponseParser:
+    """Satu pola respons yang sudah dikompilasi"""
+
+    def __init__(self, name, pattern, build, vendor=None):
+        """
+        Args:
+            name: Nama field hasil parse (iccid, signal, ...)
+            pattern: Regex untuk isi baris; group diteruskan ke build
+            build: Fungsi (*groups) -> nilai bertipe
+            vendor: Vendor pemilik format ini (None = standar)
+        """
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.build = build
+        self.vendor = vendor
+
+    def parse(self, text):
+        match = self.pattern.match(text)
+        if match is None:
+            return None
+        try:
+            return self.build(*match.groups())
+        except (TypeError, ValueError):
+            return None
+
+
+class ParsedResponse:
+    """Hasil parse satu buffer respons (bisa berisi beberapa perintah)"""
+
+    def __init__(self):
+        self.values = {}  # field -> nilai pertama
+        self.final = None  # Result code final
+        self.unparsed = []  # Baris yang tidak dikenali
+
+    @property
+    def ok(self):
+        return self.final == "OK"
+
+    def get(self, field, default=None):
+        value = self.values.get(field)
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        return self.values[field]
+
+    def __contains__(self, field):
+        return self.values.get(field) is not None
+
+    def __repr__(self):
+        return f"ParsedResponse({self.values}, final={self.final!r})"
+
+
+class ParserRegistry:
+    """
+    Registry parser respons AT, dikompilasi sekali saat didaftarkan
+
+    Baris berprefix (+CSQ:, ^HCSQ:, !ICCID:, ...) dicari lewat dict prefix
+    lalu vendor, sehingga satu buffer berisi banyak respons cukup dibaca
+    sekali. Baris tanpa prefix (AT+CIMI, AT+CGSN) dicocokkan dengan urutan
+    perintah yang dikirim.
+    """
+
+    def __init__(self):
+        self.prefixed = {}  # prefix -> {vendor: ResponseParser}
+        self.bare = {}  # command -> ResponseParser untuk respons tanpa prefix
+        self.guesses = []  # Parser tanpa prefix yang aman ditebak tanpa perintah
+        self.commands = {}  # command -> nama field
+        self._resolved = {}  # vendor -> {prefix: ResponseParser}
+
+    def register(self, prefix, name, pattern, build=str, vendor=None, commands=()):
+        """
+        Daftarkan parser untuk baris berprefix
+
+        Args:
+            prefix: Prefix baris termasuk ":" (contoh: "+CSQ:")
+            name: Nama field hasil parse
+            pattern: Regex isi baris setelah prefix
+            build: Fungsi (*groups) -> nilai bertipe
+            vendor: Nama vendor (huawei, zte, sierra, quectel) atau None
+            commands: Perintah AT yang menghasilkan respons ini
+        """
+        parser = ResponseParser(name, pattern, build, vendor)
+        self.prefixed.setdefault(prefix, {})[vendor] = parser
+        self._resolved.clear()
+        for command in commands:
+            self.commands[command] = name
+        return parser
+
+    def register_bare(self, name, pattern, build=str, commands=(), guess=False):
+        """
+        Daftarkan parser untuk respons tanpa prefix (misalnya IMSI)
+
+        Args:
+            guess: True jika pola cukup unik untuk dicoba walaupun perintah
+                pengirimnya tidak diketahui (contoh: ICCID diawali 89)
+        """
+        parser = ResponseParser(name, pattern, build)
+        for command in commands:
+            self.bare[command] = parser
+            self.commands[command] = name
+        if guess:
+            self.guesses.append(parser)
+        return parser
+
+    def parser_for(self, prefix, vendor=None):
+        parsers = self.prefixed.get(prefix)
+        if not parsers:
+            return None
+        vendor = vendor.lower() if vendor else None
+        parser = parsers.get(vendor) or parsers.get(None)
+        if parser is None:
+            # Vendor tidak diketahui: pakai format vendor mana pun yang ada
+            parser = next(iter(parsers.values()))
+        return parser
+
+    def _parsers_for(self, vendor):
+        """Tabel prefix (tanpa ":") -> parser untuk satu vendor, di-cache"""
+        table = self._resolved.get(vendor)
+        if table is None:
+            table = {
+                prefix[:-1]: self.parser_for(prefix, vendor) for prefix in self.prefixed
+            }
+            self._resolved[vendor] = table
+        return table
+
+    def field_for(self, command):
+        """Nama field yang dihasilkan perintah AT, atau None"""
+        return self.commands.get(command.strip().upper())
+
+    def parse(self, text, commands=(), vendor=None):
+        """
+        Parse buffer respons dalam satu kali baca
+
+        Args:
+            text: Buffer respons (satu perintah atau baris gabungan)
+            commands: Perintah yang dikirim, untuk memetakan baris tanpa prefix
+            vendor: Nama vendor modem
+
+        Returns:
+            ParsedResponse
+        """
+        result = ParsedResponse()
+        values = result.values
+        unparsed = result.unparsed
+        parsers = self._parsers_for(vendor.lower() if vendor else None)
+        bare = []
+        for command in commands:
+            parser = self.bare.get(command)
+            if parser is None and command not in self.commands:
+                parser = self.bare.get(command.strip().upper())
+            if parser is not None:
+                bare.append(parser)
+
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] in PREFIX_CHARS:
+                prefix, _, body = line.partition(":")
+                parser = parsers.get(prefix)
+                value = parser.parse(body.lstrip()) if parser is not None else None
+                if value is not None:
+                    values.setdefault(parser.name, value)
+                    if bare:
+                        # Perintah ini sudah dijawab dengan prefix
+                        bare = [b for b in bare if b.name != parser.name]
+                elif line.startswith(FINAL_RESULT_PREFIXES):
+                    result.final = line
+                else:
+                    unparsed.append(line)
+                continue
+            if line in FINAL_CODES:
+                result.final = line
+                continue
+
+            # Tanpa prefix: perintah berikutnya yang polanya cocok
+            for index, parser in enumerate(bare or self.guesses):
+                value = parser.parse(line)
+                if value is not None:
+                    values.setdefault(parser.name, value)
+                    if bare:
+                        del bare[index]
+                    break
+            else:
+                unparsed.append(line)
+        return result
+
+
+def _default_registry():
+    registry = ParserRegistry()
+    # Sebagian firmware mengutip ICCID (+CCID: "89...")
+    iccid = r'"?(\d{18,22}[Ff]?)"?'
+    # Huawei dengan nibble tertukar: F pengisi bisa ada di tengah (...F4)
+    swapped_iccid = r'"?([\dFf]{18,22})"?'
+
+    # ICCID: standar dan varian vendor
+    registry.register("+CCID:", "iccid", iccid, _iccid, commands=("AT+CCID",))
+    registry.register("+ICCID:", "iccid", iccid, _iccid, commands=("AT+ICCID",))
+    registry.register(
+        "+QCCID:", "iccid", iccid, _iccid, vendor="quectel", commands=("AT+QCCID",)
+    )
+    registry.register(
+        "^ICCID:",
+        "iccid",
+        swapped_iccid,
+        _swapped_iccid,
+        vendor="huawei",
+        commands=("AT^ICCID?",),
+    )
+    registry.register(
+        "+ZGETICCID:",
+        "iccid",
+        iccid,
+        _iccid,
+        vendor="zte",
+        commands=("AT+ZGETICCID",),
+    )
+    registry.register(
+        "!ICCID:", "iccid", iccid, _iccid, vendor="sierra", commands=("AT!ICCID?",)
+    )
+    registry.register_bare(
+        "iccid",
+        r"(89\d{16,20})F?$",
+        commands=("AT+CCID", "AT+ICCID"),
+        guess=True,
+    )
+
+    # Identitas tanpa prefix
+    registry.register_bare("imsi", r"(\d{14,15})$", commands=("AT+CIMI",))
+    registry.register_bare("imei", r"(\d{14,17})$", commands=("AT+CGSN", "AT+GSN"))
+    registry.register("+CGSN:", "imei", r'"?(\d{14,17})"?')
+    registry.register("+CIMI:", "imsi", r"(\d{14,15})")
+
+    registry.register("+CNUM:", "msisdn", r'"[^"]*","([^"]*)"', commands=("AT+CNUM",))
+
+    # Sinyal
+    registry.register(
+        "+CSQ:",
+        "signal",
+        r"(\d+),(\d+)",
+        lambda rssi, ber: SignalQuality(int(rssi), int(ber)),
+        commands=("AT+CSQ",),
+    )
+    lte = r'"([^"]+)"(?:,(-?\d+))?(?:,(-?\d+))?(?:,(-?\d+))?(?:,(-?\d+))?'
+    registry.register(
+        "^HCSQ:",
+        "lte_signal",
+        lte,
+        lambda rat, *values: LteSignal(rat, *(_int(v) for v in values)),
+        vendor="huawei",
+        commands=("AT^HCSQ?",),
+    )
+    registry.register(
+        "+QCSQ:",
+        "lte_signal",
+        lte,
+        lambda rat, *values: LteSignal(rat, *(_int(v) for v in values)),
+        vendor="quectel",
+        commands=("AT+QCSQ",),
+    )
+
+    # Jaringan
+    registry.register(
+        "+COPS:",
+        "operator",
+        r'(\d+)(?:,(\d+),"([^"]*)"(?:,(\d+))?)?',
+        lambda mode, fmt, name, act: NetworkOperator(
+            int(mode), _int(fmt), name, _int(act)
+        ),
+        commands=("AT+COPS?",),
+    )
+    for prefix, command in (
+        ("+CREG:", "AT+CREG?"),
+        ("+CGREG:", "AT+CGREG?"),
+        ("+CEREG:", "AT+CEREG?"),
+    ):
+        registry.register(
+            prefix,
+            prefix[1:-1].lower(),
+            r"(\d+)(?:,(\d+))?",
+            _registration,
+            commands=(command,),
+        )
+    registry.register("+CPIN:", "pin", r"(.+)", commands=("AT+CPIN?",))
+
+    # USSD dan SMS
+    registry.register(
+        "+CUSD:",
+        "ussd",
+        r'(\d+)(?:,"((?:[^"]|"")*)"(?:,(\d+))?)?',
+        lambda status, text, dcs: UssdReply(int(status), text, _int(dcs)),
+    )
+    registry.register("+CMGS:", "sms_reference", r"(\d+)", int)
+    return registry
+
+
+# Registry bersama; dikompilasi sekali saat modul dimuat
+REGISTRY = _default_registry()
+
+
+def parse_response(text, commands=(), vendor=None):
+    """Parse buffer respons dengan registry bawaan (lihat ParserRegistry.parse)"""
+    return REGISTRY.parse(text, commands, vendor)
+
+
+def load_text_patterns(config_file="config.json"):
+    """
+    Pola teks bebas (balasan USSD) dari file konfigurasi
+
+    Dikompilasi sekali per snapshot konfigurasi; dikompilasi ulang hanya
+    setelah file konfigurasi di-reload.
+
+    Returns:
+        Dict key -> re.Pattern untuk TEXT_PATTERN_KEYS yang ada di config
+    """
+    config = load_config(config_file)
+    cached = _text_patterns.get(config_file)
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    patterns = {
+        key: re.compile(config[key])
+        for key in TEXT_PATTERN_KEYS
+        if isinstance(config.get(key), str)
+    }
+    _text_patterns[config_file] = (config, patterns)
+    return patterns
@@ -0,0 +1,144 @@
+import time
+
+from src.utils.atparser import REGISTRY
+
+
+class QueryField:
+    """Satu field yang bisa dibaca dari modem"""
+
+    def __init__(self, name, commands, convert=None):
+        """
+        Args:
+            name: Nama field pada hasil query (sama dengan nama di REGISTRY)
+            commands: Perintah AT yang dicoba berurutan (varian vendor)
+            convert: Fungsi opsional untuk nilai hasil parse
+        """
+        self.name = name
+        self.commands = tuple(commands)
+        self.convert = convert
+
+    def value(self, parsed):
+        value = parsed.get(self.name)
+        if value is None or self.convert is None:
+            return value
+        return self.convert(value)
+
+
+QUERY_FIELDS = {
+    field.name: field
+    for field in (
+        QueryField("iccid", ("AT+CCID", "AT+QCCID", "AT^ICCID?", "AT+ICCID")),
+        QueryField("imsi", ("AT+CIMI",)),
+        QueryField("msisdn", ("AT+CNUM",)),
+        # Nilai rssi (int) agar kompatibel dengan SimCard.signal
+        QueryField("signal", ("AT+CSQ",), lambda signal: signal.rssi),
+        QueryField("imei", ("AT+CGSN",)),
+        QueryField("operator", ("AT+COPS?",), lambda operator: operator.name),
+    )
+}
+
+# Perintah yang dicoba lebih dulu per vendor (nama dari AT+CGMI / USB)
+VENDOR_COMMANDS = {
+    "quectel": {"iccid": "AT+QCCID"},
+    "huawei": {"iccid": "AT^ICCID?"},
+    "zte": {"iccid": "AT+ZGETICCID"},
+    "sierra": {"iccid": "AT!ICCID?"},
+    "simcom": {"iccid": "AT+CCID"},
+}
+
+
+class QueryResult:
+    """Hasil query beberapa field dalam satu sesi serial"""
+
+    def __init__(self):
+        self.values = {}  # field -> nilai (None jika tidak terbaca)
+        self.responses = []  # ATResponse sesuai urutan pengiriman
+        self.latency = 0.0
+
+    def get(self, field, default=None):
+        value = self.values.get(field)
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        return self.values[field]
+
+    def __contains__(self, field):
+        return self.values.get(field) is not None
+
+    def as_dict(self):
+        return dict(self.values)
+
+    def __repr__(self):
+        return (
+            f"QueryResult({self.values}, commands={len(self.responses)}, "
+            f"latency={self.latency * 1000:.1f}ms)"
+        )
+
+
+def _commands_for(field, vendor):
+    preferred = VENDOR_COMMANDS.get((vendor or "").lower(), {}).get(field.name)
+    if preferred is None:
+        return field.commands
+    return (preferred,) + tuple(c for c in field.commands if c != preferred)
+
+
+def query_modem(execute, fields, combined=False, vendor=None, timeout=1, required=()):
+    """
+    Membaca beberapa field dari modem dalam satu sesi tanpa jeda tetap
+
+    Setiap perintah dikirim begitu result code final perintah sebelumnya
+    diterima. Dengan combined=True beberapa perintah digabung dalam satu
+    baris (AT+CCID;+CNUM;+CSQ, V.250 concatenation) sehingga hanya ada
+    satu round trip; jika modem menolak baris gabungan, field dibaca satu
+    per satu. Respons di-parse sekali jalan oleh REGISTRY (atparser).
+
+    Args:
+        execute: Fungsi (perintah, timeout) -> ATResponse atau None
+        fields: Nama field (lihat QUERY_FIELDS)
+        combined: Gabungkan perintah dalam satu baris
+        vendor: Nama vendor untuk memilih perintah varian lebih dulu
+        timeout: Batas waktu per perintah dalam detik
+        required: Field yang wajib ada; jika tidak terbaca field lain tidak
+            dibaca (misalnya tanpa ICCID berarti tidak ada SIM)
+
+    Returns:
+        QueryResult
+    """
+    started = time.monotonic()
+    result = QueryResult()
+    remaining = [QUERY_FIELDS[name] for name in fields]
+
+    if combined and len(remaining) > 1:
+        commands = [_commands_for(f, vendor)[0] for f in remaining]
+        line = commands[0] + "".join(";" + c[2:] for c in commands[1:])
+        response = execute(line, timeout)
+        if response is not None:
+            result.responses.append(response)
+        if response is not None and response.ok:
+            parsed = REGISTRY.parse(response.text, commands, vendor)
+            for field in remaining:
+                result.values[field.name] = field.value(parsed)
+            remaining = []
+
+    # Field wajib dibaca lebih dulu agar bisa berhenti lebih awal
+    remaining.sort(key=lambda f: f.name not in required)
+    for position, field in enumerate(remaining):
+        value = None
+        for command in _commands_for(field, vendor):
+            response = execute(command, timeout)
+            if response is None:
+                break
+            result.responses.append(response)
+            if response.ok:
+                value = field.value(REGISTRY.parse(response.text, (command,), vendor))
+                break
+            if response.timed_out:
+                break
+        result.values[field.name] = value
+        if value is None and field.name in required:
+            for skipped in remaining[position + 1 :]:
+                result.values[skipped.name] = None
+            break
+
+    result.latency = time.monotonic() - started
+    return result
@@ -0,0 +1,183 @@
+import time
+
+from src.utils.tracing import TRACER
+
+# Result code final menurut ITU-T V.250 / 3GPP TS 27.007
+FINAL_RESULT_CODES = ("OK", "ERROR", "NO CARRIER", "NO DIALTONE", "BUSY", "NO ANSWER")
+FINAL_RESULT_PREFIXES = ("+CME ERROR:", "+CMS ERROR:")
+ERROR_RESULT_CODES = ("ERROR", "NO CARRIER", "NO DIALTONE", "BUSY", "NO ANSWER")
+PROMPT = "> "
+
+# Interval polling read saat menunggu byte berikutnya
+READ_POLL_INTERVAL = 0.05
+
+
+class ATResponse:
+    """Hasil satu perintah AT beserta latensinya"""
+
+    def __init__(self, command, text, final=None, latency=0.0, timed_out=False):
+        self.command = command
+        self.text = text
+        self.final = final  # Result code final (OK, ERROR, +CME ERROR: 10, > ...)
+        self.latency = latency  # Detik dari write sampai result code final
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        return self.final == "OK"
+
+    @property
+    def is_error(self):
+        if self.final is None:
+            return False
+        return self.final in ERROR_RESULT_CODES or self.final.startswith(
+            FINAL_RESULT_PREFIXES
+        )
+
+    @property
+    def is_prompt(self):
+        return self.final == PROMPT
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return (
+            f"ATResponse({self.command!r}, final={self.final!r}, "
+            f"latency={self.latency * 1000:.1f}ms, timed_out={self.timed_out})"
+        )
+
+
+def format_command(command):
+    """
+    Tambahkan prefix AT dan terminator \\r\\n bila belum ada
+
+    Perintah yang sudah diakhiri \\r dibiarkan (misalnya AT+CMGS, karena
+    \\n setelahnya akan ikut menjadi isi SMS).
+    """
+    if not command.upper().startswith("AT"):
+        command = "AT" + command
+    if not command.endswith(("\r", "\r\n")):
+        command += "\r\n"
+    return command
+
+
+def find_final_result(text):
+    """
+    Mencari result code final pada buffer respons
+
+    Args:
+        text: Buffer respons yang sudah di-decode
+
+    Returns:
+        Result code final, atau None jika respons belum lengkap
+    """
+    if text.endswith(PROMPT):
+        return PROMPT
+
+    # Hanya baris lengkap (diakhiri newline) yang dianggap final
+    lines = text.split("\n")
+    for line in reversed(lines[:-1]):
+        line = line.strip()
+        if not line:
+            continue
+        if line in FINAL_RESULT_CODES or line.startswith(FINAL_RESULT_PREFIXES):
+            return line
+    return None
+
+
+def read_response(connection, timeout, command=None, started=None):
+    """
+    Membaca respons secara streaming sampai result code final atau deadline
+
+    Args:
+        connection: serial.Serial yang terbuka
+        timeout: Batas waktu total dalam detik
+        command: Perintah yang dikirim (hanya untuk dicatat di hasil)
+        started: Waktu mulai (time.monotonic) untuk perhitungan latensi
+
+    Returns:
+        ATResponse
+    """
+    started = time.monotonic() if started is None else started
+    deadline = started + timeout
+    buffer = bytearray()
+    final = None
+
+    original_timeout = connection.timeout
+    connection.timeout = READ_POLL_INTERVAL
+    try:
+        while True:
+            chunk = connection.read(connection.in_waiting or 1)
+            if chunk:
+                buffer.extend(chunk)
+                final = find_final_result(buffer.decode("utf-8", errors="ignore"))
+                if final is not None:
+                    break
+            if time.monotonic() >= deadline:
+                break
+    finally:
+        connection.timeout = original_timeout
+
+    return ATResponse(
+        command,
+        buffer.decode("utf-8", errors="ignore"),
+        final,
+        time.monotonic() - started,
+        final is None,
+    )
+
+
+def send_and_read(connection, command, timeout):
+    """
+    Kirim satu perintah AT dan tunggu result code final
+
+    Args:
+        connection: serial.Serial yang terbuka
+        command: Perintah AT (prefix AT dan \\r\\n ditambahkan otomatis)
+        timeout: Batas waktu respons dalam detik
+
+    Returns:
+        ATResponse
+    """
+    command = format_command(command)
+    started = time.monotonic()
+    with TRACER.span("serial.write", connection.port):
+        connection.write(command.encode())
+    with TRACER.span("serial.read", connection.port):
+        return read_response(connection, timeout, command.strip(), started)
+
+
+def wait_for_urc(connection, prefix, timeout, cancel=None):
+    """
+    Membaca data sampai satu baris URC dengan prefix tertentu lengkap diterima
+
+    Args:
+        connection: serial.Serial yang terbuka
+        prefix: Awal baris URC yang ditunggu (contoh: "+CUSD:")
+        timeout: Batas waktu total dalam detik
+        cancel: threading.Event opsional untuk berhenti lebih awal
+
+    Returns:
+        Teks yang terbaca (berisi URC jika diterima sebelum deadline)
+    """
+    deadline = time.monotonic() + timeout
+    buffer = bytearray()
+
+    original_timeout = connection.timeout
+    connection.timeout = READ_POLL_INTERVAL
+    try:
+        while True:
+            chunk = connection.read(connection.in_waiting or 1)
+            if chunk:
+                buffer.extend(chunk)
+                text = buffer.decode("utf-8", errors="ignore")
+                start = text.find(prefix)
+                if start != -1 and "\n" in text[start:]:
+                    break
+            if time.monotonic() >= deadline or (cancel and cancel.is_set()):
+                break
+    finally:
+        connection.timeout = original_timeout
+
+    return buffer.decode("utf-8", errors="ignore")
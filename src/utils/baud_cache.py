@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+from src.utils.identity import modem_identity
+from src.utils.logging import get_logger
+from src.utils.preference_store import write_json_atomic
+
+logger = get_logger("utils.baud_cache")
+
+
+def port_cache_key(port_name, port_info=None):
+    """
+    Membuat key cache dari identitas fisik modem
+
+    Key memakai identitas USB (VID/PID/serial number atau lokasi hub) sehingga
+    baud rate tetap ditemukan walaupun modem mendapat nama port baru setelah
+    dicolok ulang. Tanpa identitas USB, nama port dipakai sebagai key.
+    """
+    if port_info is None:
+        return port_name
+    return modem_identity(port_info) or port_name
+
+
+class BaudRateCache:
+    """Cache persisten baud rate terakhir yang berhasil untuk setiap modem"""
+
+    def __init__(self, cache_file="baud_cache.json"):
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.rates = self._load()
+
+    def _load(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r") as f:
+                    return {k: int(v) for k, v in json.load(f).items()}
+            except Exception as e:
+                logger.error(f"Gagal memuat cache baud rate: {str(e)}")
+        return {}
+
+    def _save(self):
+        try:
+            write_json_atomic(self.cache_file, dict(sorted(self.rates.items())))
+        except Exception as e:
+            logger.error(f"Gagal menyimpan cache baud rate: {str(e)}")
+
+    def get(self, port_name, port_info=None):
+        """Baud rate yang tersimpan, atau None jika belum ada"""
+        with self.lock:
+            return self.rates.get(port_cache_key(port_name, port_info))
+
+    def set(self, port_name, baud, port_info=None):
+        """Simpan baud rate yang berhasil (file hanya ditulis jika berubah)"""
+        key = port_cache_key(port_name, port_info)
+        with self.lock:
+            if self.rates.get(key) == baud:
+                return
+            self.rates[key] = baud
+            self._save()
+
+    def invalidate(self, port_name, port_info=None):
+        """Hapus baud rate yang tersimpan setelah probe gagal"""
+        key = port_cache_key(port_name, port_info)
+        with self.lock:
+            if self.rates.pop(key, None) is not None:
+                logger.debug(f"Cache baud rate untuk {port_name} dihapus")
+                self._save()
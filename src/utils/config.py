@@ -1,6 +1,9 @@
 import json
 import logging
 import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
 
 logger = logging.getLogger(__name__)
 
@@ -20,22 +23,250 @@ DEFAULT_CONFIG = {
     ],
     "excluded_ports": ["Bluetooth", "Printer", "Mouse", "Keyboard"],
     "port_monitor_interval": 2,  # seconds
+    # Penjadwalan probe adaptif (detik)
+    "monitor_min_interval": 2,
+    "monitor_healthy_interval": 30,
+    "monitor_max_backoff": 120,
+    "monitor_probe_budget": 16,  # Maksimal probe paralel per tick
+    "identity_index_file": "modem_identity.json",
+    "hotplug_interval": 1,  # seconds, polling comports() saat udev tidak tersedia
+    "fanout_max_concurrency": 16,  # Maksimal port paralel untuk operasi *_to_all
+    # Gabungkan query (AT+CCID;+CNUM;+CSQ) dalam satu baris; fallback satu per satu
+    "at_combined_queries": True,
+    # TTL cache state SIM (detik)
+    "sim_identity_ttl": 21600,  # ICCID/IMSI/MSISDN
+    "sim_signal_ttl": 15,
+    "sim_balance_ttl": 600,
+    # Pengiriman SMS massal
+    "sms_rate_per_minute": 10,  # Token bucket per SIM
+    "sms_burst": 3,
+    "sms_max_attempts": 3,  # Percobaan per SMS, masing-masing di modem berbeda
+    "sms_send_timeout": 30,  # seconds, menunggu +CMGS dari jaringan
+    # Penyimpanan SMS masuk
+    "sms_db_file": "sms.db",
+    "sms_poll_interval": 30,  # seconds, polling AT+CMGL sebagai cadangan +CMTI
+    "sms_batch_size": 200,
+    "sms_flush_interval": 0.5,  # seconds
+    "sms_part_timeout": 3600,  # seconds, SMS bersambung yang tidak lengkap
+    # Endpoint /metrics format Prometheus (0 = nonaktif)
+    "metrics_port": 0,
+    # Tracing span serial (open/reset/write/read) ke ring buffer
+    "tracing_enabled": False,
+    "trace_buffer_size": 20000,
 }
 
 
-def load_config(config_file="config.json"):
-    """Load configuration with fallback to defaults"""
-    config = DEFAULT_CONFIG.copy()
-
-    try:
-        if os.path.exists(config_file):
-            with open(config_file, "r") as f:
-                loaded_config = json.load(f)
-                config.update(loaded_config)
-                logger.info(f"Loaded configuration from {config_file}")
+# Jeda polling mtime file konfigurasi untuk hot-reload (detik)
+CONFIG_WATCH_INTERVAL = 2
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def validate_config(values):
+    """
+    Memeriksa tipe dan nilai key yang dikenal di DEFAULT_CONFIG
+
+    Key lain (misalnya pola respons AT) diterima apa adanya.
+
+    Returns:
+        List pesan error, kosong jika konfigurasi valid
+    """
+    errors = []
+    for key, default in DEFAULT_CONFIG.items():
+        if key not in values:
+            continue
+        value = values[key]
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            # Nilai default 0 berarti "nonaktif", selain itu wajib positif
+            valid = (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and (value > 0 or (default == 0 and value == 0))
+            )
+        elif isinstance(default, list):
+            valid = isinstance(value, (list, tuple)) and all(
+                isinstance(v, str) for v in value
+            )
         else:
-            logger.warning(f"Config file {config_file} not found, using defaults")
-    except Exception as e:
-        logger.error(f"Error loading config: {str(e)}, using defaults")
+            valid = isinstance(value, type(default))
+        if not valid:
+            errors.append(f"{key}: invalid value {value!r}")
+    return errors
+
+
+class Config(Mapping):
+    """
+    Snapshot konfigurasi yang tidak bisa diubah
+
+    Dibaca seperti dict (config["timeout"], config.get(...)); list menjadi
+    tuple. Setiap reload menghasilkan objek Config baru dengan version naik,
+    sehingga pembaca yang memegang snapshot lama tetap konsisten.
+    """
+
+    def __init__(self, values, source=None, version=0):
+        self._values = {key: _freeze(value) for key, value in values.items()}
+        self.source = source
+        self.version = version
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def changed_keys(self, other):
+        """Key yang nilainya berbeda dengan snapshot lain"""
+        keys = self._values.keys() | other.keys()
+        return sorted(k for k in keys if self.get(k) != other.get(k))
+
+    def __repr__(self):
+        return f"Config({self.source!r}, version={self.version})"
+
+
+class ConfigStore:
+    """
+    Satu konfigurasi bersama per file untuk seluruh proses
+
+    File dibaca dan divalidasi sekali; semua service memakai snapshot yang
+    sama lewat store.config. Saat file berubah (polling mtime) konfigurasi
+    dibaca ulang dan subscriber dipanggil dengan
+    handler(config_baru, config_lama, changed_keys). File yang tidak valid
+    diabaikan dan snapshot lama tetap dipakai.
+    """
 
-    return config
+    def __init__(self, config_file="config.json"):
+        self.config_file = config_file
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.mtime = self._mtime()
+        self.version = 0
+        self.config = self._load() or Config(DEFAULT_CONFIG, config_file)
+        self.thread = None
+        self._stop = threading.Event()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """Baca dan validasi file, None jika tidak valid"""
+        values = DEFAULT_CONFIG.copy()
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, "r") as f:
+                    values.update(json.load(f))
+                logger.info(f"Loaded configuration from {self.config_file}")
+            else:
+                logger.warning(
+                    f"Config file {self.config_file} not found, using defaults"
+                )
+        except Exception as e:
+            logger.error(f"Error loading config: {str(e)}")
+            return None
+
+        errors = validate_config(values)
+        if errors:
+            logger.error(f"Invalid config {self.config_file}: {'; '.join(errors)}")
+            return None
+        self.version += 1
+        return Config(values, self.config_file, self.version)
+
+    def subscribe(self, handler):
+        """Daftarkan handler(config, old_config, changed_keys) untuk perubahan"""
+        if handler not in self.subscribers:
+            self.subscribers.append(handler)
+
+    def unsubscribe(self, handler):
+        if handler in self.subscribers:
+            self.subscribers.remove(handler)
+
+    def reload(self):
+        """
+        Baca ulang file konfigurasi dan beri tahu subscriber
+
+        Returns:
+            List key yang berubah (kosong jika tidak ada perubahan atau
+            file tidak valid)
+        """
+        with self.lock:
+            self.mtime = self._mtime()
+            config = self._load()
+            if config is None:
+                return []
+            old = self.config
+            changed = config.changed_keys(old)
+            if not changed:
+                return []
+            self.config = config
+
+        logger.info(f"Configuration reloaded, changed: {', '.join(changed)}")
+        for handler in list(self.subscribers):
+            try:
+                handler(config, old, changed)
+            except Exception as e:
+                logger.error(f"Error in config subscriber: {e}")
+        return changed
+
+    def check(self):
+        """Reload jika mtime file berubah sejak pembacaan terakhir"""
+        if self._mtime() != self.mtime:
+            return self.reload()
+        return []
+
+    def start_watching(self, interval=CONFIG_WATCH_INTERVAL):
+        """Mulai thread yang memantau perubahan file konfigurasi"""
+        if self.thread and self.thread.is_alive():
+            return False
+        self._stop.clear()
+        self.thread = threading.Thread(
+            target=self._watch, args=(interval,), daemon=True, name="config-watch"
+        )
+        self.thread.start()
+        return True
+
+    def stop_watching(self):
+        if not self.thread:
+            return False
+        self._stop.set()
+        self.thread.join(timeout=2)
+        self.thread = None
+        return True
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error watching config: {e}")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_config_store(config_file="config.json"):
+    """ConfigStore bersama untuk file konfigurasi (satu per path per proses)"""
+    key = os.path.abspath(config_file)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ConfigStore(config_file)
+        return store
+
+
+def load_config(config_file="config.json"):
+    """Load configuration with fallback to defaults (snapshot bersama, read-only)"""
+    return get_config_store(config_file).config
@@ -0,0 +1,23 @@
+def modem_identity(port_info, imei=None):
+    """
+    Menentukan identitas fisik modem dari atribut comports()
+
+    Urutan prioritas: USB serial number (ditambah nomor interface, karena
+    satu modem bisa membuka beberapa port dengan serial number yang sama),
+    lalu lokasi hub USB, lalu IMEI dari AT+CGSN.
+
+    Returns:
+        String identitas, atau None jika tidak ada atribut yang stabil
+    """
+    location = getattr(port_info, "location", None)
+    serial_number = getattr(port_info, "serial_number", None)
+    vid = getattr(port_info, "vid", None)
+
+    if serial_number and vid is not None:
+        interface = location.rsplit(":", 1)[-1] if location and ":" in location else ""
+        return f"usb:{vid:04X}:{port_info.pid:04X}:{serial_number}:{interface}"
+    if location:
+        return f"loc:{location}"
+    if imei:
+        return f"imei:{imei}"
+    return None
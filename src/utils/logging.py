@@ -1,74 +1,153 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
 
-# Buat direktori logs jika belum ada
-logs_dir = Path("logs")
-logs_dir.mkdir(exist_ok=True)
-
 # Konfigurasi format log default
 DEFAULT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+DEFAULT_LOG_FILE = "logs/app.jsonl"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# Field terstruktur yang disalin dari extra={...} ke setiap baris JSON
+STRUCTURED_FIELDS = ("port", "command", "latency_ms", "status", "event")
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris: ts, level, logger, msg, thread + field extra"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler yang tidak memformat pesan di thread pemanggil
+
+    QueueHandler bawaan memanggil format() sebelum record masuk antrean.
+    Antrean di sini hanya dipakai di dalam proses, jadi record diteruskan
+    apa adanya dan pesan baru dirangkai di thread listener. Traceback
+    tetap dirender di thread pemanggil karena frame-nya bisa berubah.
+    """
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
 
-def setup_logger(
-    name,
+def configure_logging(
     level=logging.INFO,
-    file_logging=True,
-    console_logging=True,
-    log_format=DEFAULT_FORMAT,
+    log_file=DEFAULT_LOG_FILE,
+    max_bytes=DEFAULT_MAX_BYTES,
+    backup_count=DEFAULT_BACKUP_COUNT,
+    console=True,
 ):
     """
-    Membuat dan mengonfigurasi logger.
+    Memasang satu pipeline logging untuk seluruh proses
+
+    Root logger hanya mendapat satu QueueHandler; QueueListener di thread
+    terpisah menulis ke konsol (teks) dan ke file JSON lines dengan rotasi
+    berdasarkan ukuran, sehingga thread serial tidak pernah menunggu I/O
+    disk. Dipanggil sekali oleh entry point (main.py); pemanggilan
+    berikutnya tidak melakukan apa-apa.
 
     Args:
-        name: Nama logger (biasanya nama modul)
-        level: Level logging (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        file_logging: Apakah log disimpan ke file
-        console_logging: Apakah log ditampilkan di konsol
-        log_format: Format string untuk pesan log
+        level: Level root logger
+        log_file: File JSON lines (None untuk menonaktifkan log file)
+        max_bytes: Ukuran maksimal file sebelum dirotasi
+        backup_count: Jumlah file rotasi yang disimpan
+        console: Tampilkan log di konsol
 
     Returns:
-        Configured logger instance
+        QueueListener yang sedang berjalan
     """
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    # Hapus handler lama jika ada
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-
-    # Buat formatter
-    formatter = logging.Formatter(log_format, DATE_FORMAT)
-
-    # Console handler
-    if console_logging:
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-
-    # File handler
-    if file_logging:
-        log_filename = (
-            f"{datetime.now().strftime('%Y%m%d')}_{name.replace('.', '_')}.log"
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        handlers = []
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter(DEFAULT_FORMAT, DATE_FORMAT))
+            handlers.append(console_handler)
+        if log_file:
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file,
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding="utf-8",
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(LazyQueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
         )
-        file_handler = logging.FileHandler(logs_dir / log_filename)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
 
-    return logger
 
+def shutdown_logging():
+    """Kosongkan antrean log dan hentikan thread listener"""
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
 
-def get_logger(name, level=logging.INFO):
+
+def get_logger(name):
     """
     Mendapatkan logger dengan nama tertentu.
 
+    Logger tidak punya handler maupun level sendiri: record diteruskan ke
+    root logger, dan pipeline serta levelnya dipasang sekali oleh aplikasi
+    lewat configure_logging(). Import modul tidak membuat file log.
+
     Args:
         name: Nama logger (biasanya nama modul)
-        level: Level logging
 
     Returns:
         Logger instance
     """
-    return setup_logger(name, level)
+    return logging.getLogger(name)
@@ -0,0 +1,357 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import get_ident
+
+logger = logging.getLogger(__name__)
+
+# Batas bucket latensi perintah AT (detik)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_COMMAND_NAME = re.compile(r"(AT)?([+^!$%&*#]?[A-Z0-9]*)", re.IGNORECASE)
+
+
+class Counter:
+    """
+    Counter tanpa lock
+
+    Setiap thread menambah sel miliknya sendiri (key thread ident) sehingga
+    tidak ada dua thread yang menulis sel yang sama; nilai dijumlahkan saat
+    dibaca.
+    """
+
+    def __init__(self):
+        self._cells = {}
+
+    def inc(self, amount=1):
+        ident = get_ident()
+        cells = self._cells
+        cells[ident] = cells.get(ident, 0) + amount
+
+    @property
+    def value(self):
+        return sum(list(self._cells.values()))
+
+
+class Histogram:
+    """Histogram dengan bucket tetap, sel per thread seperti Counter"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._cells = {}
+
+    def observe(self, value):
+        ident = get_ident()
+        cell = self._cells.get(ident)
+        if cell is None:
+            # Jumlah per bucket (termasuk +Inf), lalu total nilai
+            cell = self._cells[ident] = [0] * (len(self.buckets) + 1) + [0.0]
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self):
+        """
+        Returns:
+            (jumlah per bucket non-kumulatif termasuk +Inf, total nilai)
+        """
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for cell in list(self._cells.values()):
+            for i in range(len(counts)):
+                counts[i] += cell[i]
+            total += cell[-1]
+        return counts, total
+
+    @property
+    def count(self):
+        return sum(self.snapshot()[0])
+
+    def quantile(self, q):
+        """Perkiraan kuantil: batas atas bucket tempat kuantil jatuh"""
+        counts, _ = self.snapshot()
+        total = sum(counts)
+        if not total:
+            return None
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            if cumulative >= q * total:
+                return bound if bound != float("inf") else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class MetricFamily:
+    """Satu metrik dengan label; anak per kombinasi nilai label"""
+
+    def __init__(self, name, help_text, kind, labelnames, factory):
+        self.name = name
+        self.help = help_text
+        self.kind = kind  # "counter" / "histogram"
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children = {}
+
+    def labels(self, *values):
+        """Anak metrik untuk nilai label (urutan sesuai labelnames)"""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children.setdefault(values, self.factory())
+        return child
+
+    def items(self):
+        return list(self.children.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Kumpulan metrik in-process dengan ekspor format teks Prometheus"""
+
+    def __init__(self):
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def _register(self, name, help_text, kind, labelnames, factory):
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = MetricFamily(name, help_text, kind, labelnames, factory)
+                self.families[name] = family
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} already registered as {family.kind}")
+            return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(name, help_text, "counter", labelnames, Counter)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(
+            name, help_text, "histogram", labelnames, lambda: Histogram(buckets)
+        )
+
+    def render(self):
+        """Semua metrik dalam format teks Prometheus (exposition 0.0.4)"""
+        lines = []
+        with self.lock:
+            families = sorted(self.families.values(), key=lambda f: f.name)
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in sorted(family.items()):
+                if family.kind == "counter":
+                    labels = _format_labels(family.labelnames, values)
+                    lines.append(f"{family.name}{labels} {child.value}")
+                    continue
+
+                counts, total = child.snapshot()
+                cumulative = 0
+                bounds = child.buckets + (float("inf"),)
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    labels = _format_labels(
+                        family.labelnames, values, (("le", _format_value(bound)),)
+                    )
+                    lines.append(f"{family.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(family.labelnames, values)
+                lines.append(f"{family.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{family.name}_count{labels} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Tulis ekspor ke file secara atomik (untuk textfile collector)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics.", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def clear(self):
+        with self.lock:
+            for family in self.families.values():
+                family.children.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+COMMAND_LATENCY = REGISTRY.histogram(
+    "modem_command_latency_seconds",
+    "Latency from write to final result code per AT command",
+    ("port", "command"),
+)
+COMMAND_TIMEOUTS = REGISTRY.counter(
+    "modem_command_timeouts_total",
+    "AT commands without a final result code before the timeout",
+    ("port", "command"),
+)
+COMMAND_ERRORS = REGISTRY.counter(
+    "modem_command_errors_total",
+    "AT commands answered with ERROR / +CME ERROR / +CMS ERROR",
+    ("port", "command", "code"),
+)
+BYTES_OUT = REGISTRY.counter(
+    "modem_bytes_out_total", "Bytes written to the modem", ("port",)
+)
+BYTES_IN = REGISTRY.counter(
+    "modem_bytes_in_total", "Response bytes read from the modem", ("port",)
+)
+RECONNECTS = REGISTRY.counter(
+    "modem_reconnects_total",
+    "Serial connections reopened after the first open",
+    ("port",),
+)
+USSD_LATENCY = REGISTRY.histogram(
+    "modem_ussd_latency_seconds",
+    "Time from AT+CUSD until the +CUSD reply",
+    ("port",),
+    buckets=(0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30),
+)
+USSD_FAILURES = REGISTRY.counter(
+    "modem_ussd_failures_total", "USSD requests without a +CUSD reply", ("port",)
+)
+
+
+@lru_cache(maxsize=1024)
+def command_name(command):
+    """
+    Nama perintah tanpa argumen untuk label metrik
+
+    AT+CUSD=1,"*123#",15 -> AT+CUSD, AT+CCID;+CNUM -> AT+CCID;+CNUM, sehingga
+    jumlah kombinasi label tetap kecil.
+    """
+    names = []
+    for part in (command or "").strip().split(";"):
+        match = _COMMAND_NAME.match(part.strip())
+        names.append(match.group(2).upper() if match else "")
+    return "AT" + ";".join(names)
+
+
+def record_command(port, result, bytes_out=0, label=None):
+    """
+    Catat satu perintah AT yang selesai (dipanggil di jalur panas)
+
+    Args:
+        port: Device ID
+        result: ATResponse
+        bytes_out: Jumlah byte yang ditulis
+        label: Label perintah jika bukan dari result.command
+    """
+    command = label or command_name(result.command)
+    if bytes_out:
+        BYTES_OUT.labels(port).inc(bytes_out)
+    if result.text:
+        BYTES_IN.labels(port).inc(len(result.text))
+    if result.timed_out:
+        COMMAND_TIMEOUTS.labels(port, command).inc()
+        return
+    COMMAND_LATENCY.labels(port, command).observe(result.latency)
+    if result.is_error:
+        COMMAND_ERRORS.labels(port, command, result.final).inc()
+
+
+def command_stats(registry=REGISTRY):
+    """
+    Ringkasan per port dan perintah untuk tampilan CLI
+
+    Returns:
+        List dict port, command, count, avg_ms, p95_ms, timeouts, errors
+        diurutkan per port lalu perintah
+    """
+    latency = registry.families.get("modem_command_latency_seconds")
+    timeouts = registry.families.get("modem_command_timeouts_total")
+    errors = registry.families.get("modem_command_errors_total")
+
+    rows = {}
+
+    def row(port, command):
+        return rows.setdefault(
+            (port, command),
+            {
+                "port": port,
+                "command": command,
+                "count": 0,
+                "avg_ms": None,
+                "p95_ms": None,
+                "timeouts": 0,
+                "errors": 0,
+            },
+        )
+
+    for (port, command), histogram in latency.items() if latency else ():
+        counts, total = histogram.snapshot()
+        count = sum(counts)
+        entry = row(port, command)
+        entry["count"] += count
+        if count:
+            entry["avg_ms"] = total / count * 1000
+            entry["p95_ms"] = histogram.quantile(0.95) * 1000
+    for (port, command), counter in timeouts.items() if timeouts else ():
+        entry = row(port, command)
+        entry["timeouts"] += counter.value
+        entry["count"] += counter.value
+    for (port, command, _code), counter in errors.items() if errors else ():
+        row(port, command)["errors"] += counter.value
+
+    return [rows[key] for key in sorted(rows)]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Metrics request: " + format, *args)
+
+
+def start_http_server(port, address="", registry=REGISTRY):
+    """
+    Sajikan /metrics untuk Prometheus di thread latar belakang
+
+    Returns:
+        ThreadingHTTPServer (panggil shutdown() untuk berhenti)
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((address, port), handler)
+    thread = threading.Thread(
+        target=server.serve_forever, daemon=True, name="metrics-http"
+    )
+    thread.start()
+    logger.info(f"Metrics endpoint listening on {address or '0.0.0.0'}:{port}")
+    return server
@@ -0,0 +1,317 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+# Alfabet default GSM 03.38 (indeks = nilai septet)
+GSM7_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENSION = {
+    0x0A: "\f",
+    0x14: "^",
+    0x28: "{",
+    0x29: "}",
+    0x2F: "\\",
+    0x3C: "[",
+    0x3D: "~",
+    0x3E: "]",
+    0x40: "|",
+    0x65: "€",
+}
+GSM7_ESCAPE = 0x1B
+
+# Data coding yang didukung
+ENCODING_GSM7 = "gsm7"
+ENCODING_8BIT = "8bit"
+ENCODING_UCS2 = "ucs2"
+
+# +CMGL: <index>,<stat>,[<alpha>],<length>  (mode PDU)
+# +CMGL: <index>,"<stat>","<oa>",[<alpha>],["<scts>"]  (mode teks)
+CMGL_PATTERN = re.compile(r"^\+CMG[LR]:\s*(?:(\d+),)?(.*)$")
+TEXT_HEADER_PATTERN = re.compile(r'"([^"]*)"')
+
+
+class SmsPdu:
+    """Hasil decode satu SMS (PDU SMS-DELIVER atau listing mode teks)"""
+
+    def __init__(self, sender, text, timestamp=None, smsc=None, encoding=None):
+        self.sender = sender
+        self.text = text
+        self.timestamp = timestamp  # Service centre timestamp (datetime)
+        self.smsc = smsc
+        self.encoding = encoding
+        # Informasi SMS bersambung (UDH concatenation), None jika satu bagian
+        self.reference = None
+        self.total = 1
+        self.seq = 1
+
+    @property
+    def is_part(self):
+        return self.total > 1
+
+    def __repr__(self):
+        part = f", part {self.seq}/{self.total}" if self.is_part else ""
+        return (
+            f"SmsPdu(from={self.sender!r}, {self.encoding}{part}, text={self.text!r})"
+        )
+
+
+def unpack_gsm7(data, septets):
+    """Membuka septet GSM 7-bit yang dipadatkan (LSB lebih dulu)"""
+    bits = int.from_bytes(data, "little")
+    return [(bits >> (7 * i)) & 0x7F for i in range(septets)]
+
+
+def decode_gsm7(septets):
+    """Septet GSM 7-bit -> string, termasuk tabel ekstensi (escape 0x1B)"""
+    chars = []
+    escaped = False
+    for septet in septets:
+        if escaped:
+            chars.append(GSM7_EXTENSION.get(septet, " "))
+            escaped = False
+        elif septet == GSM7_ESCAPE:
+            escaped = True
+        else:
+            chars.append(GSM7_BASIC[septet])
+    return "".join(chars)
+
+
+def decode_semi_octets(data):
+    """BCD dengan nibble tertukar (nomor telepon, timestamp)"""
+    digits = []
+    for octet in data:
+        digits.append(octet & 0x0F)
+        digits.append(octet >> 4)
+    return "".join("0123456789*#abc"[d] for d in digits if d != 0x0F)
+
+
+def decode_address(length, toa, data):
+    """
+    Decode alamat pengirim
+
+    Args:
+        length: Panjang alamat dalam semi-octet (digit)
+        toa: Type of address
+        data: Octet alamat
+
+    Returns:
+        Nomor (dengan + untuk internasional) atau nama alfanumerik
+    """
+    if toa & 0x70 == 0x50:
+        # Alfanumerik (misalnya nama operator): GSM 7-bit terpadat
+        return decode_gsm7(unpack_gsm7(data, length * 4 // 7))
+    number = decode_semi_octets(data)[:length]
+    return f"+{number}" if toa & 0x70 == 0x10 else number
+
+
+def decode_timestamp(data):
+    """Service centre timestamp (7 octet semi-octet) -> datetime"""
+    fields = [int(decode_semi_octets(bytes([octet])) or 0) for octet in data[:6]]
+    year, month, day, hour, minute, second = fields
+    year += 1900 if year >= 70 else 2000
+    tz_octet = data[6]
+    quarters = (tz_octet & 0x07) * 10 + (tz_octet >> 4)
+    if tz_octet & 0x08:
+        quarters = -quarters
+    try:
+        return datetime(
+            year,
+            month,
+            day,
+            hour,
+            minute,
+            second,
+            tzinfo=timezone(timedelta(minutes=15 * quarters)),
+        )
+    except ValueError:
+        return None
+
+
+def data_coding(dcs):
+    """Data coding scheme -> ENCODING_* (3GPP TS 23.038)"""
+    group = dcs & 0xF0
+    if group & 0xC0 == 0x00 or group & 0xC0 == 0x40:
+        alphabet = (dcs >> 2) & 0x03
+        return {1: ENCODING_8BIT, 2: ENCODING_UCS2}.get(alphabet, ENCODING_GSM7)
+    if group == 0xF0:
+        return ENCODING_8BIT if dcs & 0x04 else ENCODING_GSM7
+    if group == 0xE0:
+        return ENCODING_UCS2
+    return ENCODING_GSM7
+
+
+def parse_udh(header):
+    """
+    Cari informasi SMS bersambung pada User Data Header
+
+    Returns:
+        Tuple (reference, total, seq) atau None
+    """
+    position = 0
+    while position + 2 <= len(header):
+        iei = header[position]
+        length = header[position + 1]
+        value = header[position + 2 : position + 2 + length]
+        position += 2 + length
+        if iei == 0x00 and length == 3:
+            return value[0], value[1], value[2]
+        if iei == 0x08 and length == 4:
+            return (value[0] << 8) | value[1], value[2], value[3]
+    return None
+
+
+def decode_pdu(pdu):
+    """
+    Decode PDU SMS-DELIVER seperti yang dikembalikan AT+CMGL / AT+CMGR
+    (diawali informasi SMSC)
+
+    Args:
+        pdu: String hex
+
+    Returns:
+        SmsPdu
+
+    Raises:
+        ValueError: Jika PDU rusak atau bukan SMS-DELIVER
+    """
+    try:
+        data = bytes.fromhex(pdu.strip())
+    except ValueError:
+        raise ValueError(f"Invalid PDU hex: {pdu[:20]}...")
+
+    try:
+        smsc_length = data[0]
+        smsc = None
+        if smsc_length:
+            smsc = decode_address(
+                (smsc_length - 1) * 2, data[1], data[2 : 1 + smsc_length]
+            )
+        position = 1 + smsc_length
+
+        first_octet = data[position]
+        if first_octet & 0x03 != 0x00:
+            raise ValueError(f"Not an SMS-DELIVER PDU (MTI {first_octet & 0x03})")
+        has_udh = bool(first_octet & 0x40)
+
+        address_length = data[position + 1]
+        toa = data[position + 2]
+        address_octets = (address_length + 1) // 2
+        position += 3
+        sender = decode_address(
+            address_length, toa, data[position : position + address_octets]
+        )
+        position += address_octets
+
+        dcs = data[position + 1]  # data[position] = protocol identifier
+        timestamp = decode_timestamp(data[position + 2 : position + 9])
+        udl = data[position + 9]
+        user_data = data[position + 10 :]
+    except IndexError:
+        raise ValueError("Truncated PDU")
+
+    encoding = data_coding(dcs)
+    concat = None
+    header_length = 0
+    if has_udh and user_data:
+        header_length = user_data[0] + 1
+        concat = parse_udh(user_data[1:header_length])
+
+    if encoding == ENCODING_GSM7:
+        # Header diisi bit pengisi sampai batas septet
+        header_septets = (header_length * 8 + 6) // 7
+        septets = unpack_gsm7(user_data, udl)
+        text = decode_gsm7(septets[header_septets:])
+    else:
+        body = user_data[header_length:udl]
+        if encoding == ENCODING_UCS2:
+            text = body.decode("utf-16-be", errors="replace")
+        else:
+            text = body.decode("latin-1")
+
+    sms = SmsPdu(sender, text, timestamp, smsc, encoding)
+    if concat is not None:
+        sms.reference, sms.total, sms.seq = concat
+    return sms
+
+
+def decode_text_body(text, charset="GSM"):
+    """Isi SMS mode teks; dengan AT+CSCS="UCS2" isi berupa string hex UTF-16"""
+    if charset.upper() != "UCS2":
+        return text
+    try:
+        return bytes.fromhex(text.strip()).decode("utf-16-be")
+    except ValueError:
+        return text
+
+
+def parse_text_timestamp(value):
+    """Timestamp mode teks "yy/MM/dd,hh:mm:ss+zz" -> datetime"""
+    match = re.match(
+        r"(\d{2})/(\d{2})/(\d{2}),(\d{2}):(\d{2}):(\d{2})([+-]\d+)?", value
+    )
+    if not match:
+        return None
+    year, month, day, hour, minute, second = (int(g) for g in match.groups()[:6])
+    quarters = int(match.group(7) or 0)
+    try:
+        return datetime(
+            2000 + year,
+            month,
+            day,
+            hour,
+            minute,
+            second,
+            tzinfo=timezone(timedelta(minutes=15 * quarters)),
+        )
+    except ValueError:
+        return None
+
+
+def parse_message_listing(text, charset="GSM"):
+    """
+    Parse respons AT+CMGL (mode PDU atau teks)
+
+    Args:
+        text: Respons AT+CMGL
+        charset: Character set mode teks (AT+CSCS)
+
+    Returns:
+        List tuple (index SIM, SmsPdu atau None, data mentah). SmsPdu None
+        jika PDU gagal di-decode; data mentah tetap dikembalikan agar pesan
+        tidak hilang.
+    """
+    messages = []
+    lines = [line.strip() for line in text.splitlines()]
+    position = 0
+    while position < len(lines):
+        match = CMGL_PATTERN.match(lines[position])
+        position += 1
+        if not match or match.group(1) is None:
+            continue
+        index = int(match.group(1))
+
+        # Baris data berikutnya (PDU hex atau isi teks) sampai header/final
+        body = []
+        while position < len(lines) and not lines[position].startswith("+CMGL:"):
+            if lines[position] in ("OK", "ERROR"):
+                break
+            body.append(lines[position])
+            position += 1
+        raw = "\n".join(line for line in body if line)
+
+        fields = TEXT_HEADER_PATTERN.findall(match.group(2))
+        if fields:
+            # Mode teks: "stat","oa",...,"scts"
+            sender = fields[1] if len(fields) > 1 else ""
+            timestamp = parse_text_timestamp(fields[-1]) if len(fields) > 2 else None
+            sms = SmsPdu(
+                sender, decode_text_body(raw, charset), timestamp, encoding="text"
+            )
+        else:
+            try:
+                sms = decode_pdu(raw)
+            except ValueError:
+                sms = None
+        messages.append((index, sms, raw))
+    return messages
@@ -0,0 +1,142 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+
+from src.utils.logging import get_logger
+
+logger = get_logger("utils.preference_store")
+
+# Jeda sebelum mencoba lagi penulisan yang gagal (detik)
+RETRY_DELAY = 5
+
+
+def write_json_atomic(path, data):
+    """
+    Tulis JSON secara atomik: file sementara di direktori yang sama, fsync,
+    lalu rename menggantikan file lama
+
+    Crash di tengah penulisan meninggalkan file lama utuh, bukan file
+    setengah jadi.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Pastikan rename juga tersimpan (tidak tersedia di Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class PreferenceStore:
+    """
+    Penyimpanan preferensi write-behind
+
+    Perubahan ditandai dengan schedule(); semua perubahan dalam jendela
+    delay digabung menjadi satu penulisan. Isi file diambil dari fungsi
+    snapshot saat penulisan, dan file tidak ditulis ulang jika isinya sama
+    dengan penulisan terakhir. flush() menulis segera; dipanggil otomatis
+    saat proses berakhir. Jika penulisan gagal, perubahan tetap ditandai
+    dan dicoba lagi setelah RETRY_DELAY.
+    """
+
+    def __init__(self, path, snapshot, delay=0.5):
+        """
+        Args:
+            path: File JSON tujuan
+            snapshot: Fungsi tanpa argumen -> data JSON yang akan disimpan
+            delay: Jendela penggabungan perubahan dalam detik
+        """
+        self.path = path
+        self.snapshot = snapshot
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.timer = None
+        self.dirty = False
+        self.last_written = None
+        self.writes = 0
+        atexit.register(self.flush)
+
+    def load(self, default):
+        """Baca file preferensi, atau default jika tidak ada / rusak"""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self.last_written = json.dumps(data, sort_keys=True)
+                return data
+            except Exception as e:
+                logger.error(f"Gagal memuat preferensi: {str(e)}")
+        return default
+
+    def schedule(self):
+        """Tandai ada perubahan; ditulis setelah jendela delay berakhir"""
+        with self.lock:
+            self.dirty = True
+            if self.timer is None:
+                self._start_timer(self.delay)
+
+    def _start_timer(self, delay):
+        """Jadwalkan flush; dipanggil dengan self.lock"""
+        self.timer = threading.Timer(delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """
+        Tulis perubahan yang tertunda sekarang juga
+
+        Returns:
+            True jika file ditulis
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return False
+
+            try:
+                data = self.snapshot()
+                serialized = json.dumps(data, sort_keys=True)
+                if serialized == self.last_written:
+                    self.dirty = False
+                    return False
+                write_json_atomic(self.path, data)
+            except Exception as e:
+                # Perubahan tetap dirty; coba lagi nanti
+                logger.error(f"Gagal menyimpan preferensi: {str(e)}")
+                self._start_timer(max(self.delay, RETRY_DELAY))
+                return False
+            self.dirty = False
+            self.last_written = serialized
+            self.writes += 1
+            logger.debug(f"Preferensi disimpan ke {self.path}")
+            return True
+
+    def close(self):
+        """Tulis perubahan tertunda, hentikan percobaan ulang dan lepas hook atexit"""
+        self.flush()
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        atexit.unregister(self.flush)
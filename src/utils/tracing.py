@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# Dipakai saat tracing nonaktif: satu objek bersama, tanpa alokasi per span
+_NULL_SPAN = nullcontext()
+
+DEFAULT_CAPACITY = 20000
+
+
+class Span:
+    """Satu span yang sedang berjalan; dicatat ke ring buffer saat keluar"""
+
+    __slots__ = ("tracer", "name", "port", "args", "start")
+
+    def __init__(self, tracer, name, port, args):
+        self.tracer = tracer
+        self.name = name
+        self.port = port
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        # deque.append thread-safe; event tertua terbuang saat buffer penuh
+        self.tracer.buffer.append(
+            (
+                self.name,
+                self.port,
+                self.start,
+                end - self.start,
+                threading.get_ident(),
+                threading.current_thread().name,
+                self.args,
+            )
+        )
+        return False
+
+    def set(self, **args):
+        """Tambahkan atribut yang baru diketahui di dalam span (misalnya final)"""
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Tracing opt-in untuk jalur serial (open, reset, write, read, sleep)
+
+    Span disimpan di ring buffer berukuran tetap dan bisa diekspor sebagai
+    Chrome trace event JSON (chrome://tracing / Perfetto): setiap port tampil
+    sebagai satu proses dan setiap thread sebagai jalurnya, sehingga antrean
+    thread pool dan serialisasi antar modem terlihat. Saat nonaktif span()
+    hanya memeriksa satu flag dan mengembalikan context manager kosong.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.enabled = False
+        self.buffer = deque(maxlen=capacity)
+
+    def enable(self, capacity=None):
+        if capacity and capacity != self.buffer.maxlen:
+            self.buffer = deque(self.buffer, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.buffer.clear()
+
+    def span(self, name, port=None, **args):
+        """
+        Context manager yang mengukur satu tahap
+
+        Args:
+            name: Nama tahap (contoh: serial.open, serial.read)
+            port: Device ID; span dikelompokkan per port di timeline
+            **args: Atribut tambahan (command, baud, ...)
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, port, args)
+
+    def events(self):
+        """Salinan isi ring buffer (tuple mentah, urut waktu selesai)"""
+        return list(self.buffer)
+
+    def chrome_trace(self):
+        """
+        Returns:
+            Dict format Chrome trace event ({"traceEvents": [...]})
+        """
+        events = self.events()
+        if not events:
+            return {"traceEvents": [], "displayTimeUnit": "ms"}
+
+        origin = min(event[2] for event in events)
+        pids = {}  # port -> pid sintetis; 0 untuk span tanpa port
+        threads = {}
+        trace = []
+        for name, port, start, duration, ident, thread_name, args in events:
+            pid = pids.setdefault(port, len(pids) + 1) if port else 0
+            threads[(pid, ident)] = thread_name
+            entry = {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (start - origin) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": ident,
+            }
+            if args:
+                entry["args"] = args
+            trace.append(entry)
+
+        metadata = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": 0,
+                "args": {"name": f"app ({os.getpid()})"},
+            }
+        ]
+        metadata.extend(
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": port}}
+            for port, pid in pids.items()
+        )
+        metadata.extend(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": ident,
+                "args": {"name": thread_name},
+            }
+            for (pid, ident), thread_name in threads.items()
+        )
+        return {"traceEvents": metadata + trace, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path):
+        """
+        Tulis timeline ke file JSON (buka di chrome://tracing atau Perfetto)
+
+        Returns:
+            Jumlah span yang ditulis
+        """
+        trace = self.chrome_trace()
+        with open(path, "w") as f:
+            json.dump(trace, f, default=str)
+        return sum(1 for event in trace["traceEvents"] if event["ph"] == "X")
+
+
+TRACER = Tracer()
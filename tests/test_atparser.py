@@ -0,0 +1,77 @@
+import unittest
+
+from src.utils.atparser import parse_response
+
+ICCID = "8962116543210987654"
+
+# (vendor, baris respons, ICCID yang diharapkan)
+ICCID_CASES = [
+    (None, f"+CCID: {ICCID}", ICCID),
+    (None, f'+CCID: "{ICCID}"', ICCID),
+    (None, f"+CCID: {ICCID}F", ICCID),
+    (None, f'+CCID: "{ICCID}F"', ICCID),
+    (None, f"+ICCID: {ICCID}", ICCID),
+    (None, f'+ICCID: "{ICCID}"', ICCID),
+    ("quectel", f"+QCCID: {ICCID}F", ICCID),
+    ("huawei", f"^ICCID: {ICCID}", ICCID),
+    ("huawei", "^ICCID: 982611563412907856F4", ICCID),
+    ("huawei", '^ICCID: "982611563412907856F4"', ICCID),
+    ("huawei", "^ICCID: 982611563412907856f4", ICCID),
+    (None, "^ICCID: 982611563412907856F4", ICCID),
+    ("zte", f"+ZGETICCID: {ICCID}", ICCID),
+    ("sierra", f"!ICCID: {ICCID}F", ICCID),
+    (None, ICCID, ICCID),
+    (None, f"{ICCID}F", ICCID),
+]
+
+# (vendor, perintah, baris respons, field, atribut, nilai)
+FIELD_CASES = [
+    (None, "AT+CSQ", "+CSQ: 17,99", "signal", "rssi", 17),
+    ("huawei", "AT^HCSQ?", '^HCSQ: "LTE",45,30,120,25', "lte_signal", "rat", "LTE"),
+    ("quectel", "AT+QCSQ", '+QCSQ: "LTE",-65,-95,150,-10', "lte_signal", "rat", "LTE"),
+    (None, "AT+COPS?", '+COPS: 0,0,"IM3",7', "operator", "name", "IM3"),
+    (None, "AT+CREG?", "+CREG: 0,1", "creg", "stat", 1),
+    (None, "AT+CIMI", "510211234567890", "imsi", None, "510211234567890"),
+    (None, "AT+CGSN", "861234567890123", "imei", None, "861234567890123"),
+    (None, "AT+CNUM", '+CNUM: "","085712345678",129', "msisdn", None, "085712345678"),
+]
+
+
+class IccidParserTest(unittest.TestCase):
+    def test_vendor_prefixes(self):
+        for vendor, line, expected in ICCID_CASES:
+            with self.subTest(vendor=vendor, line=line):
+                result = parse_response(f"{line}\r\nOK\r\n", vendor=vendor)
+                self.assertEqual(result.get("iccid"), expected)
+                self.assertTrue(result.ok)
+                self.assertEqual(result.unparsed, [])
+
+    def test_rejects_garbage(self):
+        for line in ("+CCID: ERROR", "^ICCID: FFFF", "+CCID: 1234"):
+            with self.subTest(line=line):
+                result = parse_response(f"{line}\r\nOK\r\n", vendor="huawei")
+                self.assertNotIn("iccid", result)
+
+
+class FieldParserTest(unittest.TestCase):
+    def test_fields(self):
+        for vendor, command, line, field, attribute, expected in FIELD_CASES:
+            with self.subTest(command=command, vendor=vendor):
+                result = parse_response(f"{line}\r\nOK\r\n", [command], vendor)
+                value = result.get(field)
+                if attribute is not None:
+                    value = getattr(value, attribute)
+                self.assertEqual(value, expected)
+
+    def test_combined_buffer(self):
+        text = (
+            '+CSQ: 20,99\r\n+CCID: "8962116543210987654F"\r\n510211234567890\r\nOK\r\n'
+        )
+        result = parse_response(text, ["AT+CSQ", "AT+CCID", "AT+CIMI"])
+        self.assertEqual(result["signal"].rssi, 20)
+        self.assertEqual(result["iccid"], ICCID)
+        self.assertEqual(result["imsi"], "510211234567890")
+
+
+if __name__ == "__main__":
+    unittest.main()
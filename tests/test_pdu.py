@@ -0,0 +1,137 @@
+import unittest
+from datetime import timedelta
+
+from src.utils.pdu import decode_pdu, parse_message_listing, parse_udh
+
+# Alamat +62812345678, SCTS 24/01/02 03:04:05 GMT+7 (disusun manual)
+ORIGIN = "0B912618325476F8"
+SCTS = "42102030405082"
+
+# (nama, PDU, pengirim, SMSC, encoding, teks, (reference, total, seq) atau None)
+PDU_CASES = [
+    (
+        "gsm7",
+        "07917283010010F5040BC87238880900F10000993092516195800AE8329BFD4697D9EC37",
+        "27838890001",
+        "+27381000015",
+        "gsm7",
+        "hellohello",
+        None,
+    ),
+    (
+        "gsm7 ekstensi",
+        f"0004{ORIGIN}0000{SCTS}029B32",
+        "+62812345678",
+        None,
+        "gsm7",
+        "€",
+        None,
+    ),
+    (
+        # UDH 6 octet = 48 bit, 1 bit pengisi sebelum septet pertama
+        "gsm7 udh fill bit",
+        f"0044{ORIGIN}0000{SCTS}09050003CC02019069",
+        "+62812345678",
+        None,
+        "gsm7",
+        "Hi",
+        (0xCC, 2, 1),
+    ),
+    (
+        "ucs2",
+        f"07912658050000F004{ORIGIN}0008{SCTS}0C041F04400438043204350442",
+        "+62812345678",
+        "+62855000000",
+        "ucs2",
+        "Привет",
+        None,
+    ),
+    (
+        "ucs2 referensi 16-bit",
+        f"0044{ORIGIN}0008{SCTS}09060804123402010041",
+        "+62812345678",
+        None,
+        "ucs2",
+        "A",
+        (0x1234, 2, 1),
+    ),
+]
+
+
+class DecodePduTest(unittest.TestCase):
+    def test_known_pdus(self):
+        for name, pdu, sender, smsc, encoding, text, concat in PDU_CASES:
+            with self.subTest(name):
+                sms = decode_pdu(pdu)
+                self.assertEqual(sms.sender, sender)
+                self.assertEqual(sms.smsc, smsc)
+                self.assertEqual(sms.encoding, encoding)
+                self.assertEqual(sms.text, text)
+                if concat is None:
+                    self.assertFalse(sms.is_part)
+                else:
+                    self.assertEqual((sms.reference, sms.total, sms.seq), concat)
+
+    def test_timestamp(self):
+        sms = decode_pdu(PDU_CASES[2][1])
+        self.assertEqual(sms.timestamp.isoformat(), "2024-01-02T03:04:05+07:00")
+        self.assertEqual(sms.timestamp.utcoffset(), timedelta(hours=7))
+
+    def test_concat_references(self):
+        cases = [
+            (bytes.fromhex("0003CC0201"), (0xCC, 2, 1)),
+            (bytes.fromhex("080412340302"), (0x1234, 3, 2)),
+            # IE lain sebelum concatenation dilewati
+            (bytes.fromhex("0A0201020003070301"), (7, 3, 1)),
+            (bytes.fromhex("0A020102"), None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header.hex()):
+                self.assertEqual(parse_udh(header), expected)
+
+    def test_invalid_pdu(self):
+        for pdu in ("not hex", "0004", f"0001{ORIGIN}0000{SCTS}00"):
+            with self.subTest(pdu=pdu):
+                with self.assertRaises(ValueError):
+                    decode_pdu(pdu)
+
+
+class MessageListingTest(unittest.TestCase):
+    def test_text_mode_listing(self):
+        text = (
+            '+CMGL: 1,"REC UNREAD","+6281234567890",,"24/01/02,03:04:05+28"\r\n'
+            "Hello there\r\n"
+            '+CMGL: 4,"REC READ","TELKOMSEL",,"24/01/02,03:05:00+28"\r\n'
+            "Second\r\n"
+            "\r\nOK\r\n"
+        )
+        messages = parse_message_listing(text)
+        self.assertEqual([index for index, _, _ in messages], [1, 4])
+
+        index, sms, raw = messages[0]
+        self.assertEqual(sms.sender, "+6281234567890")
+        self.assertEqual(sms.text, "Hello there")
+        self.assertEqual(raw, "Hello there")
+        self.assertEqual(sms.encoding, "text")
+        self.assertEqual(sms.timestamp.isoformat(), "2024-01-02T03:04:05+07:00")
+        self.assertEqual(messages[1][1].sender, "TELKOMSEL")
+        self.assertEqual(messages[1][1].text, "Second")
+
+    def test_text_mode_ucs2(self):
+        text = (
+            '+CMGL: 2,"REC UNREAD","+62811",,"24/01/02,03:04:05+28"\r\n00480069\r\nOK'
+        )
+        ((_, sms, _),) = parse_message_listing(text, charset="UCS2")
+        self.assertEqual(sms.text, "Hi")
+
+    def test_pdu_mode_listing(self):
+        pdu = PDU_CASES[3][1]
+        text = f"+CMGL: 0,1,,31\r\n{pdu}\r\n+CMGL: 3,0,,5\r\nZZ\r\n\r\nOK\r\n"
+        messages = parse_message_listing(text)
+        self.assertEqual(messages[0][1].text, "Привет")
+        # PDU rusak tetap dikembalikan mentah agar pesan tidak hilang
+        self.assertEqual(messages[1], (3, None, "ZZ"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import threading
+import time
+import unittest
+
+from src.services.sms_sender import BulkSmsSender, SmsBatch, SmsJob, TokenBucket
+
+
+class FakeModems:
+    """Pasangan send/devices palsu: tanpa serial, hasil per SIM bisa diatur"""
+
+    def __init__(self, *devices):
+        self.devices = list(devices)
+        self.failing = set()
+        self.calls = []  # (device_id, nomor, waktu)
+        self.lock = threading.Lock()
+        self.on_send = None
+
+    def send(self, device_id, recipient, text):
+        with self.lock:
+            self.calls.append((device_id, recipient, time.monotonic()))
+        if self.on_send is not None:
+            self.on_send(device_id)
+        if device_id in self.failing:
+            return None
+        return len(self.calls)
+
+    def list(self):
+        return list(self.devices)
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_rate_limited(self):
+        bucket = TokenBucket(600, capacity=2)  # 10 token per detik
+        started = time.monotonic()
+        self.assertTrue(bucket.acquire())
+        self.assertTrue(bucket.acquire())
+        self.assertLess(time.monotonic() - started, 0.05)
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(time.monotonic() - started, 0.08)
+
+    def test_refund(self):
+        bucket = TokenBucket(1, capacity=2)
+        bucket.acquire()
+        self.assertLess(bucket.available(), 1.1)
+        bucket.refund()
+        self.assertGreaterEqual(bucket.available(), 1.9)
+        # Refund tidak melebihi kapasitas
+        bucket.refund()
+        self.assertLessEqual(bucket.available(), 2)
+
+    def test_stop_while_waiting(self):
+        bucket = TokenBucket(1, capacity=1)
+        bucket.acquire()
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        self.assertFalse(bucket.acquire(stop))
+
+    def test_configure_keeps_tokens_within_capacity(self):
+        bucket = TokenBucket(60, capacity=5)
+        bucket.configure(60, 2)
+        self.assertLessEqual(bucket.available(), 2)
+
+    def test_rejects_non_positive_rate(self):
+        for rate in (0, -1):
+            with self.subTest(rate=rate):
+                with self.assertRaises(ValueError):
+                    TokenBucket(rate)
+                with self.assertRaises(ValueError):
+                    TokenBucket(60).configure(rate, 1)
+                with self.assertRaises(ValueError):
+                    BulkSmsSender(None, list, rate_per_minute=rate)
+
+
+class BulkSmsSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.modems = FakeModems("A")
+        self.sender = BulkSmsSender(
+            self.modems.send, self.modems.list, rate_per_minute=6000, burst=10
+        )
+
+    def tearDown(self):
+        self.sender.shutdown()
+
+    def test_sends_all_jobs(self):
+        self.modems.devices.append("B")
+        batch = self.sender.send_bulk([(f"+62811{i}", "halo") for i in range(6)])
+        self.assertTrue(batch.wait(5))
+        self.assertEqual(batch.progress()["sent"], 6)
+        self.assertTrue(all(job.status == SmsJob.SENT for job in batch.jobs))
+        self.assertEqual(self.sender.stats()["sent"], 6)
+
+    def test_rate_limit_per_sim(self):
+        self.sender.configure(600, 1, 3)  # 1 SMS per 0,1 detik, tanpa burst
+        batch = self.sender.send_bulk([("+62811", "a"), ("+62812", "b")])
+        self.assertTrue(batch.wait(5))
+        (_, _, first), (_, _, second) = self.modems.calls
+        self.assertGreaterEqual(second - first, 0.08)
+
+    def test_failed_sim_retried_on_other_sim(self):
+        self.modems.failing.add("A")
+
+        def add_second_sim(device_id):
+            # SIM B baru tersedia setelah A mencoba
+            if "B" not in self.modems.devices:
+                self.modems.devices.append("B")
+
+        self.modems.on_send = add_second_sim
+        batch = self.sender.send_bulk([("+62811", "halo")])
+        self.assertTrue(batch.wait(5))
+
+        (job,) = batch.jobs
+        self.assertEqual(job.status, SmsJob.SENT)
+        self.assertEqual(job.device_id, "B")
+        self.assertEqual(job.tried, {"A", "B"})
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(self.sender.stats()["retries"], 1)
+        self.assertEqual([call[0] for call in self.modems.calls], ["A", "B"])
+
+    def test_fails_when_every_sim_tried(self):
+        self.modems.devices.append("B")
+        self.modems.failing.update(("A", "B"))
+        batch = self.sender.send_bulk([("+62811", "halo")])
+        self.assertTrue(batch.wait(5))
+
+        (job,) = batch.jobs
+        self.assertEqual(job.status, SmsJob.FAILED)
+        self.assertEqual(job.tried, {"A", "B"})
+        self.assertEqual(job.attempts, 2)  # max_attempts 3, tapi hanya 2 SIM
+        self.assertEqual(batch.progress()["failed"], 1)
+
+    def test_stops_at_max_attempts(self):
+        self.modems.devices.extend(("B", "C"))
+        self.modems.failing.update(("A", "B", "C"))
+        self.sender.configure(6000, 10, 2)
+        batch = self.sender.send_bulk([("+62811", "halo")])
+        self.assertTrue(batch.wait(5))
+        self.assertEqual(batch.jobs[0].attempts, 2)
+        self.assertEqual(len(self.modems.calls), 2)
+
+    def test_no_sim_available(self):
+        self.modems.devices.clear()
+        batch = self.sender.send_bulk([("+62811", "a"), ("+62812", "b")])
+        self.assertTrue(batch.done())
+        self.assertEqual(batch.progress()["failed"], 2)
+        self.assertEqual(self.modems.calls, [])
+
+
+class SmsBatchTest(unittest.TestCase):
+    def test_empty_batch_is_done(self):
+        batch = SmsBatch([])
+        self.assertTrue(batch.wait(0))
+        self.assertEqual(batch.progress()["total"], 0)
+
+    def test_wait_finishes_after_last_job(self):
+        batch = SmsBatch([("+62811", "a"), ("+62812", "b")])
+        first, second = batch.jobs
+        first.status = SmsJob.SENT
+        batch._record(first)
+        self.assertFalse(batch.wait(0.01))
+
+        second.status = SmsJob.FAILED
+        threading.Timer(0.02, batch._record, (second,)).start()
+        self.assertTrue(batch.wait(5))
+        progress = batch.progress()
+        self.assertEqual((progress["sent"], progress["failed"]), (1, 1))
+        self.assertEqual(progress["pending"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from src.services.sms_store import SmsStore
+
+ICCID = "8962116543210987654"
+
+
+def part(seq, text, total=3, reference=7, received_at=None, **fields):
+    record = {
+        "iccid": ICCID,
+        "msisdn": "085712345678",
+        "device_id": "COM6",
+        "sender": "+62811",
+        "text": text,
+        "sent_at": "2024-01-02T03:04:05+07:00",
+        "received_at": received_at or datetime.now().isoformat(),
+        "pdu": f"PDU{seq}",
+        "reference": reference,
+        "total": total,
+        "seq": seq,
+    }
+    record.update(fields)
+    return record
+
+
+class SmsStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SmsStore(
+            os.path.join(self.tmp.name, "sms.db"), flush_interval=0.01
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def add(self, records):
+        committed = []
+        self.store.add(records, committed.extend)
+        self.store.flush()
+        return committed
+
+    def test_single_message(self):
+        record = part(1, "halo", total=1)
+        self.assertEqual(self.add([record]), [record])
+        (row,) = self.store.query(iccid=ICCID)
+        self.assertEqual((row["text"], row["parts"]), ("halo", 1))
+
+    def test_parts_out_of_order(self):
+        self.add([part(3, "C")])
+        self.add([part(1, "A")])
+        self.assertEqual(self.store.query(), [])
+
+        self.add([part(2, "B")])
+        (row,) = self.store.query(msisdn="085712345678")
+        self.assertEqual(row["text"], "ABC")
+        self.assertEqual(row["parts"], 3)
+        self.assertEqual(row["pdu"], "PDU1\nPDU2\nPDU3")
+
+    def test_parts_grouped_by_reference_and_sim(self):
+        self.add(
+            [
+                part(2, "y", total=2, reference=1),
+                part(1, "x", total=2, reference=2),
+                part(1, "q", total=2, reference=1, iccid="8962000000000000001"),
+                part(1, "x", total=2, reference=1),
+            ]
+        )
+        self.assertEqual([r["text"] for r in self.store.query(iccid=ICCID)], ["xy"])
+
+    def test_duplicate_part_ignored(self):
+        self.add([part(1, "A", total=2), part(1, "A", total=2)])
+        self.add([part(2, "B", total=2)])
+        (row,) = self.store.query()
+        self.assertEqual(row["text"], "AB")
+
+    def test_forced_sweep_of_incomplete_parts(self):
+        # Tahan sweep thread writer sampai semua bagian tertulis
+        self.store.last_part_sweep = time.monotonic() + 3600
+        old = (datetime.now() - timedelta(hours=2)).isoformat()
+        self.add([part(1, "A", received_at=old), part(3, "C", received_at=old)])
+        self.add([part(1, "fresh", reference=8)])
+        self.assertEqual(self.store.query(), [])
+
+        with self.assertLogs("src.services.sms_store", "WARNING") as logs:
+            self.store.last_part_sweep = 0.0
+            deadline = time.monotonic() + 5
+            while not self.store.query() and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        # Hanya grup yang lebih tua dari part_timeout digabung apa adanya
+        (row,) = self.store.query()
+        self.assertEqual((row["text"], row["parts"]), ("AC", 2))
+        self.assertIn("2/3 parts", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()